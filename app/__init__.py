@@ -14,14 +14,29 @@ def create_app():
     load_dotenv()
     app = Flask(__name__)
     app.config["SECRET_KEY"] = os.getenv("SECRET_KEY", "dev-secret")
+
+    # Behind Heroku's router (or any reverse proxy) remote_addr is the proxy's address, which would
+    # put every client in one login rate-limit bucket; trust this many X-Forwarded-For/-Proto hops.
+    # Leave at 0 when clients connect directly, or they could pick their own address.
+    proxy_hops = int(os.getenv("PROXY_FIX_X_FOR", "0") or 0)
+    if proxy_hops:
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxy_hops, x_proto=proxy_hops)
     db_url = os.getenv("DATABASE_URL", "sqlite:///iih.db")
     app.config["SQLALCHEMY_DATABASE_URI"] = db_url
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    from .utils.engine import apply_sqlite_pragmas, engine_options
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(db_url)
 
     db.init_app(app)
+    with app.app_context():
+        apply_sqlite_pragmas(db.engine)
     migrate.init_app(app, db)
     login_manager.init_app(app)
 
+    from .services.user_cache import user_cache
+    user_cache.init_app(app)
+
     from .routes.auth import bp as auth_bp
     from .routes.core import bp as core_bp
     from .routes.prediction import bp as pred_bp
@@ -43,4 +58,33 @@ def create_app():
         except Exception:
             return "—"
 
+    from .services.metrics import metrics
+    metrics.init_app(app)
+
+    from .services.profiler import profiler
+    profiler.init_app(app)
+
+    from .services.static_assets import static_assets
+    static_assets.init_app(app)
+
+    from .services.images import image_attrs
+    app.add_template_global(image_attrs)
+
+    from .cli import register_cli
+    register_cli(app)
+
+    from .services.pageview_buffer import page_views
+    page_views.init_app(app)
+
+    # Optional in-process no-show sweeper (seconds between runs; 0 disables it)
+    sweep_interval = float(os.getenv("NO_SHOW_SWEEP_INTERVAL", "0") or 0)
+    if sweep_interval > 0:
+        from .services.no_show_sweeper import NoShowSweeper
+        app.extensions["no_show_sweeper"] = NoShowSweeper(
+            app,
+            interval=sweep_interval,
+            grace_hours=float(os.getenv("NO_SHOW_GRACE_HOURS", "24")),
+        )
+        app.extensions["no_show_sweeper"].start()
+
     return app
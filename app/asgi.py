@@ -0,0 +1,242 @@
+"""
+Asyncio prediction API for partner integrations, served separately from the Flask site:
+
+    uvicorn app.asgi:api --host 0.0.0.0 --port 8001 --backlog 4096
+
+Connections are cheap coroutines, so thousands of slow partner connections sit on one event
+loop; only model evaluation leaves it, on a bounded thread pool. Admission is bounded too:
+a request that can't get an in-flight slot within PREDICT_API_QUEUE_TIMEOUT is turned away
+with 503 + Retry-After instead of queueing without limit.
+
+    POST /v1/predict          {"age": 54, "sex": 1, ...}           -> one prediction
+    POST /v1/predict/batch    {"instances": [{...}, {...}]}         -> one model call per batch
+    GET  /healthz, /readyz
+"""
+import asyncio
+import hmac
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+from .services.predictor import get_predictor, warm_up
+from .utils.risk import classify_risk
+
+log = logging.getLogger(__name__)
+
+
+class BadRequest(Exception):
+    def __init__(self, status, message, **extra):
+        super().__init__(message)
+        self.status = status
+        self.body = {"error": message, **extra}
+
+
+class PredictionAPI:
+    def __init__(self, predictor_factory=get_predictor, workers=None, max_in_flight=64,
+                 queue_timeout=1.0, max_batch=256, max_body=1 << 20, api_keys=()):
+        self.predictor_factory = predictor_factory
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self.max_in_flight = max_in_flight
+        self.queue_timeout = queue_timeout
+        self.max_batch = max_batch
+        self.max_body = max_body
+        self.api_keys = [k.encode() for k in api_keys if k]
+        self.predictor = None
+        self.executor = None
+        self._slots = None
+        self._starting = None
+        self.in_flight = 0
+        self.served = 0
+        self.rejected = 0
+
+    @classmethod
+    def from_env(cls):
+        load_dotenv()
+        return cls(
+            workers=int(os.getenv("PREDICT_API_WORKERS", "0")) or None,
+            max_in_flight=int(os.getenv("PREDICT_API_MAX_IN_FLIGHT", "64")),
+            queue_timeout=float(os.getenv("PREDICT_API_QUEUE_TIMEOUT", "1.0")),
+            max_batch=int(os.getenv("PREDICT_API_MAX_BATCH", "256")),
+            max_body=int(os.getenv("PREDICT_API_MAX_BODY", str(1 << 20))),
+            api_keys=os.getenv("PREDICT_API_KEYS", "").split(","),
+        )
+
+    # -- lifecycle -------------------------------------------------------------
+
+    async def startup(self):
+        # shared by lifespan and the first requests, whichever comes first
+        if self._starting is None:
+            self._starting = asyncio.ensure_future(self._start())
+        await self._starting
+
+    async def _start(self):
+        self.executor = ThreadPoolExecutor(self.workers, thread_name_prefix="predict")
+        self._slots = asyncio.Semaphore(self.max_in_flight)
+        loop = asyncio.get_running_loop()
+        # unpickling and the warm-up call are blocking; keep them off the loop too
+        self.predictor = await loop.run_in_executor(self.executor, self.predictor_factory)
+        if not await loop.run_in_executor(self.executor, warm_up, self.predictor):
+            log.warning("prediction API started without a usable model: %s",
+                        self.predictor.load_error or "model or feature list missing")
+
+    async def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+            self._starting = None
+
+    # -- ASGI ------------------------------------------------------------------
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self._lifespan(receive, send)
+        if scope["type"] != "http":
+            return
+        await self.startup()  # servers run without lifespan events when told to
+
+        path, method = scope["path"], scope["method"]
+        try:
+            if path in ("/healthz", "/readyz"):
+                if method != "GET":
+                    raise BadRequest(405, "method not allowed")
+                return await self._health(send, ready_check=path == "/readyz")
+            if path not in ("/v1/predict", "/v1/predict/batch"):
+                raise BadRequest(404, "not found")
+            if method != "POST":
+                raise BadRequest(405, "method not allowed")
+            self._check_key(scope)
+            body = await self._read_json(scope, receive)
+            if path == "/v1/predict":
+                result = (await self._predict([body]))[0]
+            else:
+                instances = body.get("instances") if isinstance(body, dict) else None
+                if not isinstance(instances, list) or not instances:
+                    raise BadRequest(400, "expected {\"instances\": [...]}")
+                if len(instances) > self.max_batch:
+                    raise BadRequest(413, f"batch larger than {self.max_batch} instances")
+                result = {"predictions": await self._predict(instances)}
+        except BadRequest as e:
+            headers = [(b"retry-after", b"1")] if e.status == 503 else []
+            return await _send_json(send, e.status, e.body, headers)
+        except Exception:
+            log.exception("prediction API request failed")
+            return await _send_json(send, 500, {"error": "internal error"})
+        return await _send_json(send, 200, result)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    await self.startup()
+                except Exception as e:
+                    await send({"type": "lifespan.startup.failed", "message": str(e)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    # -- handlers --------------------------------------------------------------
+
+    def _check_key(self, scope):
+        if not self.api_keys:
+            return
+        given = dict(scope["headers"]).get(b"x-api-key", b"")
+        if not any(hmac.compare_digest(given, key) for key in self.api_keys):
+            raise BadRequest(401, "missing or invalid X-API-Key")
+
+    async def _read_json(self, scope, receive):
+        declared = dict(scope["headers"]).get(b"content-length")
+        if declared is not None and declared.isdigit() and int(declared) > self.max_body:
+            raise BadRequest(413, f"body larger than {self.max_body} bytes")
+        chunks, size = [], 0
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                raise BadRequest(400, "client disconnected")
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > self.max_body:
+                raise BadRequest(413, f"body larger than {self.max_body} bytes")
+            chunks.append(chunk)
+            if not message.get("more_body"):
+                break
+        try:
+            return json.loads(b"".join(chunks))
+        except ValueError:
+            raise BadRequest(400, "body is not valid JSON")
+
+    def _validate(self, instances):
+        features = self.predictor.features or []
+        for i, payload in enumerate(instances):
+            if not isinstance(payload, dict):
+                raise BadRequest(400, "instance must be a JSON object", index=i)
+            for feat in features:
+                value = payload.get(feat)
+                if value is None:
+                    raise BadRequest(400, f"Missing feature: {feat}", index=i)
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    raise BadRequest(400, f"Feature {feat} must be a number", index=i)
+
+    async def _predict(self, instances):
+        if not self.predictor.ready():
+            raise BadRequest(503, "model not loaded")
+        self._validate(instances)
+
+        if not self._slots.locked():
+            await self._slots.acquire()
+        else:
+            try:
+                await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.rejected += 1
+                raise BadRequest(503, "prediction queue full, retry later")
+        self.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            results = await loop.run_in_executor(self.executor, self.predictor.predict_many, instances)
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+        self.served += len(instances)
+
+        out = []
+        for yhat, proba in results:
+            item = {"prediction": yhat, "probability": proba}
+            if proba is not None:
+                item["risk_level"] = classify_risk(proba)[0]
+            out.append(item)
+        return out
+
+    async def _health(self, send, ready_check):
+        ready = self.predictor is not None and self.predictor.ready()
+        body = {
+            "status": "ok" if ready or not ready_check else "unavailable",
+            "model_ready": ready,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "served": self.served,
+            "rejected": self.rejected,
+        }
+        if not ready and self.predictor is not None and self.predictor.load_error:
+            body["detail"] = self.predictor.load_error
+        await _send_json(send, 503 if ready_check and not ready else 200, body)
+
+
+async def _send_json(send, status, body, headers=()):
+    payload = json.dumps(body).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"),
+                    (b"content-length", str(len(payload)).encode()), *headers],
+    })
+    await send({"type": "http.response.body", "body": payload})
+
+
+api = PredictionAPI.from_env()
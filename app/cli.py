@@ -0,0 +1,283 @@
+import click
+
+
+def register_cli(app):
+    @app.cli.command("sweep-no-shows")
+    @click.option("--grace-hours", default=24, show_default=True, type=float,
+                  help="Hours after the slot before a BOOKED appointment counts as a no-show.")
+    @click.option("--batch-size", default=1000, show_default=True, type=int)
+    def sweep_no_shows_cmd(grace_hours, batch_size):
+        """Mark stale BOOKED appointments as NO_SHOW in keyset-paginated batches."""
+        from .services.no_show_sweeper import sweep_no_shows
+
+        def report(batch, rows, elapsed):
+            click.echo(f"batch {batch}: {rows} rows in {elapsed * 1000:.1f} ms")
+
+        stats = sweep_no_shows(grace_hours=grace_hours, batch_size=batch_size, on_batch=report)
+        click.echo(
+            f"Swept {stats['rows']} appointments in {stats['batches']} batches, "
+            f"{stats['seconds']:.2f}s ({stats['rows_per_sec']:.0f} rows/s)."
+        )
+
+    @app.cli.command("add-clinic-unit")
+    @click.argument("name")
+    @click.option("--opens", default="09:00", show_default=True, help="First slot start (HH:MM).")
+    @click.option("--closes", default="16:00", show_default=True, help="Last slot start (HH:MM).")
+    @click.option("--slot-minutes", default=30, show_default=True, type=int)
+    @click.option("--capacity", default=1, show_default=True, type=int, help="Parallel bookings per slot.")
+    def add_clinic_unit_cmd(name, opens, closes, slot_minutes, capacity):
+        """Create or update a clinic unit's working hours and slot capacity."""
+        from datetime import datetime
+        from . import db
+        from .models import ClinicUnit
+        from .services.occupancy import occupancy
+
+        unit = ClinicUnit.query.filter_by(name=name).first() or ClinicUnit(name=name)
+        unit.opens_at = datetime.strptime(opens, "%H:%M").time()
+        unit.closes_at = datetime.strptime(closes, "%H:%M").time()
+        unit.slot_minutes = slot_minutes
+        unit.capacity = capacity
+        unit.is_active = True
+        db.session.add(unit)
+        db.session.commit()
+        occupancy.clear()
+        click.echo(f"Clinic unit #{unit.id} {unit.name}: {opens}–{closes}, {slot_minutes} min slots, capacity {capacity}.")
+
+    @app.cli.command("archive-events")
+    @click.option("--retention-days", default=365, show_default=True, type=int)
+    @click.option("--batch-size", default=5000, show_default=True, type=int)
+    @click.option("--dir", "archive_dir", default=None, help="Defaults to EVENT_ARCHIVE_DIR or instance/archive.")
+    def archive_events_cmd(retention_days, batch_size, archive_dir):
+        """Move old appointment events into compressed monthly files."""
+        from .services.event_archive import archive_events
+
+        archive_dir = archive_dir or _archive_dir(app)
+        stats = archive_events(archive_dir, retention_days=retention_days, batch_size=batch_size)
+        click.echo(
+            f"Archived {stats['rows']} events in {stats['batches']} batches, {stats['seconds']:.2f}s; "
+            f"{stats['raw_bytes']} bytes -> {stats['compressed_bytes']} compressed "
+            f"({stats['bytes_saved']} saved) in {archive_dir}"
+        )
+
+    @app.cli.command("query-archive")
+    @click.option("--appointment-id", type=int, default=None)
+    @click.option("--month", default=None, help="YYYY-MM")
+    @click.option("--dir", "archive_dir", default=None)
+    def query_archive_cmd(appointment_id, month, archive_dir):
+        """Print archived appointment events as JSON lines."""
+        import json
+        from .services.event_archive import read_archive
+
+        for event in read_archive(archive_dir or _archive_dir(app), appointment_id=appointment_id, month=month):
+            click.echo(json.dumps(event, ensure_ascii=False))
+
+    @app.cli.command("import-appointments")
+    @click.argument("csv_file", type=click.File("r", encoding="utf-8-sig"))
+    @click.option("--chunk-size", default=2000, show_default=True, type=int)
+    @click.option("--rejects", "rejects_path", default="rejected_appointments.csv", show_default=True,
+                  help="Where to write rows that failed validation.")
+    def import_appointments_cmd(csv_file, chunk_size, rejects_path):
+        """Bulk-import appointments from CSV (patient_email,date,time,clinic_unit,status,notes,risk_score)."""
+        import csv
+        from .services.appointment_import import CSV_COLUMNS, ImportStopped, import_appointments
+
+        with open(rejects_path, "w", newline="", encoding="utf-8") as out:
+            writer = csv.writer(out)
+            writer.writerow(["line", "reason"] + CSV_COLUMNS)
+
+            def reject(line_no, row, reason):
+                writer.writerow([line_no, reason] + [row.get(c, "") for c in CSV_COLUMNS])
+
+            def report(chunk, accepted, read, elapsed):
+                click.echo(f"chunk {chunk}: {accepted}/{read} rows in {elapsed * 1000:.1f} ms")
+
+            try:
+                stats = import_appointments(csv_file, chunk_size=chunk_size, on_reject=reject, on_chunk=report)
+            except ImportStopped as e:
+                raise click.ClickException(f"Import stopped: {e}")
+
+        click.echo(
+            f"Imported {stats['imported']} of {stats['read']} rows ({stats['rejected']} rejected -> {rejects_path}) "
+            f"in {stats['seconds']:.2f}s ({stats['rows_per_sec']:.0f} rows/s)."
+        )
+
+    @app.cli.command("provision-users")
+    @click.argument("csv_file", type=click.File("r", encoding="utf-8-sig"))
+    @click.option("--batch-size", default=1000, show_default=True, type=int)
+    @click.option("--workers", default=None, type=int, help="Hashing processes (default: CPU count).")
+    @click.option("--rejects", "rejects_path", default="rejected_users.csv", show_default=True)
+    def provision_users_cmd(csv_file, batch_size, workers, rejects_path):
+        """Bulk-create users from CSV (email,full_name,role,password); existing emails are skipped."""
+        import csv
+        from .services.user_provisioning import CSV_COLUMNS, provision_users
+
+        with open(rejects_path, "w", newline="", encoding="utf-8") as out:
+            writer = csv.writer(out)
+            writer.writerow(["line", "reason"] + [c for c in CSV_COLUMNS if c != "password"])
+
+            def reject(line_no, row, reason):
+                writer.writerow([line_no, reason] + [row.get(c, "") for c in CSV_COLUMNS if c != "password"])
+
+            def report(stats, elapsed):
+                click.echo(
+                    f"batch {stats['batches']}: {stats['read']} read, {stats['created']} created, "
+                    f"{stats['skipped']} existing, {stats['rejected']} rejected ({elapsed:.2f}s)"
+                )
+
+            stats = provision_users(csv_file, batch_size=batch_size, workers=workers, on_reject=reject, on_batch=report)
+
+        click.echo(
+            f"Created {stats['created']} users, skipped {stats['skipped']} existing, rejected {stats['rejected']} "
+            f"in {stats['seconds']:.2f}s ({stats['rows_per_sec']:.0f} rows/s)."
+        )
+
+    @app.cli.command("rollup-page-views")
+    @click.option("--batch-size", default=20000, show_default=True, type=int)
+    @click.option("--lag-seconds", default=120, show_default=True, type=int,
+                  help="Leave views younger than this for the next run.")
+    @click.option("--gap-seconds", default=900, show_default=True, type=int,
+                  help="Wait this long for a missing lower id to commit before skipping it.")
+    def rollup_page_views_cmd(batch_size, lag_seconds, gap_seconds):
+        """Fold new page views and aggregate-mode counters into the daily per-page rollup (safe to run from cron)."""
+        from .services.pageview_rollup import rollup_page_view_counters, rollup_page_views
+
+        stats = rollup_page_views(batch_size=batch_size, lag_seconds=lag_seconds, gap_seconds=gap_seconds)
+        click.echo(f"Rolled up {stats['rows']} page views in {stats['seconds']:.2f}s (high-water mark {stats['last_id']}).")
+        counters = rollup_page_view_counters(lag_seconds=lag_seconds)
+        if counters["views"]:
+            click.echo(f"Folded {counters['views']} aggregate-mode views over {counters['days']} day(s); "
+                       "their sessions are unknown.")
+
+    @app.cli.command("rebuild-search-index")
+    def rebuild_search_index_cmd():
+        """Rebuild the full-text index over published sensitization posts."""
+        from .services.post_search import rebuild_index
+
+        click.echo(f"Indexed {rebuild_index()} published posts.")
+
+    @app.cli.command("backfill-post-html")
+    @click.option("--all", "all_posts", is_flag=True, help="Re-render every post, not just missing ones.")
+    @click.option("--batch-size", default=500, show_default=True, type=int)
+    def backfill_post_html_cmd(all_posts, batch_size):
+        """Render stored body HTML, excerpt and reading time for sensitization posts."""
+        from . import db
+        from .models import SensitizationPost
+        from .utils.post_render import prerender
+
+        last_id, done = 0, 0
+        while True:
+            q = SensitizationPost.query.filter(SensitizationPost.id > last_id)
+            if not all_posts:
+                q = q.filter(SensitizationPost.body_html.is_(None))
+            batch = q.order_by(SensitizationPost.id).limit(batch_size).all()
+            if not batch:
+                break
+            for p in batch:
+                prerender(p)
+            db.session.commit()
+            last_id = batch[-1].id
+            done += len(batch)
+        click.echo(f"Rendered {done} posts.")
+
+    @app.cli.command("build-assets")
+    @click.option("--page", "pages", multiple=True, default=["/", "/auth/login"],
+                  show_default=True, help="Pages to include in the bytes-saved report.")
+    def build_assets_cmd(pages):
+        """Fingerprint and precompress static files, write the manifest and report bytes saved per page."""
+        import os
+        from .services.static_assets import build_assets, page_report, static_assets
+
+        manifest = build_assets(app.static_folder)
+        raw = sum(e["bytes"] for e in manifest.values())
+        best = sum(min([e["bytes"], *e["encodings"].values()]) for e in manifest.values())
+        click.echo(f"Fingerprinted {len(manifest)} files: {raw} bytes, {best} bytes with best encoding.")
+
+        # report against the fresh manifest, as a restarted server would serve it
+        static_assets.load(os.path.join(app.static_folder, "dist", "manifest.json"))
+        if "static_assets" not in app.extensions:
+            static_assets.init_app(app)
+        click.echo(f"{'page':<24}{'files':>6}{'raw B':>10}{'sent B':>10}{'saved':>8}")
+        for row in page_report(app, pages):
+            if row["status"] != 200:
+                click.echo(f"{row['page']:<24} skipped (HTTP {row['status']})")
+                continue
+            pct = row["saved"] / row["raw"] if row["raw"] else 0.0
+            click.echo(f"{row['page']:<24}{row['files']:>6}{row['raw']:>10}{row['sent']:>10}{pct:>8.0%}")
+
+    @app.cli.command("check-query-plans")
+    @click.option("--verbose", "-v", is_flag=True, help="Print every plan, not just regressions.")
+    def check_query_plans_cmd(verbose):
+        """EXPLAIN the hot queries; exits non-zero if any of them reads a whole table."""
+        from .services.query_plans import check_query_plans
+
+        failed = 0
+        for r in check_query_plans():
+            if r["full_scans"]:
+                failed += 1
+                click.echo(f"FULL SCAN  {r['name']}: {', '.join(r['full_scans'])}")
+            elif verbose:
+                click.echo(f"ok         {r['name']}")
+            if verbose or r["full_scans"]:
+                for line in r["plan"]:
+                    click.echo(f"             {line}")
+        if failed:
+            raise click.ClickException(f"{failed} hot queries fall back to a full table scan.")
+        click.echo("No full table scans in hot query plans.")
+
+    @app.cli.command("generate-data")
+    @click.option("--users", default=0, show_default=True, type=int)
+    @click.option("--appointments", default=0, show_default=True, type=int, help="Events are added per appointment.")
+    @click.option("--posts", default=0, show_default=True, type=int)
+    @click.option("--page-views", default=0, show_default=True, type=int)
+    @click.option("--features", default=0, show_default=True, type=int,
+                  help="Clinical feature rows sampled from app/data/heart.csv, written to --features-out.")
+    @click.option("--features-out", default="instance/heart_synthetic.csv", show_default=True)
+    @click.option("--days", default=365, show_default=True, type=int, help="History window for dates and timestamps.")
+    @click.option("--fixed-units", is_flag=True,
+                  help="Book only into the existing clinic units instead of adding units to fit --appointments.")
+    @click.option("--chunk-size", default=5000, show_default=True, type=int)
+    @click.option("--seed", default=None, type=int)
+    @click.option("--password", default="Synthetic@123", show_default=True, help="Shared by every synthetic account.")
+    def generate_data_cmd(users, appointments, posts, page_views, features, features_out, days, fixed_units,
+                          chunk_size, seed, password):
+        """Bulk-generate synthetic users, appointments, events, posts and page views for scale testing."""
+        import os
+        import time
+        from . import db
+        from .services.post_search import rebuild_index
+        from .services.synthetic_data import SyntheticData, write_feature_rows
+
+        def report(table, rows, elapsed):
+            click.echo(f"{table}: {rows} rows, {rows / elapsed if elapsed else 0:.0f} rows/s")
+
+        db.create_all()
+        gen = SyntheticData(chunk_size=chunk_size, days=days, seed=seed, password=password, on_chunk=report)
+        started = time.perf_counter()
+        if users:
+            gen.users(users)
+        if posts:
+            gen.posts(posts)
+            click.echo(f"Indexed {rebuild_index()} published posts for search.")
+        if appointments:
+            try:
+                gen.appointments(appointments, add_units=not fixed_units)
+            except ValueError as e:
+                raise click.ClickException(str(e))
+        if page_views:
+            gen.page_views(page_views)
+        if features:
+            os.makedirs(os.path.dirname(os.path.abspath(features_out)), exist_ok=True)
+            write_feature_rows(features_out, features, seed=seed, sampler=gen.sampler)
+            click.echo(f"Wrote {features} clinical feature rows to {features_out}.")
+
+        elapsed = time.perf_counter() - started
+        total = sum(s["rows"] for s in gen.stats.values())
+        for table, s in gen.stats.items():
+            click.echo(f"{table:<20}{s['rows']:>10} rows {s['seconds']:>8.1f}s "
+                       f"{s['rows'] / s['seconds'] if s['seconds'] else 0:>9.0f} rows/s")
+        click.echo(f"Inserted {total} rows in {elapsed:.1f}s ({total / elapsed if elapsed else 0:.0f} rows/s).")
+
+
+def _archive_dir(app):
+    import os
+    return os.getenv("EVENT_ARCHIVE_DIR") or os.path.join(app.instance_path, "archive")
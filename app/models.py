@@ -1,7 +1,7 @@
 from datetime import datetime, date, time
 from enum import Enum
 from flask_login import UserMixin
-from . import db, login_manager
+from . import db
 
 class Role(Enum):
     PATIENT = "patient"
@@ -17,22 +17,32 @@ class User(db.Model, UserMixin):
     password_hash = db.Column(db.String(255), nullable=False)
     role = db.Column(db.String(50), nullable=False, default=Role.PATIENT.value)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # schedule exports cache on this too, so a renamed patient changes their ETag
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # signed into calendar-feed tokens; bumping it revokes every feed link issued so far
+    feed_token_version = db.Column(db.Integer, nullable=False, default=0, server_default="0")
 
     appointments = db.relationship("Appointment", backref="patient", lazy=True)
 
     def has_role(self, *roles: str) -> bool:
         return self.role in roles
 
-@login_manager.user_loader
-def load_user(user_id):
-    return User.query.get(int(user_id))
-
 class AppointmentStatus(Enum):
     BOOKED = "booked"
     CANCELLED = "cancelled"
     COMPLETED = "completed"
     NO_SHOW = "no_show"
 
+class ClinicUnit(db.Model):
+    __tablename__ = "clinic_units"
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(120), unique=True, nullable=False)
+    opens_at = db.Column(db.Time, nullable=False, default=time(9, 0))
+    closes_at = db.Column(db.Time, nullable=False, default=time(16, 0))  # last slot start
+    slot_minutes = db.Column(db.Integer, nullable=False, default=30)
+    capacity = db.Column(db.Integer, nullable=False, default=1)  # parallel bookings per slot
+    is_active = db.Column(db.Boolean, default=True)
+
 class Appointment(db.Model):
     __tablename__ = "appointments"
     id = db.Column(db.Integer, primary_key=True)
@@ -40,6 +50,7 @@ class Appointment(db.Model):
     appointment_date = db.Column(db.Date, nullable=False)
     appointment_time = db.Column(db.Time, nullable=False)
     clinic_unit = db.Column(db.String(120), nullable=True)
+    clinic_unit_id = db.Column(db.Integer, db.ForeignKey("clinic_units.id"), nullable=True)
     status = db.Column(db.String(30), nullable=False, default=AppointmentStatus.BOOKED.value)
     notes = db.Column(db.Text, nullable=True)
     
@@ -50,6 +61,15 @@ class Appointment(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     events = db.relationship("AppointmentEvent", backref="appointment", lazy=True, cascade="all, delete-orphan")
+    unit = db.relationship("ClinicUnit", lazy=True)
+
+    __table_args__ = (
+        # keyset pagination for a patient's list and the day schedule
+        db.Index("ix_appointments_patient_date_time", "patient_id", "appointment_date", "appointment_time"),
+        db.Index("ix_appointments_date_status", "appointment_date", "status"),
+        # dashboard risk breakdown over a date range, answered from the index alone
+        db.Index("ix_appointments_date_risk", "appointment_date", "risk_score"),
+    )
 
     @property
     def slot_key(self):
@@ -63,15 +83,50 @@ class AppointmentEvent(db.Model):
     event_time = db.Column(db.DateTime, default=datetime.utcnow)
     notes = db.Column(db.Text, nullable=True)
 
+    __table_args__ = (
+        db.Index("ix_appointment_events_appointment_time", "appointment_id", "event_time"),
+    )
+
+class WaitlistStatus(Enum):
+    WAITING = "waiting"
+    ALLOCATED = "allocated"
+    WITHDRAWN = "withdrawn"
+
+class WaitlistEntry(db.Model):
+    __tablename__ = "waitlist_entries"
+    id = db.Column(db.Integer, primary_key=True)
+    patient_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    desired_date = db.Column(db.Date, nullable=True)  # None = any day
+    risk_score = db.Column(db.Float, nullable=True)
+    status = db.Column(db.String(30), nullable=False, default=WaitlistStatus.WAITING.value, index=True)
+    appointment_id = db.Column(db.Integer, db.ForeignKey("appointments.id"), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    allocated_at = db.Column(db.DateTime, nullable=True)
+
+    patient = db.relationship("User", backref="waitlist_entries", lazy=True)
+
 class SensitizationPost(db.Model):
     __tablename__ = "sens_posts"
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(255), nullable=False)
     slug = db.Column(db.String(255), unique=True, nullable=False)
     body = db.Column(db.Text, nullable=False)
+    # rendered from body on save (utils.post_render.prerender); NULL until backfilled
+    body_html = db.Column(db.Text, nullable=True)
+    excerpt = db.Column(db.String(300), nullable=True)
+    reading_minutes = db.Column(db.Integer, nullable=True)
     image = db.Column(db.String(120), nullable=True)
     is_published = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # content version for the page cache; shared by every worker because it lives in the row
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        # published listing, newest first
+        db.Index("ix_sens_posts_published_created", "is_published", "created_at"),
+        # count + max(updated_at) of published posts, the index page's cache version
+        db.Index("ix_sens_posts_published_updated", "is_published", "updated_at"),
+    )
 
 class PageView(db.Model):
     __tablename__ = "page_views"
@@ -80,3 +135,41 @@ class PageView(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=True)
     session_id = db.Column(db.String(64), nullable=True)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # time-window reports grouped by page
+        db.Index("ix_page_views_timestamp_page", "timestamp", "page"),
+    )
+
+class PageViewCounter(db.Model):
+    """Per-page, per-minute view counts written by the buffered logger in aggregate mode."""
+    __tablename__ = "page_view_counters"
+    id = db.Column(db.Integer, primary_key=True)
+    page = db.Column(db.String(255), nullable=False)
+    minute = db.Column(db.DateTime, nullable=False)
+    views = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint("page", "minute", name="uq_page_view_counters_page_minute"),
+    )
+
+class RollupState(db.Model):
+    """High-water marks for incremental rollup jobs."""
+    __tablename__ = "rollup_state"
+    name = db.Column(db.String(60), primary_key=True)
+    last_id = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class PageViewDaily(db.Model):
+    """Daily per-page rollup of PageView; sessions_hll is a HyperLogLog sketch of session ids."""
+    __tablename__ = "page_view_daily"
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False)
+    page = db.Column(db.String(255), nullable=False)
+    post_slug = db.Column(db.String(255), nullable=True)
+    views = db.Column(db.Integer, nullable=False, default=0)
+    sessions_hll = db.Column(db.LargeBinary, nullable=True)
+
+    __table_args__ = (
+        db.UniqueConstraint("day", "page", name="uq_page_view_daily_day_page"),
+    )
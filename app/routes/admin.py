@@ -1,13 +1,50 @@
-from datetime import datetime, timedelta, date
+import io
+from datetime import datetime, timedelta, date, timezone
 
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask import Blueprint, Response, abort, current_app, render_template, request, redirect, send_from_directory, stream_with_context, url_for, flash, jsonify
 from flask_login import login_required, current_user
+from itsdangerous import BadSignature, URLSafeSerializer
+from sqlalchemy.orm import joinedload
 
 from .. import db
 from ..models import Appointment, AppointmentStatus, AppointmentEvent, Role, User
+from ..services.occupancy import occupancy
+from ..services.scheduling import active_units, invalidate_for
+from ..services.appointment_import import CSV_COLUMNS, ImportStopped, import_appointments
+from ..services.pageview_rollup import reach_report
+from ..services.profiler import EXTENSIONS as PROFILE_EXTENSIONS, MODES as PROFILE_MODES, list_profiles, make_token
+from ..services.schedule_export import export_validators, iter_csv, iter_ical
+from ..services.waitlist import offer_freed_slot
+from ..utils.pagination import decode_cursor, encode_cursor, decode_event_cursor, encode_event_cursor, keyset_page
+
+SCHEDULE_PAGE_SIZE = 50
+TIMELINE_PAGE_SIZE = 25
+EXPORT_MAX_DAYS = 366
+IMPORT_REJECTS_SHOWN = 200
 
 bp = Blueprint("admin", __name__, url_prefix="/admin")
 
+SCHEDULE_KEYS = (Appointment.appointment_date, Appointment.appointment_time, Appointment.id)
+TIMELINE_KEYS = (AppointmentEvent.event_time, AppointmentEvent.id)
+
+
+def schedule_query(day):
+    """One day's appointments with their patients; paged by SCHEDULE_KEYS."""
+    return Appointment.query.options(joinedload(Appointment.patient)).filter_by(appointment_date=day)
+
+
+def timeline_query(appt_id):
+    """An appointment's events; paged by TIMELINE_KEYS."""
+    return AppointmentEvent.query.filter_by(appointment_id=appt_id)
+
+
+def dashboard_query(date_from, date_to):
+    """Appointments in the dashboard window; each card counts a filtered copy."""
+    return Appointment.query.filter(
+        Appointment.appointment_date >= date_from,
+        Appointment.appointment_date <= date_to,
+    )
+
 
 def _require_roles(*roles):
     if not current_user.is_authenticated or current_user.role not in roles:
@@ -31,13 +68,21 @@ def schedule():
     else:
         day = date.today()
 
-    appts = (
-        Appointment.query
-        .filter_by(appointment_date=day)
-        .order_by(Appointment.appointment_time.asc())
-        .all()
+    cursor = decode_cursor(request.args.get("after"))
+    if cursor is not None and cursor[0] != day:
+        cursor = None
+
+    appts, has_more = keyset_page(schedule_query(day), SCHEDULE_KEYS, cursor, SCHEDULE_PAGE_SIZE)
+    next_cursor = encode_cursor(appts[-1]) if has_more else None
+    return render_template(
+        "admin/schedule.html",
+        appts=appts,
+        day=day,
+        next_cursor=next_cursor,
+        paged=cursor is not None,
+        units=active_units(),
+        feed_token=_feed_token(db.session.get(User, current_user.id)),
     )
-    return render_template("admin/schedule.html", appts=appts, day=day)
 
 
 @bp.post("/appointments/<int:appt_id>/status")
@@ -53,6 +98,7 @@ def update_status(appt_id):
         flash("Invalid status.", "danger")
         return redirect(url_for("admin.schedule"))
 
+    old_status = appt.status
     appt.status = new_status
     db.session.add(
         AppointmentEvent(
@@ -62,11 +108,189 @@ def update_status(appt_id):
         )
     )
     db.session.commit()
+    invalidate_for(appt)
+
+    if old_status == AppointmentStatus.BOOKED.value and new_status in (
+        AppointmentStatus.CANCELLED.value, AppointmentStatus.NO_SHOW.value
+    ):
+        offer_freed_slot(appt.appointment_date, appt.appointment_time, appt.clinic_unit_id)
 
     flash("Status updated.", "success")
     return redirect(url_for("admin.schedule", day=appt.appointment_date.isoformat()))
 
 
+@bp.get("/appointments/<int:appt_id>/timeline")
+@login_required
+def timeline(appt_id):
+    if not _require_roles(Role.ADMIN.value, Role.CLINICIAN.value):
+        return redirect(url_for("core.index"))
+
+    appt = Appointment.query.get_or_404(appt_id)
+    cursor = decode_event_cursor(request.args.get("after"))
+    events, has_more = keyset_page(timeline_query(appt.id), TIMELINE_KEYS, cursor, TIMELINE_PAGE_SIZE)
+    next_cursor = encode_event_cursor(events[-1]) if has_more else None
+    return render_template(
+        "admin/timeline.html",
+        appt=appt,
+        events=events,
+        next_cursor=next_cursor,
+        paged=cursor is not None,
+    )
+
+
+def _feed_serializer():
+    return URLSafeSerializer(current_app.config["SECRET_KEY"], salt="schedule-feed")
+
+
+def _feed_token(user):
+    return _feed_serializer().dumps([user.id, user.feed_token_version])
+
+
+def _feed_user():
+    """Session user, or the staff user a calendar-subscription token was issued to (unless since reset)."""
+    if current_user.is_authenticated:
+        return current_user
+    token = request.args.get("token", "")
+    if not token:
+        return None
+    try:
+        user_id, version = _feed_serializer().loads(token)
+        user = db.session.get(User, int(user_id))
+    except (BadSignature, ValueError, TypeError):
+        return None
+    if user is None or user.feed_token_version != version:
+        return None
+    return user
+
+
+@bp.post("/feed-token/reset")
+@login_required
+def reset_feed_token():
+    if not _require_roles(Role.ADMIN.value, Role.CLINICIAN.value):
+        return redirect(url_for("core.index"))
+    user = db.session.get(User, current_user.id)
+    user.feed_token_version += 1
+    db.session.commit()
+    flash("Calendar feed link reset. Subscribe again with the new link; the old one no longer works.", "success")
+    return redirect(url_for("admin.schedule"))
+
+
+def _parse_day(value, default):
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date() if value else default
+    except ValueError:
+        return default
+
+
+@bp.get("/export/schedule.<fmt>")
+def export_schedule(fmt):
+    if fmt not in ("ics", "csv"):
+        abort(404)
+    user = _feed_user()
+    if user is None or user.role not in (Role.ADMIN.value, Role.CLINICIAN.value):
+        abort(403)
+
+    date_from = _parse_day(request.args.get("from", "").strip(), date.today())
+    date_to = _parse_day(request.args.get("to", "").strip(), date_from + timedelta(days=30))
+    date_to = min(max(date_to, date_from), date_from + timedelta(days=EXPORT_MAX_DAYS))
+    unit_id = request.args.get("unit", type=int)
+
+    etag, last_modified = export_validators(date_from, date_to, unit_id, fmt)
+    if last_modified is not None:
+        last_modified = last_modified.replace(microsecond=0, tzinfo=timezone.utc)
+
+    not_modified = (
+        request.if_none_match.contains(etag)
+        if request.if_none_match
+        else bool(last_modified and request.if_modified_since and request.if_modified_since >= last_modified)
+    )
+    if not_modified:
+        resp = Response(status=304)
+    elif fmt == "ics":
+        resp = Response(stream_with_context(iter_ical(date_from, date_to, unit_id, host=request.host)),
+                        mimetype="text/calendar")
+    else:
+        resp = Response(stream_with_context(iter_csv(date_from, date_to, unit_id)), mimetype="text/csv")
+        resp.headers["Content-Disposition"] = f"attachment; filename=schedule-{date_from}-{date_to}.csv"
+
+    resp.set_etag(etag)
+    if last_modified is not None:
+        resp.last_modified = last_modified
+    resp.headers["Cache-Control"] = "private, no-cache"
+    return resp
+
+
+@bp.route("/import", methods=["GET", "POST"])
+@login_required
+def import_schedule():
+    if not _require_roles(Role.ADMIN.value):
+        return redirect(url_for("core.index"))
+
+    if request.method == "GET":
+        return render_template("admin/import.html", columns=CSV_COLUMNS, stats=None, rejects=[])
+
+    upload = request.files.get("file")
+    if not upload or not upload.filename:
+        flash("Choose a CSV file to import.", "warning")
+        return redirect(url_for("admin.import_schedule"))
+
+    rejects = []
+
+    def reject(line_no, row, reason):
+        if len(rejects) < IMPORT_REJECTS_SHOWN:
+            rejects.append((line_no, reason, row))
+
+    stream = io.TextIOWrapper(upload.stream, encoding="utf-8-sig", newline="")
+    try:
+        stats = import_appointments(stream, on_reject=reject)
+    except ImportStopped as e:
+        flash(f"Import stopped: {e}", "danger")
+        return render_template("admin/import.html", columns=CSV_COLUMNS, stats=e.stats, rejects=rejects)
+
+    flash(f"Imported {stats['imported']} of {stats['read']} rows ({stats['rejected']} rejected).", "success")
+    return render_template("admin/import.html", columns=CSV_COLUMNS, stats=stats, rejects=rejects)
+
+
+@bp.get("/reach")
+@login_required
+def reach():
+    if not _require_roles(Role.ADMIN.value, Role.PUBLIC_HEALTH.value):
+        return redirect(url_for("core.index"))
+
+    date_to = _parse_day(request.args.get("to", "").strip(), date.today())
+    date_from = _parse_day(request.args.get("from", "").strip(), date_to - timedelta(days=30))
+    report = reach_report(date_from, min(date_to, date_from + timedelta(days=EXPORT_MAX_DAYS)))
+    return render_template("admin/reach.html", report=report, date_from=date_from, date_to=date_to)
+
+
+@bp.get("/profiles")
+@login_required
+def profiles():
+    if not _require_roles(Role.ADMIN.value):
+        return redirect(url_for("core.index"))
+    runs = list_profiles(current_app.config["PROFILE_DIR"])
+    tokens = {mode: make_token(current_app, mode) for mode in PROFILE_MODES}
+    return render_template("admin/profiles.html", runs=runs, tokens=tokens)
+
+
+@bp.get("/profiles/<name>")
+@login_required
+def profile_file(name):
+    if not _require_roles(Role.ADMIN.value):
+        return redirect(url_for("core.index"))
+    if "/" in name or not name.endswith(PROFILE_EXTENSIONS):
+        abort(404)
+    return send_from_directory(current_app.config["PROFILE_DIR"], name, as_attachment=True)
+
+
+@bp.get("/metrics/occupancy")
+@login_required
+def occupancy_metrics():
+    if not _require_roles(Role.ADMIN.value):
+        return redirect(url_for("core.index"))
+    return jsonify(occupancy.stats())
+
+
 @bp.get("/dashboard")
 @login_required
 def dashboard():
@@ -88,10 +312,7 @@ def dashboard():
     date_to = selected_date
     date_from = date_to - timedelta(days=30)
 
-    q = Appointment.query.filter(
-        Appointment.appointment_date >= date_from,
-        Appointment.appointment_date <= date_to,
-    )
+    q = dashboard_query(date_from, date_to)
 
     total = q.count()
     completed = q.filter(Appointment.status == AppointmentStatus.COMPLETED.value).count()
@@ -1,42 +1,29 @@
-from datetime import date, datetime, time, timedelta
+from datetime import date, datetime
 from flask import Blueprint, render_template, request, redirect, url_for, flash
 from flask_login import login_required, current_user
 from .. import db
-from ..models import Appointment, AppointmentStatus, AppointmentEvent, Role, User
+from ..models import Appointment, AppointmentStatus, AppointmentEvent, Role, WaitlistEntry, WaitlistStatus
+from ..services.scheduling import active_units, default_unit, free_slots, has_capacity, invalidate_for, resolve_unit, within_hours
+from ..services.waitlist import join_waitlist, offer_freed_slot
+from ..utils.pagination import decode_cursor, encode_cursor, keyset_page
+
+PAGE_SIZE = 20
 
 bp = Blueprint("appointments", __name__, url_prefix="/appointments")
 
-def _recommended_slots_for_date(appt_date, max_items=5):
+MY_KEYS = (Appointment.appointment_date, Appointment.appointment_time, Appointment.id)
+
+def my_appointments_query(patient_id):
+    """A patient's appointments; paged newest first by MY_KEYS."""
+    return Appointment.query.filter_by(patient_id=patient_id)
+
+def _recommended_slots_for_date(appt_date, max_items=5, unit=None):
     """
     Returns a list of time objects representing earliest available slots on appt_date.
-    Assumes clinic working hours 09:00 to 16:00, 30-min step.
+    Uses the unit's working hours, slot length and capacity (default unit if none given).
     """
-    start_t = time(9, 0)
-    end_t = time(16, 0)
-    step_minutes = 30
-
-    # Pull already-booked times for that day (exclude cancelled)
-    existing = Appointment.query.filter(
-        Appointment.appointment_date == appt_date,
-        Appointment.status != AppointmentStatus.CANCELLED.value,
-    ).all()
-
-    booked = set(a.appointment_time for a in existing)
-
-    slots = []
-    dt_cursor = datetime.combine(appt_date, start_t)
-    dt_end = datetime.combine(appt_date, end_t)
-
-    while dt_cursor <= dt_end and len(slots) < max_items:
-        t = dt_cursor.time()
-        if t not in booked:
-            slots.append(t)
-        dt_cursor += timedelta(minutes=step_minutes)
-
-    return slots
-
-WORK_START = time(9, 0)
-WORK_END = time(16, 0)
+    unit = unit or default_unit()
+    return free_slots(unit, appt_date, max_items=max_items)
 
 def _parse_time(hhmm: str):
     return datetime.strptime(hhmm, "%H:%M").time()
@@ -47,17 +34,31 @@ def list_my():
     if current_user.has_role(Role.ADMIN.value, Role.CLINICIAN.value, Role.PUBLIC_HEALTH.value):
         flash("Use the admin schedule to view all appointments.", "info")
         return redirect(url_for("admin.schedule"))
-    appts = Appointment.query.filter_by(patient_id=current_user.id).order_by(
-        Appointment.appointment_date.desc(), Appointment.appointment_time.desc()
-    ).all()
-    return render_template("appointments/list.html", appts=appts)
+    appts, has_more = keyset_page(
+        my_appointments_query(current_user.id),
+        MY_KEYS,
+        decode_cursor(request.args.get("after")),
+        PAGE_SIZE,
+        descending=True,
+    )
+    next_cursor = encode_cursor(appts[-1]) if has_more else None
+    waiting = WaitlistEntry.query.filter_by(
+        patient_id=current_user.id, status=WaitlistStatus.WAITING.value
+    ).order_by(WaitlistEntry.created_at.asc()).all()
+    return render_template(
+        "appointments/list.html",
+        appts=appts,
+        waiting=waiting,
+        next_cursor=next_cursor,
+        paged=bool(request.args.get("after")),
+    )
 
 @bp.get("/new")
 @login_required
 def new():
     risk_score = request.args.get("risk_score")
     risk_level = request.args.get("risk_level")
-    return render_template("appointments/new.html", risk_score=risk_score, risk_level=risk_level)
+    return render_template("appointments/new.html", risk_score=risk_score, risk_level=risk_level, units=active_units())
 
     risk_score_str = request.args.get("risk_score", "").strip()
     risk_score = None
@@ -92,7 +93,7 @@ def create():
 
     date_str = request.form.get("appointment_date", "").strip()
     time_str = request.form.get("appointment_time", "").strip()
-    clinic_unit = request.form.get("clinic_unit", "").strip() or None
+    unit = resolve_unit(request.form.get("clinic_unit_id", "").strip() or None)
     notes = request.form.get("notes", "").strip() or None
     
     
@@ -116,25 +117,25 @@ def create():
         return redirect(url_for("appointments.new"))
 
     # working hours rule
-    if not (WORK_START <= appt_time <= WORK_END):
-        flash("Appointment time must be within clinic hours (09:00–16:00).", "danger")
+    if not within_hours(unit, appt_time):
+        flash(
+            f"Appointment time must be within {unit.name} hours "
+            f"({unit.opens_at.strftime('%H:%M')}–{unit.closes_at.strftime('%H:%M')}).",
+            "danger",
+        )
         return redirect(url_for("appointments.new"))
 
-    # prevent slot conflicts across ALL patients
-    conflict = Appointment.query.filter_by(
-        appointment_date=appt_date,
-        appointment_time=appt_time,
-    ).filter(Appointment.status.in_([AppointmentStatus.BOOKED.value, AppointmentStatus.COMPLETED.value])).first()
-
-    if conflict:
-        flash("That slot is already booked. Please choose another time.", "warning")
+    # prevent overbooking the unit's slot across ALL patients
+    if not has_capacity(unit, appt_date, appt_time):
+        flash("That slot is already booked. Please choose another time or join the waitlist.", "warning")
         return redirect(url_for("appointments.new"))
 
     appt = Appointment(
         patient_id=current_user.id,
         appointment_date=appt_date,
         appointment_time=appt_time,
-        clinic_unit=clinic_unit,
+        clinic_unit=unit.name,
+        clinic_unit_id=unit.id,
         notes=notes,
         status=AppointmentStatus.BOOKED.value,
         risk_score=risk_score,
@@ -154,6 +155,7 @@ def create():
         ))
 
     db.session.commit()
+    invalidate_for(appt)
 
     flash("Appointment booked.", "success")
     return redirect(url_for("appointments.list_my"))
@@ -173,5 +175,49 @@ def cancel(appt_id):
     appt.status = AppointmentStatus.CANCELLED.value
     db.session.add(AppointmentEvent(appointment_id=appt.id, event_type="cancelled", notes="Cancelled"))
     db.session.commit()
+    invalidate_for(appt)
+    offer_freed_slot(appt.appointment_date, appt.appointment_time, appt.clinic_unit_id)
     flash("Appointment cancelled.", "success")
     return redirect(url_for("appointments.list_my" if current_user.has_role(Role.PATIENT.value) else "admin.schedule"))
+
+@bp.post("/waitlist")
+@login_required
+def waitlist_join():
+    if not current_user.has_role(Role.PATIENT.value):
+        flash("Only patients can join the waitlist.", "warning")
+        return redirect(url_for("admin.schedule"))
+
+    date_str = request.form.get("desired_date", "").strip()
+    desired_date = None
+    if date_str:
+        try:
+            desired_date = datetime.strptime(date_str, "%Y-%m-%d").date()
+        except Exception:
+            flash("Invalid date.", "danger")
+            return redirect(url_for("appointments.new"))
+
+    risk_score = None
+    risk_score_str = request.form.get("risk_score", "").strip()
+    if risk_score_str:
+        try:
+            risk_score = float(risk_score_str)
+        except Exception:
+            risk_score = None
+
+    join_waitlist(current_user.id, desired_date=desired_date, risk_score=risk_score)
+    flash("You are on the waitlist. A slot will be booked for you when one frees up.", "success")
+    return redirect(url_for("appointments.list_my"))
+
+@bp.post("/waitlist/<int:entry_id>/withdraw")
+@login_required
+def waitlist_withdraw(entry_id):
+    entry = WaitlistEntry.query.get_or_404(entry_id)
+    if entry.patient_id != current_user.id:
+        flash("Not authorised.", "danger")
+        return redirect(url_for("core.index"))
+
+    if entry.status == WaitlistStatus.WAITING.value:
+        entry.status = WaitlistStatus.WITHDRAWN.value
+        db.session.commit()
+        flash("Removed from the waitlist.", "success")
+    return redirect(url_for("appointments.list_my"))
@@ -1,11 +1,15 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash
 from flask_login import login_user, logout_user, login_required, current_user
-from werkzeug.security import check_password_hash, generate_password_hash
 from .. import db
 from ..models import User, Role
+from ..services.passwords import HashingBusy, hash_password, needs_rehash, verify_password
+from ..services.rate_limit import email_limiter, ip_limiter
 
 bp = Blueprint("auth", __name__, url_prefix="/auth")
 
+def user_by_email_query(email):
+    return User.query.filter_by(email=email)
+
 @bp.get("/login")
 def login():
     if current_user.is_authenticated:
@@ -19,14 +23,35 @@ def login_post():
     password = request.form.get("password", "")
     next_url = request.form.get("next", "").strip()
 
-    user = User.query.filter_by(email=email).first()
-    if not user or not check_password_hash(user.password_hash, password):
-        flash("Invalid email or password.", "danger")
+    # shed floods before touching the DB or the hasher
+    if not ip_limiter.allow(f"ip:{request.remote_addr}") or not email_limiter.allow(f"email:{email}"):
+        flash("Too many sign-in attempts. Please wait a moment and try again.", "warning")
+        if next_url:
+            return redirect(url_for("auth.login", next=next_url))
+        return redirect(url_for("auth.login"))
+
+    user = user_by_email_query(email).first()
+    try:
+        ok = bool(user) and verify_password(user.password_hash, password)
+    except HashingBusy as e:
+        flash(str(e), "warning")
+        ok = None
+    if not ok:
+        if ok is False:
+            flash("Invalid email or password.", "danger")
         # keep next in the URL so it isn't lost
         if next_url:
             return redirect(url_for("auth.login", next=next_url))
         return redirect(url_for("auth.login"))
 
+    # transparently move old hashes to the current work factor
+    if needs_rehash(user.password_hash):
+        try:
+            user.password_hash = hash_password(password)
+            db.session.commit()
+        except HashingBusy:
+            pass
+
     login_user(user)
 
     # redirect to original destination if provided
@@ -49,22 +74,36 @@ def register_post():
     password = request.form.get("password", "")
     next_url = request.form.get("next", "").strip()
 
+    if not ip_limiter.allow(f"ip:{request.remote_addr}"):
+        flash("Too many requests. Please wait a moment and try again.", "warning")
+        if next_url:
+            return redirect(url_for("auth.register", next=next_url))
+        return redirect(url_for("auth.register"))
+
     if not full_name or not email or not password:
         flash("All fields are required.", "danger")
         if next_url:
             return redirect(url_for("auth.register", next=next_url))
         return redirect(url_for("auth.register"))
 
-    if User.query.filter_by(email=email).first():
+    if user_by_email_query(email).first():
         flash("Email already registered.", "warning")
         if next_url:
             return redirect(url_for("auth.register", next=next_url))
         return redirect(url_for("auth.register"))
 
+    try:
+        pw_hash = hash_password(password)
+    except HashingBusy as e:
+        flash(str(e), "warning")
+        if next_url:
+            return redirect(url_for("auth.register", next=next_url))
+        return redirect(url_for("auth.register"))
+
     u = User(
         full_name=full_name,
         email=email,
-        password_hash=generate_password_hash(password),
+        password_hash=pw_hash,
         role=Role.PATIENT.value,
     )
     db.session.add(u)
@@ -1,7 +1,33 @@
-from flask import Blueprint, render_template
+from flask import Blueprint, jsonify, render_template
 from flask_login import current_user
+from sqlalchemy import text
+from .. import db
+from ..services.predictor import get_predictor
 bp = Blueprint("core", __name__)
 
 @bp.get("/")
 def index():
     return render_template("index.html")
+
+@bp.get("/healthz")
+def healthz():
+    # liveness only: the process is up and serving requests
+    return jsonify(status="ok")
+
+@bp.get("/readyz")
+def readyz():
+    """Ready when the model is loaded and the database answers; 503 otherwise."""
+    predictor = get_predictor()
+    checks = {"model": predictor.ready(), "database": True}
+    detail = {}
+    if predictor.load_error:
+        detail["model"] = predictor.load_error
+    try:
+        db.session.execute(text("SELECT 1"))
+    except Exception as e:
+        checks["database"] = False
+        detail["database"] = type(e).__name__
+    finally:
+        db.session.rollback()
+    ready = all(checks.values())
+    return jsonify(status="ready" if ready else "unavailable", checks=checks, detail=detail), 200 if ready else 503
@@ -1,7 +1,6 @@
-import os
 from flask import Blueprint, render_template, request, flash, redirect, url_for
 from flask_login import current_user
-from ..services.predictor import HeartPredictor
+from ..services.predictor import get_predictor
 
 bp = Blueprint("prediction", __name__, url_prefix="/predict")
 
@@ -10,9 +9,8 @@ LOW_RISK_MAX = 0.30        # < 30%
 MODERATE_RISK_MAX = 0.70   # 30–70%
 
 def _predictor():
-    model_path = os.getenv("HEART_MODEL_PATH", "models/heart_xgb.pkl")
-    feats_path = os.getenv("HEART_FEATURES_PATH", "models/heart_features.json")
-    return HeartPredictor(model_path=model_path, features_path=feats_path)
+    # loaded once per process instead of unpickling the model on every request
+    return get_predictor()
 from flask import redirect, url_for
 
 def interpret_risk(proba: float):
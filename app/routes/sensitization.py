@@ -1,8 +1,17 @@
+import os
 import re
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask import Blueprint, abort, render_template, request, redirect, url_for, flash, make_response, send_from_directory, session
 from flask_login import login_required, current_user
+from markupsafe import Markup
+from sqlalchemy import func, select
+from sqlalchemy.orm import defer
 from .. import db
-from ..models import SensitizationPost, PageView, Role
+from ..models import SensitizationPost, Role
+from ..services.images import MEDIA_NAME, ImageUploadError, media_dir, store_upload
+from ..services.page_cache import page_cache
+from ..services.pageview_buffer import page_views
+from ..services.post_search import index_post, remove_post, search_posts
+from ..utils.post_render import plain_excerpt, prerender, reading_minutes, render_body
 
 bp = Blueprint("sensitization", __name__, url_prefix="/sensitization")
 
@@ -13,11 +22,53 @@ def slugify(s: str) -> str:
     return s[:240] or "post"
 
 def log_view(page: str):
-    try:
-        db.session.add(PageView(page=page, user_id=getattr(current_user, "id", None), session_id=request.cookies.get("session", None)))
-        db.session.commit()
-    except Exception:
-        db.session.rollback()
+    # buffered; written in bulk by a background thread so the request never takes the write lock
+    page_views.record(page, user_id=getattr(current_user, "id", None), session_id=request.cookies.get("session", None))
+
+INDEX_KEY = "index"
+
+def _post_key(slug):
+    return f"post:{slug}"
+
+def published_posts_query():
+    """The index listing, newest first, without the post bodies."""
+    return (
+        SensitizationPost.query
+        .options(defer(SensitizationPost.body), defer(SensitizationPost.body_html))
+        .filter_by(is_published=True)
+        .order_by(SensitizationPost.created_at.desc())
+    )
+
+def published_post_query(slug):
+    return SensitizationPost.query.filter_by(slug=slug, is_published=True)
+
+def _index_version():
+    # an edit, (un)publish or new post moves max(updated_at); a deletion moves the count
+    return tuple(db.session.execute(
+        select(func.count(), func.max(SensitizationPost.updated_at))
+        .where(SensitizationPost.is_published.is_(True))
+    ).one())
+
+def _post_version(slug):
+    # None once the post is deleted
+    return db.session.execute(
+        select(SensitizationPost.updated_at).where(SensitizationPost.slug == slug)
+    ).scalar()
+
+def cached_page(key, version, render):
+    """Serves a rendered page from page_cache with a strong ETag; a matching If-None-Match gets 304."""
+    if session.get("_flashes"):
+        # pending flash messages are part of this one render only
+        body = render()
+        etag = page_cache.etag_for(body)
+    else:
+        variant = current_user.get_id() if current_user.is_authenticated else None
+        body, etag = page_cache.get(key, version, variant, render)
+    resp = make_response(body)
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "private, no-cache" if current_user.is_authenticated else "public, no-cache"
+    resp.vary.add("Cookie")
+    return resp.make_conditional(request)
 
 def seed_posts_if_empty():
     # Only seed once
@@ -77,6 +128,8 @@ def seed_posts_if_empty():
         ),
     ]
 
+    for p in seed:
+        prerender(p)
     db.session.add_all(seed)
     db.session.commit()
 
@@ -96,25 +149,78 @@ def seed_posts_if_empty():
     ]
 
     for title, slug, body in data:
-        db.session.add(SensitizationPost(title=title, slug=slug, body=body, is_published=True))
+        db.session.add(prerender(SensitizationPost(title=title, slug=slug, body=body, is_published=True)))
     db.session.commit()
 
 @bp.get("/")
 def index():
     log_view("/sensitization")
-    posts = (
-        SensitizationPost.query
-        .filter_by(is_published=True)
-        .order_by(SensitizationPost.created_at.desc())
-        .all()
-    )
-    return render_template("sensitization/index.html", posts=posts)
+
+    def render():
+        posts = published_posts_query().all()
+        # rows not backfilled yet: one query for their bodies instead of a lazy load per card
+        missing = [p.id for p in posts if p.excerpt is None]
+        excerpts = {
+            pid: plain_excerpt(body)
+            for pid, body in db.session.query(SensitizationPost.id, SensitizationPost.body)
+            .filter(SensitizationPost.id.in_(missing))
+        } if missing else {}
+        return render_template("sensitization/index.html", posts=posts, excerpts=excerpts)
+
+    return cached_page(INDEX_KEY, _index_version(), render)
+
+SEARCH_PAGE_SIZE = 20
+
+@bp.get("/search")
+def search():
+    q = request.args.get("q", "").strip()[:200]
+    page = max(request.args.get("page", 1, type=int), 1)
+    log_view("/sensitization/search")
+    results = search_posts(q, limit=SEARCH_PAGE_SIZE + 1, offset=(page - 1) * SEARCH_PAGE_SIZE) if q else []
+    has_next = len(results) > SEARCH_PAGE_SIZE
+    return render_template("sensitization/search.html", q=q, results=results[:SEARCH_PAGE_SIZE],
+                           page=page, has_next=has_next)
 
 @bp.get("/post/<slug>")
 def post(slug):
     log_view(f"/sensitization/post/{slug}")
-    p = SensitizationPost.query.filter_by(slug=slug, is_published=True).first_or_404()
-    return render_template("sensitization/post.html", post=p)
+
+    def render():
+        p = published_post_query(slug).first_or_404()
+        body_html = p.body_html if p.body_html is not None else render_body(p.body)
+        minutes = p.reading_minutes or reading_minutes(p.body)
+        return render_template("sensitization/post.html", post=p, body_html=Markup(body_html), minutes=minutes)
+
+    return cached_page(_post_key(slug), _post_version(slug), render)
+
+MEDIA_MAX_AGE = 365 * 24 * 3600
+
+@bp.get("/media/<name>")
+def media(name):
+    m = MEDIA_NAME.match(name)
+    if not m:
+        abort(404)
+    directory = media_dir()
+    if os.path.exists(os.path.join(directory, name)):
+        # content-hash names never change, so clients can keep them for a year
+        resp = send_from_directory(directory, name, max_age=MEDIA_MAX_AGE)
+        resp.cache_control.immutable = True
+        resp.cache_control.public = True
+        return resp
+    original = f"{m['digest']}.{m['ext']}"
+    if m["width"] and os.path.exists(os.path.join(directory, original)):
+        # resized copy not written yet: serve the original, but don't let it be cached under this name
+        resp = send_from_directory(directory, original, max_age=0)
+        resp.cache_control.no_cache = True
+        return resp
+    abort(404)
+
+def _image_from_form():
+    """An uploaded file wins over the typed filename; raises ImageUploadError for bad uploads."""
+    upload = request.files.get("image_file")
+    if upload and upload.filename:
+        return store_upload(upload)
+    return request.form.get("image", "").strip() or None
 
 @bp.get("/admin")
 @login_required
@@ -146,16 +252,22 @@ def admin_create():
         flash("Title and body are required.", "danger")
         return redirect(url_for("sensitization.admin_new"))
     slug = slugify(title)
-    image = request.form.get("image", "").strip() or None
+    try:
+        image = _image_from_form()
+    except ImageUploadError as e:
+        flash(str(e), "danger")
+        return redirect(url_for("sensitization.admin_new"))
     # ensure unique slug
     i = 2
     base = slug
     while SensitizationPost.query.filter_by(slug=slug).first():
         slug = f"{base}-{i}"
         i += 1
-    p = SensitizationPost(title=title, slug=slug, body=body, image=image, is_published=is_published)
+    p = prerender(SensitizationPost(title=title, slug=slug, body=body, image=image, is_published=is_published))
     db.session.add(p)
     db.session.commit()
+    page_cache.invalidate(INDEX_KEY, _post_key(slug))
+    index_post(p)
     flash("Post created.", "success")
     return redirect(url_for("sensitization.admin_list"))
 
@@ -175,11 +287,19 @@ def admin_update(post_id):
         flash("Not authorised.", "danger")
         return redirect(url_for("sensitization.index"))
     p = SensitizationPost.query.get_or_404(post_id)
+    try:
+        image = _image_from_form()
+    except ImageUploadError as e:
+        flash(str(e), "danger")
+        return redirect(url_for("sensitization.admin_edit", post_id=post_id))
     p.title = request.form.get("title", "").strip()
     p.body = request.form.get("body", "").strip()
-    p.image = request.form.get("image", "").strip() or None
+    p.image = image
     p.is_published = request.form.get("is_published") == "on"
+    prerender(p)
     db.session.commit()
+    page_cache.invalidate(INDEX_KEY, _post_key(p.slug))
+    index_post(p)
     flash("Post updated.", "success")
     return redirect(url_for("sensitization.admin_list"))
 
@@ -191,8 +311,11 @@ def admin_delete(post_id):
         return redirect(url_for("sensitization.index"))
 
     p = SensitizationPost.query.get_or_404(post_id)
+    slug = p.slug
     db.session.delete(p)
     db.session.commit()
+    page_cache.invalidate(INDEX_KEY, _post_key(slug))
+    remove_post(post_id)
 
     flash("Post deleted.", "success")
     return redirect(url_for("sensitization.admin_list"))
@@ -0,0 +1,183 @@
+import csv
+import logging
+import time as _time
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import insert, select
+
+from .. import db
+from ..models import Appointment, AppointmentEvent, AppointmentStatus, User
+from .occupancy import occupancy
+from .scheduling import ACTIVE_STATUSES, active_units, default_unit, load_occupancy_for_days, slot_start, within_hours
+
+log = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 2000
+CSV_COLUMNS = ["patient_email", "date", "time", "clinic_unit", "status", "notes", "risk_score"]
+STATUSES = {s.value for s in AppointmentStatus}
+
+
+class ImportRowError(ValueError):
+    pass
+
+
+class ImportStopped(Exception):
+    """A chunk failed to write; the chunks before it stay committed (stats, through_line)."""
+
+    def __init__(self, cause, stats, through_line):
+        super().__init__(
+            f"{cause}; {stats['imported']} rows up to line {through_line} were already imported, "
+            f"re-import only the lines after it"
+        )
+        self.stats = stats
+        self.through_line = through_line
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _parse_row(raw, patients, units, fallback):
+    email = (raw.get("patient_email") or "").strip().lower()
+    if not email:
+        raise ImportRowError("missing patient_email")
+    patient_id = patients.get(email)
+    if patient_id is None:
+        raise ImportRowError(f"unknown patient {email}")
+    try:
+        appt_date = datetime.strptime((raw.get("date") or "").strip(), "%Y-%m-%d").date()
+        appt_time = datetime.strptime((raw.get("time") or "").strip(), "%H:%M").time()
+    except ValueError:
+        raise ImportRowError("invalid date/time")
+
+    unit_name = (raw.get("clinic_unit") or "").strip()
+    unit = units.get(unit_name.lower()) if unit_name else fallback
+    if unit is None:
+        raise ImportRowError(f"unknown clinic unit {unit_name}")
+    if not within_hours(unit, appt_time):
+        raise ImportRowError(f"outside {unit.name} hours")
+
+    status = (raw.get("status") or AppointmentStatus.BOOKED.value).strip().lower()
+    if status not in STATUSES:
+        raise ImportRowError(f"invalid status {status}")
+
+    risk_score = None
+    risk_str = (raw.get("risk_score") or "").strip()
+    if risk_str:
+        try:
+            risk_score = float(risk_str)
+        except ValueError:
+            raise ImportRowError("invalid risk_score")
+
+    return {
+        "patient_id": patient_id,
+        "appointment_date": appt_date,
+        "appointment_time": appt_time,
+        "clinic_unit": unit.name,
+        "clinic_unit_id": unit.id,
+        "status": status,
+        "notes": (raw.get("notes") or "").strip() or None,
+        "risk_score": risk_score,
+        "risk_label": None if risk_score is None else ("high" if risk_score >= 0.5 else "low"),
+    }, unit
+
+
+def import_appointments(fileobj, chunk_size=DEFAULT_CHUNK_SIZE, on_reject=None, on_chunk=None):
+    """
+    Streams a CSV of appointments (see CSV_COLUMNS) into the database.
+
+    Rows are validated in memory against working hours and slot capacity using occupancy
+    preloaded once per new day, then each chunk is written in its own transaction with
+    bulk INSERTs for appointments and their "imported" events. Invalid rows are passed to
+    on_reject(line_no, row, reason) and skipped. Returns stats incl. rows_per_sec; any other
+    error is raised as ImportStopped, which says how far the committed chunks got.
+    """
+    units = {u.name.lower(): u for u in active_units()}
+    fallback = default_unit()
+    occ = {}
+    loaded_days = set()
+    stats = {"read": 0, "imported": 0, "rejected": 0, "chunks": 0, "seconds": 0.0, "rows_per_sec": 0.0}
+    started = _time.perf_counter()
+
+    reader = csv.DictReader(fileobj)
+    through_line = 1  # the header
+    try:
+        for chunk in _chunks(enumerate(reader, start=2), chunk_size):
+            t0 = _time.perf_counter()
+            stats["read"] += len(chunk)
+
+            emails = {(raw.get("patient_email") or "").strip().lower() for _, raw in chunk}
+            patients = dict(db.session.execute(select(User.email, User.id).where(User.email.in_(emails))).all())
+
+            new_days = set()
+            for _, raw in chunk:
+                try:
+                    new_days.add(datetime.strptime((raw.get("date") or "").strip(), "%Y-%m-%d").date())
+                except ValueError:
+                    pass
+            new_days -= loaded_days
+            occ.update(load_occupancy_for_days(new_days))
+            loaded_days |= new_days
+
+            accepted = []
+            for line_no, raw in chunk:
+                try:
+                    row, unit = _parse_row(raw, patients, units, fallback)
+                    if row["status"] in ACTIVE_STATUSES:
+                        counts = occ.setdefault((unit.id, row["appointment_date"]), Counter())
+                        start = slot_start(unit, row["appointment_time"])
+                        if counts[start] >= unit.capacity:
+                            raise ImportRowError("slot full")
+                        counts[start] += 1
+                    accepted.append(row)
+                except ImportRowError as e:
+                    stats["rejected"] += 1
+                    if on_reject:
+                        on_reject(line_no, raw, str(e))
+
+            if accepted:
+                ids = db.session.execute(
+                    insert(Appointment).returning(Appointment.id, sort_by_parameter_order=True),
+                    accepted,
+                ).scalars().all()
+                now = datetime.utcnow()
+                events = [
+                    {"appointment_id": i, "event_type": "imported", "event_time": now, "notes": "Bulk import"}
+                    for i in ids
+                ]
+                events += [
+                    {
+                        "appointment_id": i,
+                        "event_type": "risk_attached",
+                        "event_time": now,
+                        "notes": f"Risk score attached: {row['risk_score']:.4f} ({row['risk_label']})",
+                    }
+                    for i, row in zip(ids, accepted) if row["risk_score"] is not None
+                ]
+                db.session.execute(insert(AppointmentEvent), events)
+                db.session.commit()
+                stats["imported"] += len(accepted)
+            through_line = chunk[-1][0]
+
+            stats["chunks"] += 1
+            elapsed = _time.perf_counter() - t0
+            log.info("import chunk %d: %d accepted of %d in %.3fs", stats["chunks"], len(accepted), len(chunk), elapsed)
+            if on_chunk:
+                on_chunk(stats["chunks"], len(accepted), len(chunk), elapsed)
+    except Exception as e:
+        db.session.rollback()
+        raise ImportStopped(e, stats, through_line) from e
+    finally:
+        if stats["imported"]:
+            occupancy.clear()
+        stats["seconds"] = _time.perf_counter() - started
+        stats["rows_per_sec"] = stats["read"] / stats["seconds"] if stats["seconds"] else 0.0
+    return stats
@@ -0,0 +1,112 @@
+import glob
+import gzip
+import json
+import logging
+import os
+import time as _time
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select
+
+from .. import db
+from ..models import AppointmentEvent
+
+log = logging.getLogger(__name__)
+
+DEFAULT_RETENTION_DAYS = 365
+DEFAULT_BATCH_SIZE = 5000
+FILE_PATTERN = "appointment_events-{month}.jsonl.gz"
+
+
+def _month_path(archive_dir, month):
+    return os.path.join(archive_dir, FILE_PATTERN.format(month=month))
+
+
+def archive_batch(cutoff, last_id, batch_size):
+    """The next batch of events older than cutoff after last_id."""
+    return (
+        select(
+            AppointmentEvent.id,
+            AppointmentEvent.appointment_id,
+            AppointmentEvent.event_type,
+            AppointmentEvent.event_time,
+            AppointmentEvent.notes,
+        )
+        .where(AppointmentEvent.event_time < cutoff, AppointmentEvent.id > last_id)
+        .order_by(AppointmentEvent.id.asc())
+        .limit(batch_size)
+    )
+
+
+def archive_events(archive_dir, retention_days=DEFAULT_RETENTION_DAYS, batch_size=DEFAULT_BATCH_SIZE, now=None):
+    """
+    Moves AppointmentEvent rows older than the retention window into gzip'd JSON-lines
+    files, one per event month, then deletes them from the live table.
+
+    Each batch is appended to its monthly files as a new gzip member (plain gzip.open
+    reads concatenated members) before the DELETE is committed, so a crash can at worst
+    leave duplicates in the archive, never lose events; read_archive() drops them by id.
+    Returns stats: rows, batches, seconds, raw_bytes, compressed_bytes, bytes_saved.
+    """
+    os.makedirs(archive_dir, exist_ok=True)
+    cutoff = (now or datetime.utcnow()) - timedelta(days=retention_days)
+    stats = {"rows": 0, "batches": 0, "seconds": 0.0, "raw_bytes": 0, "compressed_bytes": 0, "bytes_saved": 0}
+    started = _time.perf_counter()
+    last_id = 0
+
+    while True:
+        rows = db.session.execute(archive_batch(cutoff, last_id, batch_size)).all()
+        if not rows:
+            db.session.rollback()
+            break
+        last_id = rows[-1].id
+
+        by_month = {}
+        for r in rows:
+            line = json.dumps({
+                "id": r.id,
+                "appointment_id": r.appointment_id,
+                "event_type": r.event_type,
+                "event_time": r.event_time.isoformat(),
+                "notes": r.notes,
+            }, ensure_ascii=False) + "\n"
+            by_month.setdefault(r.event_time.strftime("%Y-%m"), []).append(line)
+
+        for month, lines in by_month.items():
+            path = _month_path(archive_dir, month)
+            before = os.path.getsize(path) if os.path.exists(path) else 0
+            payload = "".join(lines).encode("utf-8")
+            with gzip.open(path, "ab", compresslevel=9) as f:
+                f.write(payload)
+            stats["raw_bytes"] += len(payload)
+            stats["compressed_bytes"] += os.path.getsize(path) - before
+
+        db.session.execute(delete(AppointmentEvent).where(AppointmentEvent.id.in_([r.id for r in rows])))
+        db.session.commit()
+        stats["rows"] += len(rows)
+        stats["batches"] += 1
+        log.info("archived %d events (batch %d)", len(rows), stats["batches"])
+
+    stats["seconds"] = _time.perf_counter() - started
+    stats["bytes_saved"] = stats["raw_bytes"] - stats["compressed_bytes"]
+    return stats
+
+
+def read_archive(archive_dir, appointment_id=None, month=None):
+    """Yields archived events (dicts) offline, optionally filtered by appointment or 'YYYY-MM'."""
+    paths = [_month_path(archive_dir, month)] if month else sorted(
+        glob.glob(os.path.join(archive_dir, FILE_PATTERN.format(month="*")))
+    )
+    seen = set()
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                event = json.loads(line)
+                if event["id"] in seen:
+                    continue
+                seen.add(event["id"])
+                if appointment_id is not None and event["appointment_id"] != appointment_id:
+                    continue
+                yield event
@@ -0,0 +1,158 @@
+import hashlib
+import logging
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app, url_for
+from markupsafe import Markup
+
+log = logging.getLogger(__name__)
+
+MEDIA_WIDTHS = (320, 640, 1280)
+MEDIA_MAX_BYTES = int(os.getenv("MEDIA_MAX_BYTES", str(8 * 1024 * 1024)))
+MEDIA_WORKERS = int(os.getenv("MEDIA_WORKERS", "2"))
+DEFAULT_SIZES = "(min-width: 992px) 33vw, (min-width: 768px) 50vw, 100vw"
+
+# uploaded originals are "<16 hex>.<ext>", resized copies "<16 hex>-<width>.<ext>"
+MEDIA_NAME = re.compile(r"^(?P<digest>[0-9a-f]{16})(?:-(?P<width>\d+))?\.(?P<ext>jpg|png|gif|webp)$")
+_PIL_FORMATS = {"jpg": "JPEG", "png": "PNG", "gif": "GIF", "webp": "WEBP"}
+
+
+class ImageUploadError(ValueError):
+    """Raised for uploads that are empty, too large or not a supported image type."""
+
+
+def _sniff(data):
+    if data.startswith(b"\xff\xd8\xff"):
+        return "jpg"
+    if data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return "gif"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+
+def media_dir():
+    return current_app.config.get("MEDIA_DIR") or os.path.join(current_app.instance_path, "media")
+
+
+def is_upload(name):
+    return bool(name and MEDIA_NAME.match(name))
+
+
+def variant_name(name, width):
+    m = MEDIA_NAME.match(name)
+    return f"{m['digest']}-{width}.{m['ext']}"
+
+
+def _write_atomic(path, data):
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as fh:
+        fh.write(data)
+    os.replace(tmp, path)
+
+
+class Thumbnailer:
+    """
+    Writes the MEDIA_WIDTHS copies of uploaded images on a small thread pool, so the upload
+    request returns as soon as the original is on disk. Needs Pillow; without it only the
+    original is served.
+    """
+
+    def __init__(self, workers=MEDIA_WORKERS, widths=MEDIA_WIDTHS):
+        self.workers = workers
+        self.widths = widths
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pid = None
+        self._pending = set()
+
+    def _executor(self):
+        # (re)create after fork: a pool inherited from the gunicorn master has no threads
+        if self._pool is None or self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="thumbs")
+        return self._pool
+
+    def submit(self, directory, name):
+        with self._lock:
+            if name in self._pending:
+                return None
+            self._pending.add(name)
+            future = self._executor().submit(self._resize, directory, name)
+        future.add_done_callback(lambda _: self._done(name))
+        return future
+
+    def _done(self, name):
+        with self._lock:
+            self._pending.discard(name)
+
+    def _resize(self, directory, name):
+        try:
+            from PIL import Image, ImageOps
+        except ImportError:
+            log.warning("Pillow is not installed; serving %s without resized copies", name)
+            return 0
+        fmt = _PIL_FORMATS[MEDIA_NAME.match(name)["ext"]]
+        written = 0
+        try:
+            with Image.open(os.path.join(directory, name)) as original:
+                original = ImageOps.exif_transpose(original)
+                if fmt == "JPEG" and original.mode not in ("RGB", "L"):
+                    original = original.convert("RGB")
+                for width in self.widths:
+                    path = os.path.join(directory, variant_name(name, width))
+                    if os.path.exists(path):
+                        continue
+                    copy = original.copy()
+                    copy.thumbnail((width, width * 4))
+                    tmp = f"{path}.tmp"
+                    copy.save(tmp, format=fmt, optimize=True, **({"quality": 82, "progressive": True} if fmt == "JPEG" else {}))
+                    os.replace(tmp, path)
+                    written += 1
+        except Exception:
+            log.exception("resizing %s failed", name)
+        return written
+
+
+thumbnailer = Thumbnailer()
+
+
+def store_upload(file_storage):
+    """
+    Saves an uploaded image under its content hash and queues the resized copies.
+    Returns the stored filename; uploading the same bytes twice reuses the file.
+    """
+    data = file_storage.stream.read(MEDIA_MAX_BYTES + 1)
+    if not data:
+        raise ImageUploadError("The uploaded image is empty.")
+    if len(data) > MEDIA_MAX_BYTES:
+        raise ImageUploadError(f"Images must be under {MEDIA_MAX_BYTES // (1024 * 1024)} MB.")
+    ext = _sniff(data)
+    if ext is None:
+        raise ImageUploadError("Upload a JPEG, PNG, GIF or WebP image.")
+
+    directory = media_dir()
+    os.makedirs(directory, exist_ok=True)
+    name = f"{hashlib.sha256(data).hexdigest()[:16]}.{ext}"
+    path = os.path.join(directory, name)
+    if not os.path.exists(path):
+        _write_atomic(path, data)
+    thumbnailer.submit(directory, name)
+    return name
+
+
+def image_attrs(name, alt="", sizes=DEFAULT_SIZES):
+    """`src`/`srcset`/`sizes`/`alt` attributes for a post image; legacy names point into static/images."""
+    if not is_upload(name):
+        src = url_for("static", filename="images/" + (name or "default.jpg"))
+        return Markup('src="%s" alt="%s"') % (src, alt)
+    srcset = ", ".join(
+        f"{url_for('sensitization.media', name=variant_name(name, w))} {w}w" for w in MEDIA_WIDTHS
+    )
+    src = url_for("sensitization.media", name=variant_name(name, MEDIA_WIDTHS[1]))
+    return Markup('src="%s" srcset="%s" sizes="%s" alt="%s" loading="lazy"') % (src, srcset, sizes, alt)
@@ -0,0 +1,363 @@
+import atexit
+import bisect
+import json
+import logging
+import os
+import threading
+import time as _time
+
+from flask import Response, abort, current_app, request
+from flask.signals import before_render_template, template_rendered
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# counters of workers that have exited, folded together so the directory doesn't grow per recycle
+RETIRED_FILE = "retired.json"
+
+log = logging.getLogger(__name__)
+
+
+class Histogram:
+    """Prometheus-style histogram keyed by a tuple of label values."""
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, value, *label_values):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self):
+        """[[label values, bucket counts, sum, count]] for this process."""
+        with self._lock:
+            return [[list(k), list(v[0]), v[1], v[2]] for k, v in self._series.items()]
+
+    def render(self, snapshot=None):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        snapshot = self.snapshot() if snapshot is None else snapshot
+        for label_values, counts, total, n in sorted(snapshot):
+            base = _labels(self.labels, label_values)
+            running = 0
+            for bound, c in zip(self.buckets, counts):
+                running += c
+                lines.append(f'{self.name}_bucket{{{base}{"," if base else ""}le="{bound}"}} {running}')
+            lines.append(f'{self.name}_bucket{{{base}{"," if base else ""}le="+Inf"}} {n}')
+            suffix = f"{{{base}}}" if base else ""
+            lines.append(f"{self.name}_sum{suffix} {total}")
+            lines.append(f"{self.name}_count{suffix} {n}")
+        return lines
+
+
+def _merge(snapshots):
+    """Sums process snapshots (see Metrics.snapshot); gauges come from the live processes only."""
+    responses, histograms, gauges = {}, {}, {}
+    for snap in snapshots:
+        for *key, n in snap.get("responses", ()):
+            responses[tuple(key)] = responses.get(tuple(key), 0) + n
+        for name, series in snap.get("histograms", {}).items():
+            merged = histograms.setdefault(name, {})
+            for label_values, counts, total, n in series:
+                key = tuple(label_values)
+                if key in merged:
+                    prev = merged[key]
+                    merged[key] = [[a + b for a, b in zip(prev[0], counts)], prev[1] + total, prev[2] + n]
+                else:
+                    merged[key] = [list(counts), total, n]
+        for name, value in snap.get("gauges", {}).items():
+            if isinstance(value, dict):
+                into = gauges.setdefault(name, {})
+                for k, v in value.items():
+                    into[k] = into.get(k, 0) + v
+            else:
+                gauges[name] = gauges.get(name, 0) + value
+    return {
+        "responses": [[*k, n] for k, n in responses.items()],
+        "histograms": {name: [[list(k), *v] for k, v in series.items()] for name, series in histograms.items()},
+        "gauges": gauges,
+    }
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _labels(names, values):
+    return ",".join(f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+                    for k, v in zip(names, values))
+
+
+class Metrics:
+    """
+    In-process request, SQL, template and model timings rendered at /metrics in the
+    Prometheus text format. Per-request SQL counts are kept in a thread-local, so only
+    statements issued by the request's own thread are attributed to it.
+
+    With METRICS_DIR set (gunicorn.conf.py does), each worker writes a snapshot there every
+    METRICS_FLUSH_SECONDS and at exit, and /metrics sums every worker's file, so a scrape
+    reaching any worker sees the whole server. Counters of exited workers are kept, so
+    recycling doesn't reset them; gauges only count workers that are still running.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._local = threading.local()
+        self.request_seconds = Histogram(
+            "iih_request_duration_seconds", "Request latency by endpoint.", ("endpoint", "method"))
+        self.request_sql_statements = Histogram(
+            "iih_request_sql_statements", "SQL statements issued per request.", ("endpoint",), COUNT_BUCKETS)
+        self.request_sql_seconds = Histogram(
+            "iih_request_sql_seconds", "Time spent in SQL per request.", ("endpoint",))
+        self.template_seconds = Histogram(
+            "iih_template_render_seconds", "Jinja render time by template.", ("template",))
+        self.model_seconds = Histogram(
+            "iih_model_predict_seconds", "HeartPredictor.predict model inference time.")
+        self._responses = {}
+        self._responses_lock = threading.Lock()
+        self.gauges = {}
+        self.directory = ""
+        self.flush_seconds = 5.0
+        self._writer = None
+        self._pid = None
+
+    def init_app(self, app):
+        if os.getenv("METRICS_ENABLED", "1") != "1":
+            return
+        self.enabled = True
+        self.token = os.getenv("METRICS_TOKEN", "")
+        self.directory = os.getenv("METRICS_DIR", "")
+        self.flush_seconds = float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            atexit.register(self.write_snapshot)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        before_render_template.connect(self._before_render, app)
+        template_rendered.connect(self._after_render, app)
+        with app.app_context():
+            from .. import db
+            event.listen(db.engine, "before_cursor_execute", self._before_cursor)
+            event.listen(db.engine, "after_cursor_execute", self._after_cursor)
+        app.add_url_rule("/metrics", "metrics", self.view)
+        self._register_cache_gauges()
+
+    def _register_cache_gauges(self):
+        from .occupancy import occupancy
+        from .page_cache import page_cache
+        from .pageview_buffer import page_views
+        from .user_cache import user_cache
+
+        for name, cache in (("occupancy", occupancy), ("user", user_cache), ("page", page_cache)):
+            self.gauge(f"iih_{name}_cache", f"{name.capitalize()} cache entries, hits and misses.",
+                       lambda c=cache: {k: v for k, v in c.stats().items() if k in ("entries", "hits", "misses")})
+        self.gauge("iih_pageview_buffer", "Buffered page views pending, flushed and dropped.",
+                   lambda: {k: v for k, v in page_views.stats().items() if k != "aggregate"})
+
+    # -- request -------------------------------------------------------------
+
+    def _before_request(self):
+        if self.directory and (self._pid != os.getpid() or not self._writer.is_alive()):
+            self._start_writer()
+        local = self._local
+        local.started = _time.perf_counter()
+        local.sql_count = 0
+        local.sql_seconds = 0.0
+
+    def _after_request(self, response):
+        local = self._local
+        started = getattr(local, "started", None)
+        if started is None:
+            return response
+        local.started = None
+        endpoint = request.endpoint or "unmatched"
+        if endpoint != "metrics":
+            self.request_seconds.observe(_time.perf_counter() - started, endpoint, request.method)
+            self.request_sql_statements.observe(local.sql_count, endpoint)
+            self.request_sql_seconds.observe(local.sql_seconds, endpoint)
+            key = (endpoint, request.method, response.status_code)
+            with self._responses_lock:
+                self._responses[key] = self._responses.get(key, 0) + 1
+        return response
+
+    # -- SQL -----------------------------------------------------------------
+
+    def _before_cursor(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_started", []).append(_time.perf_counter())
+
+    def _after_cursor(self, conn, cursor, statement, parameters, context, executemany):
+        stack = conn.info.get("metrics_started")
+        if not stack:
+            return
+        elapsed = _time.perf_counter() - stack.pop()
+        local = self._local
+        if getattr(local, "started", None) is not None:
+            local.sql_count += 1
+            local.sql_seconds += elapsed
+
+    # -- templates / model ---------------------------------------------------
+
+    def _before_render(self, app, template, context, **extra):
+        stack = getattr(self._local, "templates", None)
+        if stack is None:
+            stack = self._local.templates = []
+        stack.append(_time.perf_counter())
+
+    def _after_render(self, app, template, context, **extra):
+        stack = getattr(self._local, "templates", None)
+        if stack:
+            self.template_seconds.observe(_time.perf_counter() - stack.pop(), template.name or "string")
+
+    def observe_model(self, seconds):
+        if self.enabled:
+            self.model_seconds.observe(seconds)
+
+    def gauge(self, name, help, fn):
+        """Registers fn() -> number (or {label value: number}) to be read at scrape time."""
+        self.gauges[name] = (help, fn)
+
+    # -- multiprocess --------------------------------------------------------
+
+    def _histograms(self):
+        return (self.request_seconds, self.request_sql_statements, self.request_sql_seconds,
+                self.template_seconds, self.model_seconds)
+
+    def snapshot(self):
+        """This process's counters, histograms and gauge readings as JSON-able data."""
+        with self._responses_lock:
+            responses = [[*k, n] for k, n in self._responses.items()]
+        gauges = {}
+        for name, (_, fn) in self.gauges.items():
+            try:
+                gauges[name] = fn()
+            except Exception:
+                continue
+        return {
+            "pid": os.getpid(),
+            "responses": responses,
+            "histograms": {h.name: h.snapshot() for h in self._histograms()},
+            "gauges": gauges,
+        }
+
+    def _start_writer(self):
+        # (re)start after fork, like the page-view flusher
+        self._pid = os.getpid()
+        self._writer = threading.Thread(target=self._write_loop, name="metrics-writer", daemon=True)
+        self._writer.start()
+
+    def _write_loop(self):
+        while True:
+            _time.sleep(self.flush_seconds)
+            try:
+                self.write_snapshot()
+                self._retire_dead()
+            except Exception:
+                log.exception("writing metrics snapshot failed")
+
+    def write_snapshot(self):
+        if not self.directory:
+            return
+        path = os.path.join(self.directory, f"{os.getpid()}.json")
+        with open(path + ".tmp", "w") as fh:
+            json.dump(self.snapshot(), fh)
+        os.replace(path + ".tmp", path)
+
+    def _read(self, name):
+        try:
+            with open(os.path.join(self.directory, name)) as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return None
+
+    def _worker_files(self):
+        return [n for n in os.listdir(self.directory) if n.endswith(".json") and n[:-5].isdigit()]
+
+    def _retire_dead(self):
+        """Folds the files of exited workers into RETIRED_FILE (one worker at a time, under a lock)."""
+        import fcntl
+
+        with open(os.path.join(self.directory, ".lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            dead = [n for n in self._worker_files() if not _pid_alive(int(n[:-5]))]
+            if not dead:
+                return
+            snaps = [self._read(RETIRED_FILE) or {}] + [self._read(n) or {} for n in dead]
+            retired = _merge({**s, "gauges": {}} for s in snaps)
+            path = os.path.join(self.directory, RETIRED_FILE)
+            with open(path + ".tmp", "w") as fh:
+                json.dump(retired, fh)
+            os.replace(path + ".tmp", path)
+            for n in dead:
+                os.unlink(os.path.join(self.directory, n))
+
+    def collect(self):
+        """Merged snapshot of every worker sharing METRICS_DIR, or of this process alone."""
+        own = self.snapshot()
+        if not self.directory:
+            return own
+        import fcntl
+
+        snaps = [own]
+        # shared lock: never read a dead worker's file and the retired file it was just folded into
+        with open(os.path.join(self.directory, ".lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_SH)
+            for name in self._worker_files() + [RETIRED_FILE]:
+                if name == f"{own['pid']}.json":
+                    continue
+                snap = self._read(name)
+                if snap is None:
+                    continue
+                if "pid" not in snap or not _pid_alive(snap["pid"]):
+                    snap = {**snap, "gauges": {}}
+                snaps.append(snap)
+        return _merge(snaps)
+
+    # -- exposition ----------------------------------------------------------
+
+    def render(self):
+        data = self.collect()
+        lines = ["# HELP iih_responses_total Responses by endpoint, method and status.",
+                 "# TYPE iih_responses_total counter"]
+        for endpoint, method, status, n in sorted(data["responses"]):
+            lines.append(f"iih_responses_total{{{_labels(('endpoint', 'method', 'status'), (endpoint, method, status))}}} {n}")
+        for hist in self._histograms():
+            lines += hist.render(data["histograms"].get(hist.name, []))
+        for name, (help, _) in sorted(self.gauges.items()):
+            if name not in data["gauges"]:
+                continue
+            value = data["gauges"][name]
+            lines += [f"# HELP {name} {help}", f"# TYPE {name} gauge"]
+            if isinstance(value, dict):
+                lines += [f'{name}{{key="{k}"}} {v}' for k, v in sorted(value.items())]
+            else:
+                lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+    def view(self):
+        if not self.token:
+            # without a token the endpoint is only open on a debug server
+            if not current_app.debug:
+                abort(404)
+        elif request.headers.get("Authorization", "") != f"Bearer {self.token}":
+            abort(401)
+        return Response(self.render(), content_type=CONTENT_TYPE)
+
+
+metrics = Metrics()
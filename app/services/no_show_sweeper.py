@@ -0,0 +1,159 @@
+import logging
+import threading
+import time as _time
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, or_, select, update, insert
+
+from .. import db
+from ..models import Appointment, AppointmentEvent, AppointmentStatus, ClinicUnit
+from .occupancy import occupancy
+from .scheduling import default_unit
+
+log = logging.getLogger(__name__)
+
+DEFAULT_GRACE_HOURS = 24
+DEFAULT_BATCH_SIZE = 1000
+
+
+def _starts_by(limit: datetime):
+    return or_(
+        Appointment.appointment_date < limit.date(),
+        and_(
+            Appointment.appointment_date == limit.date(),
+            Appointment.appointment_time <= limit.time(),
+        ),
+    )
+
+
+def _stale_booked_filter(cutoff: datetime):
+    """BOOKED rows whose slot ended by cutoff; a slot ends slot_minutes after it starts, per unit."""
+    by_length = {}
+    for unit_id, minutes in db.session.execute(select(ClinicUnit.id, ClinicUnit.slot_minutes)):
+        by_length.setdefault(minutes, []).append(unit_id)
+    ended = [
+        and_(Appointment.clinic_unit_id.in_(unit_ids), _starts_by(cutoff - timedelta(minutes=minutes)))
+        for minutes, unit_ids in sorted(by_length.items())
+    ]
+    # legacy rows belong to the default unit
+    legacy_limit = cutoff - timedelta(minutes=default_unit().slot_minutes)
+    ended.append(and_(Appointment.clinic_unit_id.is_(None), _starts_by(legacy_limit)))
+    return and_(Appointment.status == AppointmentStatus.BOOKED.value, or_(*ended))
+
+
+def stale_booked_batch(cutoff, last_id, batch_size):
+    """Ids of the next batch of stale BOOKED appointments after last_id."""
+    return (
+        select(Appointment.id)
+        .where(_stale_booked_filter(cutoff), Appointment.id > last_id)
+        .order_by(Appointment.id.asc())
+        .limit(batch_size)
+    )
+
+
+def sweep_no_shows(grace_hours=DEFAULT_GRACE_HOURS, batch_size=DEFAULT_BATCH_SIZE, now=None, on_batch=None):
+    """
+    Marks BOOKED appointments whose slot ended more than `grace_hours` ago as NO_SHOW.
+
+    Rows are walked in id order (keyset pagination) and every batch is committed on its
+    own, so write locks are only held for one bulk UPDATE + one bulk INSERT at a time.
+    Returns a stats dict: rows, batches, seconds, rows_per_sec, batch_timings.
+    """
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(hours=grace_hours)
+
+    stats = {"rows": 0, "batches": 0, "seconds": 0.0, "rows_per_sec": 0.0, "batch_timings": []}
+    started = _time.perf_counter()
+    last_id = 0
+
+    while True:
+        t0 = _time.perf_counter()
+        ids = db.session.execute(stale_booked_batch(cutoff, last_id, batch_size)).scalars().all()
+        if not ids:
+            db.session.rollback()
+            break
+        last_id = ids[-1]
+
+        # re-check status in the UPDATE so rows touched by staff meanwhile are left alone
+        stmt = (
+            update(Appointment)
+            .where(Appointment.id.in_(ids), Appointment.status == AppointmentStatus.BOOKED.value)
+            .values(status=AppointmentStatus.NO_SHOW.value, updated_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        if db.session.get_bind().dialect.update_returning:
+            swept = db.session.execute(stmt.returning(Appointment.id)).scalars().all()
+        else:
+            db.session.execute(stmt)
+            # only the rows this UPDATE changed, not the ones staff moved on meanwhile
+            swept = db.session.execute(
+                select(Appointment.id).where(
+                    Appointment.id.in_(ids),
+                    Appointment.status == AppointmentStatus.NO_SHOW.value,
+                    Appointment.updated_at == now,
+                )
+            ).scalars().all()
+        if swept:
+            db.session.execute(
+                insert(AppointmentEvent),
+                [
+                    {
+                        "appointment_id": appt_id,
+                        "event_type": f"status:{AppointmentStatus.NO_SHOW.value}",
+                        "event_time": now,
+                        "notes": "Marked no-show by sweeper",
+                    }
+                    for appt_id in swept
+                ],
+            )
+        db.session.commit()
+
+        elapsed = _time.perf_counter() - t0
+        stats["rows"] += len(swept)
+        stats["batches"] += 1
+        stats["batch_timings"].append(elapsed)
+        log.info("no-show sweep batch %d: %d rows in %.3fs", stats["batches"], len(swept), elapsed)
+        if on_batch:
+            on_batch(stats["batches"], len(swept), elapsed)
+
+    if stats["rows"]:
+        occupancy.clear()
+    stats["seconds"] = _time.perf_counter() - started
+    stats["rows_per_sec"] = stats["rows"] / stats["seconds"] if stats["seconds"] else 0.0
+    return stats
+
+
+class NoShowSweeper:
+    """In-process periodic worker: runs sweep_no_shows every `interval` seconds on a daemon thread."""
+
+    def __init__(self, app, interval, grace_hours=DEFAULT_GRACE_HOURS, batch_size=DEFAULT_BATCH_SIZE):
+        self.app = app
+        self.interval = interval
+        self.grace_hours = grace_hours
+        self.batch_size = batch_size
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name="no-show-sweeper", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            with self.app.app_context():
+                try:
+                    stats = sweep_no_shows(self.grace_hours, self.batch_size)
+                    log.info(
+                        "no-show sweep: %d rows in %.2fs (%.0f rows/s)",
+                        stats["rows"], stats["seconds"], stats["rows_per_sec"],
+                    )
+                except Exception:
+                    db.session.rollback()
+                    log.exception("no-show sweep failed")
+                finally:
+                    db.session.remove()
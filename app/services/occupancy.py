@@ -0,0 +1,78 @@
+import os
+import threading
+import time as _time
+
+
+class OccupancyCache:
+    """
+    Per-process cache of slot occupancy, keyed by (clinic_unit_id, day).
+
+    Each value maps slot start time -> number of active bookings. Write paths call
+    invalidate() after commit; the TTL bounds staleness caused by other worker processes.
+    """
+
+    def __init__(self, ttl=30.0):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._generations = {}  # bumped by invalidate(); a load that straddles one is not stored
+        self._epoch = 0  # bumped by clear()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.saved = 0
+
+    def lookup(self, unit_id, day, loader):
+        """Returns (counts, hit): hit is True when the counts came from the cache."""
+        key = (unit_id, day)
+        now = _time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] < self.ttl:
+                self.hits += 1
+                return entry[1], True
+            self.misses += 1
+            generation = (self._epoch, self._generations.get(key, 0))
+        counts = loader()
+        with self._lock:
+            if generation == (self._epoch, self._generations.get(key, 0)):
+                self._entries[key] = (now, counts)
+        return counts, False
+
+    def get(self, unit_id, day, loader):
+        return self.lookup(unit_id, day, loader)[0]
+
+    def record_saved(self):
+        """Counts a decision answered from the cache that would otherwise have queried the database."""
+        with self._lock:
+            self.saved += 1
+
+    def invalidate(self, unit_id, day):
+        key = (unit_id, day)
+        with self._lock:
+            self._generations[key] = self._generations.get(key, 0) + 1
+            if self._entries.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._epoch += 1
+            self._generations.clear()
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                # only full slots rejected from the cache skip a query; free ones are re-checked
+                "queries_saved": self.saved,
+                "invalidations": self.invalidations,
+            }
+
+
+occupancy = OccupancyCache(ttl=float(os.getenv("OCCUPANCY_CACHE_TTL", "30")))
@@ -0,0 +1,68 @@
+import hashlib
+import os
+import threading
+import time as _time
+
+
+class PageCache:
+    """
+    Per-process TTL cache of rendered pages keyed by (page key, content version, variant).
+
+    Callers read `version` from the database on every request (e.g. the row's updated_at),
+    so a write made through any worker is seen by all of them on their next request. The
+    version is read before rendering, so a render racing a write is stored under the old
+    version and never served for the new one. `variant` separates anonymous visitors from
+    each signed-in user (the navbar differs). ttl <= 0 disables caching; ETags are still computed.
+    """
+
+    def __init__(self, ttl=300.0, max_entries=5000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def etag_for(body):
+        return hashlib.sha1(body.encode("utf-8")).hexdigest()
+
+    def get(self, key, version, variant, render):
+        """Returns (body, etag), calling render() only on a miss."""
+        now = _time.monotonic()
+        with self._lock:
+            entry = self._entries.get((key, version, variant))
+            if entry is not None and entry[0] > now:
+                self.hits += 1
+                return entry[1], entry[2]
+            self.misses += 1
+        body = render()
+        etag = self.etag_for(body)
+        if self.ttl > 0:
+            with self._lock:
+                if len(self._entries) >= self.max_entries:
+                    self._entries.clear()
+                self._entries[(key, version, variant)] = (now + self.ttl, body, etag)
+        return body, etag
+
+    def invalidate(self, *keys):
+        """Frees this process's entries for keys; other workers' go stale by version instead."""
+        with self._lock:
+            self._entries = {k: v for k, v in self._entries.items() if k[0] not in keys}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+page_cache = PageCache(ttl=float(os.getenv("PAGE_CACHE_TTL", "300")))
@@ -0,0 +1,180 @@
+import atexit
+import logging
+import os
+import threading
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import insert
+from sqlalchemy.exc import DataError, IntegrityError
+
+from .. import db
+from ..models import PageView, PageViewCounter
+
+log = logging.getLogger(__name__)
+
+# errors caused by a row's content; anything else (database down, locked) is retried as a whole
+_ROW_ERRORS = (IntegrityError, DataError)
+
+
+class PageViewBuffer:
+    """
+    Collects page views in memory and writes them from a background thread in bulk.
+
+    record() only appends under a lock, so requests never wait on the database. The
+    flusher wakes when `flush_every` views are pending or `flush_seconds` have passed.
+    With `aggregate` on, views are folded into per-page, per-minute PageViewCounter
+    rows instead of one PageView row each. At most `max_pending` views are held; beyond
+    that the oldest are dropped (and counted) rather than growing without bound. A batch
+    rejected for its content `max_attempts` times in a row is split in halves and retried,
+    so a bad row (e.g. a user_id deleted meanwhile) is isolated and dropped, and counted,
+    instead of blocking every flush.
+    """
+
+    def __init__(self, flush_every=200, flush_seconds=5.0, aggregate=False, max_pending=50000, max_attempts=3):
+        self.flush_every = flush_every
+        self.flush_seconds = flush_seconds
+        self.aggregate = aggregate
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        self._failures = 0
+        self.app = None
+        self._lock = threading.Lock()
+        self._pending = []
+        self._wake = threading.Event()
+        self._thread = None
+        self._pid = None
+        self.flushed = 0
+        self.dropped = 0
+
+    def init_app(self, app):
+        self.app = app
+        atexit.register(self.flush)
+
+    def _ensure_thread(self):
+        # (re)start after fork: gunicorn workers don't inherit the master's threads
+        if self._pid == os.getpid() and self._thread and self._thread.is_alive():
+            return
+        self._pid = os.getpid()
+        self._thread = threading.Thread(target=self._run, name="pageview-flusher", daemon=True)
+        self._thread.start()
+
+    def record(self, page, user_id=None, session_id=None):
+        with self._lock:
+            self._pending.append((page, user_id, session_id, datetime.utcnow()))
+            if len(self._pending) > self.max_pending:
+                overflow = len(self._pending) - self.max_pending
+                del self._pending[:overflow]
+                self.dropped += overflow
+            should_wake = len(self._pending) >= self.flush_every
+            self._ensure_thread()
+        if should_wake:
+            self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                log.exception("page view flush failed")
+
+    def flush(self):
+        with self._lock:
+            batch, self._pending = self._pending, []
+        if not batch or self.app is None:
+            return 0
+        with self.app.app_context():
+            try:
+                self._write(batch)
+            except Exception as e:
+                self._failures += 1
+                if self._failures < self.max_attempts or not isinstance(e, _ROW_ERRORS):
+                    self._requeue(batch)
+                    raise
+                log.warning("page view batch of %d rejected %d times (%s); isolating bad rows",
+                            len(batch), self._failures, e.__class__.__name__)
+                return self._write_isolating(batch)
+            finally:
+                db.session.remove()
+        self._failures = 0
+        self.flushed += len(batch)
+        return len(batch)
+
+    def _requeue(self, views):
+        with self._lock:
+            # back in front for the next attempt
+            self._pending[:0] = views
+
+    def _write(self, batch):
+        try:
+            if self.aggregate:
+                self._write_counters(batch)
+            else:
+                db.session.execute(insert(PageView), [
+                    {"page": p, "user_id": u, "session_id": s, "timestamp": ts}
+                    for p, u, s, ts in batch
+                ])
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+    def _write_isolating(self, batch):
+        """Writes batch in ever smaller halves; single views that are still rejected are dropped."""
+        self._failures = 0
+        written, parts = 0, [batch]
+        while parts:
+            part = parts.pop()
+            try:
+                self._write(part)
+            except _ROW_ERRORS:
+                if len(part) == 1:
+                    with self._lock:
+                        self.dropped += 1
+                    log.warning("dropped page view the database rejects: %r", part[0][:3])
+                else:
+                    mid = len(part) // 2
+                    parts += [part[mid:], part[:mid]]
+                continue
+            except Exception:
+                self._requeue([v for p in [part, *reversed(parts)] for v in p])
+                raise
+            written += len(part)
+        self.flushed += written
+        return written
+
+    def _write_counters(self, batch):
+        counts = Counter((p, ts.replace(second=0, microsecond=0)) for p, _, _, ts in batch)
+        dialect = db.session.get_bind().dialect.name
+        if dialect in ("sqlite", "postgresql"):
+            if dialect == "sqlite":
+                from sqlalchemy.dialects.sqlite import insert as upsert
+            else:
+                from sqlalchemy.dialects.postgresql import insert as upsert
+            stmt = upsert(PageViewCounter)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["page", "minute"],
+                set_={"views": PageViewCounter.views + stmt.excluded.views},
+            )
+            db.session.execute(stmt, [{"page": p, "minute": m, "views": n} for (p, m), n in counts.items()])
+            return
+        for (p, m), n in counts.items():
+            row = PageViewCounter.query.filter_by(page=p, minute=m).with_for_update().first()
+            if row:
+                row.views += n
+            else:
+                db.session.add(PageViewCounter(page=p, minute=m, views=n))
+
+    def stats(self):
+        with self._lock:
+            pending = len(self._pending)
+        return {"pending": pending, "flushed": self.flushed, "dropped": self.dropped, "aggregate": self.aggregate}
+
+
+page_views = PageViewBuffer(
+    flush_every=int(os.getenv("PAGEVIEW_FLUSH_EVERY", "200")),
+    flush_seconds=float(os.getenv("PAGEVIEW_FLUSH_SECONDS", "5")),
+    aggregate=os.getenv("PAGEVIEW_AGGREGATE", "0") == "1",
+)
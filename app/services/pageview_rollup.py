@@ -0,0 +1,226 @@
+import logging
+import time as _time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+
+from .. import db
+from ..models import PageView, PageViewCounter, PageViewDaily, RollupState
+from ..utils.hll import HyperLogLog
+
+log = logging.getLogger(__name__)
+
+_EPOCH = datetime(1970, 1, 1)
+
+ROLLUP_NAME = "page_view_daily"
+# high-water mark of the counter fold, stored as whole minutes since the Unix epoch
+COUNTER_ROLLUP_NAME = "page_view_counters_daily"
+POST_PREFIX = "/sensitization/post/"
+DEFAULT_BATCH_SIZE = 20000
+# rows younger than this are left for the next run so late commits aren't skipped
+DEFAULT_LAG_SECONDS = 120
+# a missing id may still be in an open transaction (ids aren't handed out in commit order on
+# Postgres); the mark waits at the gap until the row after it is this old, then skips it as rolled back
+DEFAULT_GAP_SECONDS = 900
+
+
+def _session_key(row):
+    if row.session_id:
+        return f"s:{row.session_id}"
+    if row.user_id:
+        return f"u:{row.user_id}"
+    return f"v:{row.id}"
+
+
+def rollup_batch(last_id, batch_size):
+    """The next batch of page views after last_id."""
+    return (
+        select(PageView.id, PageView.page, PageView.user_id, PageView.session_id, PageView.timestamp)
+        .where(PageView.id > last_id)
+        .order_by(PageView.id.asc())
+        .limit(batch_size)
+    )
+
+
+def _foldable(rows, last_id, cutoff, gap_cutoff):
+    """How many leading rows can be folded: stops at the lag window and at recent id gaps."""
+    prev = last_id
+    for i, r in enumerate(rows):
+        if r.timestamp is None or r.timestamp >= cutoff:
+            return i
+        if r.id != prev + 1 and r.timestamp >= gap_cutoff:
+            return i
+        prev = r.id
+    return len(rows)
+
+
+def reach_days_query(date_from, date_to):
+    return PageViewDaily.query.filter(PageViewDaily.day >= date_from, PageViewDaily.day <= date_to)
+
+
+def rollup_page_views(batch_size=DEFAULT_BATCH_SIZE, lag_seconds=DEFAULT_LAG_SECONDS,
+                      gap_seconds=DEFAULT_GAP_SECONDS, now=None):
+    """
+    Folds PageView rows past the stored high-water mark into PageViewDaily.
+
+    Each batch is read by id, stopping at the first row newer than the lag window or right
+    after an id gap younger than gap_seconds (a lower id that may commit later), merged
+    into the matching (day, page) rows - view counts added, session HyperLogLog sketches
+    max-merged - and committed together with the new high-water mark, so a rerun never
+    double counts. Returns stats: rows, batches, seconds, last_id.
+    """
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(seconds=lag_seconds)
+    gap_cutoff = now - timedelta(seconds=gap_seconds)
+    state = db.session.get(RollupState, ROLLUP_NAME)
+    if state is None:
+        state = RollupState(name=ROLLUP_NAME, last_id=0)
+        db.session.add(state)
+        db.session.commit()
+
+    stats = {"rows": 0, "batches": 0, "seconds": 0.0, "last_id": state.last_id}
+    started = _time.perf_counter()
+    while True:
+        rows = db.session.execute(rollup_batch(state.last_id, batch_size)).all()
+        stop = _foldable(rows, state.last_id, cutoff, gap_cutoff)
+        held = stop < len(rows)
+        rows = rows[:stop]
+        if not rows:
+            db.session.rollback()
+            break
+
+        agg = {}
+        for r in rows:
+            key = (r.timestamp.date(), r.page)
+            views, sketch = agg.get(key) or (0, HyperLogLog())
+            sketch.add(_session_key(r))
+            agg[key] = (views + 1, sketch)
+
+        days = {d for d, _ in agg}
+        existing = {
+            (row.day, row.page): row
+            for row in PageViewDaily.query.filter(
+                PageViewDaily.day.in_(days), PageViewDaily.page.in_({p for _, p in agg})
+            )
+        }
+        for (day, page), (views, sketch) in agg.items():
+            row = existing.get((day, page))
+            if row is None:
+                row = _new_daily_row(day, page)
+            elif row.sessions_hll is None and row.views:
+                sketch = None  # already holds aggregate-mode views with no session ids
+            else:
+                sketch.merge(HyperLogLog.from_bytes(row.sessions_hll))
+            row.views = (row.views or 0) + views
+            row.sessions_hll = sketch.to_bytes() if sketch is not None else None
+
+        state.last_id = rows[-1].id
+        db.session.commit()
+        stats["rows"] += len(rows)
+        stats["batches"] += 1
+        log.info("page view rollup batch %d: %d rows up to id %d", stats["batches"], len(rows), state.last_id)
+        if held:
+            break
+
+    stats["last_id"] = state.last_id
+    stats["seconds"] = _time.perf_counter() - started
+    return stats
+
+
+def _new_daily_row(day, page):
+    row = PageViewDaily(
+        day=day,
+        page=page,
+        post_slug=page[len(POST_PREFIX):] if page.startswith(POST_PREFIX) else None,
+        views=0,
+    )
+    db.session.add(row)
+    return row
+
+
+def rollup_page_view_counters(lag_seconds=DEFAULT_LAG_SECONDS, now=None):
+    """
+    Folds PageViewCounter minutes (written with PAGEVIEW_AGGREGATE=1) into PageViewDaily.
+
+    Counters carry no session ids, so the rows they touch lose their session sketch and the
+    reach page reports their sessions as unknown. Minutes are folded one day at a time, up
+    to the last whole minute before the lag window, together with the new high-water mark.
+    Returns stats: views, days.
+    """
+    cutoff = ((now or datetime.utcnow()) - timedelta(seconds=lag_seconds)).replace(second=0, microsecond=0)
+    state = db.session.get(RollupState, COUNTER_ROLLUP_NAME)
+    if state is None:
+        state = RollupState(name=COUNTER_ROLLUP_NAME, last_id=0)
+        db.session.add(state)
+        db.session.commit()
+
+    stats = {"views": 0, "days": 0}
+    start = _EPOCH + timedelta(minutes=state.last_id)
+    while start < cutoff:
+        first = db.session.execute(
+            select(func.min(PageViewCounter.minute))
+            .where(PageViewCounter.minute >= start, PageViewCounter.minute < cutoff)
+        ).scalar()
+        if first is None:
+            break
+        day = first.date()
+        end = min(datetime.combine(day + timedelta(days=1), datetime.min.time()), cutoff)
+        counts = db.session.execute(
+            select(PageViewCounter.page, func.sum(PageViewCounter.views))
+            .where(PageViewCounter.minute >= first, PageViewCounter.minute < end)
+            .group_by(PageViewCounter.page)
+        ).all()
+        existing = {
+            row.page: row
+            for row in PageViewDaily.query.filter(PageViewDaily.day == day,
+                                                  PageViewDaily.page.in_([p for p, _ in counts]))
+        }
+        for page, views in counts:
+            row = existing.get(page) or _new_daily_row(day, page)
+            row.views = (row.views or 0) + int(views)
+            row.sessions_hll = None
+            stats["views"] += int(views)
+        state.last_id = int((end - _EPOCH).total_seconds() // 60)
+        db.session.commit()
+        stats["days"] += 1
+        start = end
+    db.session.rollback()
+    return stats
+
+
+def reach_report(date_from, date_to, top=10):
+    """
+    Reads only PageViewDaily: per-day views + estimated sessions, top pages and top posts.
+    Days holding aggregate-mode views have sessions None, and sessions_partial is set.
+    """
+    rows = reach_days_query(date_from, date_to).all()
+
+    per_day = {}
+    unknown = set()
+    for r in rows:
+        views, sketch = per_day.get(r.day) or (0, HyperLogLog())
+        if r.sessions_hll is None and r.views:
+            unknown.add(r.day)
+        per_day[r.day] = (views + r.views, sketch.merge(HyperLogLog.from_bytes(r.sessions_hll)))
+    days = [
+        {"day": d, "views": v, "sessions": None if d in unknown else s.count()}
+        for d, (v, s) in sorted(per_day.items())
+    ]
+
+    def _top(group_col, *filters):
+        return db.session.query(group_col, func.sum(PageViewDaily.views).label("views")).filter(
+            PageViewDaily.day >= date_from, PageViewDaily.day <= date_to, *filters
+        ).group_by(group_col).order_by(func.sum(PageViewDaily.views).desc()).limit(top).all()
+
+    total_sketch = HyperLogLog()
+    for _, (_, s) in per_day.items():
+        total_sketch.merge(s)
+
+    return {
+        "days": days,
+        "total_views": sum(d["views"] for d in days),
+        "total_sessions": total_sketch.count(),
+        "sessions_partial": bool(unknown),
+        "top_pages": _top(PageViewDaily.page),
+        "top_posts": _top(PageViewDaily.post_slug, PageViewDaily.post_slug.isnot(None)),
+    }
@@ -0,0 +1,66 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from functools import lru_cache
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+# werkzeug method string, e.g. "scrypt:32768:8:1" or "pbkdf2:sha256:600000"
+HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", "0") or 0) or max(1, (os.cpu_count() or 2) // 2)
+HASH_QUEUE_MAX = int(os.getenv("HASH_QUEUE_MAX", "0") or 0) or HASH_WORKERS * 4
+HASH_TIMEOUT = float(os.getenv("HASH_TIMEOUT", "10"))
+
+
+class HashingBusy(RuntimeError):
+    """Raised instead of queueing when too many hashes are already pending, or one waited past the timeout."""
+
+
+class BoundedHasher:
+    """
+    Runs password hashing on a small thread pool (hashlib's scrypt/pbkdf2 release the GIL)
+    and refuses work once `queue_max` jobs are in flight, so a burst of logins or
+    registrations can't occupy every request worker.
+    """
+
+    def __init__(self, workers=HASH_WORKERS, queue_max=HASH_QUEUE_MAX, timeout=HASH_TIMEOUT):
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pwhash")
+        self._slots = threading.BoundedSemaphore(queue_max)
+
+    def run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusy("Too many sign-ins in progress. Please try again in a moment.")
+        try:
+            future = self._pool.submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            # still queued behind slow hashes: drop it; if it's already running its slot frees when it ends
+            future.cancel()
+            raise HashingBusy("Sign-in is taking too long right now. Please try again in a moment.")
+
+
+hasher = BoundedHasher()
+
+
+@lru_cache(maxsize=None)
+def _method_prefix(method):
+    # werkzeug fills in default parameters, so compare against what it actually writes
+    return generate_password_hash("", method=method).split("$", 1)[0]
+
+
+def hash_password(password, method=HASH_METHOD):
+    return hasher.run(generate_password_hash, password, method)
+
+
+def verify_password(pw_hash, password):
+    return hasher.run(check_password_hash, pw_hash, password)
+
+
+def needs_rehash(pw_hash, method=HASH_METHOD):
+    return pw_hash.split("$", 1)[0] != _method_prefix(method)
@@ -0,0 +1,175 @@
+import html
+import logging
+import re
+
+from sqlalchemy import DateTime, String, text
+
+from .. import db
+from ..models import SensitizationPost
+
+log = logging.getLogger(__name__)
+
+FTS_TABLE = "sens_posts_fts"
+# control characters survive FTS highlighting untouched and are swapped for <mark> after escaping
+_OPEN, _CLOSE = "\x02", "\x03"
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+_ready = set()
+_warned = set()
+_RESULT_COLUMNS = {"slug": String, "created_at": DateTime, "title": String, "snippet": String}
+
+
+def _dialect():
+    return db.session.get_bind().dialect.name
+
+
+def _fts_query(q):
+    """Turns free text into a safe FTS5 query: every word must match, the last one as a prefix."""
+    tokens = _TOKEN.findall(q.lower())[:12]
+    if not tokens:
+        return None
+    terms = [f'"{t}"' for t in tokens]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def _marked(fragment):
+    return html.escape(fragment or "").replace(_OPEN, "<mark>").replace(_CLOSE, "</mark>")
+
+
+def create_sqlite_index(conn):
+    conn.execute(text(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+        "USING fts5(title, body, tokenize='porter unicode61')"
+    ))
+
+
+def create_postgres_index(conn):
+    conn.execute(text(
+        "ALTER TABLE sens_posts ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce(body, '')), 'B')) STORED"
+    ))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_sens_posts_search_vector ON sens_posts USING gin (search_vector)"
+    ))
+
+
+def index_ready():
+    """
+    Whether the search index exists (created by the 9c4e1b7a2d60 migration or `flask
+    rebuild-search-index`). Read-only: DDL never runs on the request path.
+    """
+    bind = db.session.get_bind()
+    key = str(bind.url)
+    if key in _ready:
+        return True
+    dialect = bind.dialect.name
+    if dialect == "sqlite":
+        found = db.session.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :n"), {"n": FTS_TABLE}
+        ).first()
+    elif dialect == "postgresql":
+        found = db.session.execute(
+            text("SELECT 1 FROM pg_indexes WHERE tablename = 'sens_posts' AND indexname = :n"),
+            {"n": "ix_sens_posts_search_vector"},
+        ).first()
+    else:
+        return False
+    if not found:
+        # not cached, so the index is picked up once the migration or the CLI has built it
+        if key not in _warned:
+            _warned.add(key)
+            log.warning("search index missing; run `flask db upgrade` or `flask rebuild-search-index`")
+        return False
+    _ready.add(key)
+    return True
+
+
+def rebuild_index():
+    """Drops and refills the index from published posts. Returns the number of posts indexed."""
+    dialect = _dialect()
+    if dialect == "sqlite":
+        conn = db.session.connection()
+        conn.execute(text(f"DROP TABLE IF EXISTS {FTS_TABLE}"))
+        create_sqlite_index(conn)
+        conn.execute(text(
+            f"INSERT INTO {FTS_TABLE} (rowid, title, body) "
+            "SELECT id, title, body FROM sens_posts WHERE is_published"
+        ))
+    elif dialect == "postgresql":
+        create_postgres_index(db.session.connection())
+        db.session.execute(text("REINDEX INDEX ix_sens_posts_search_vector"))
+    db.session.commit()
+    count = SensitizationPost.query.filter_by(is_published=True).count()
+    log.info("search index rebuilt: %d posts", count)
+    return count
+
+
+def index_post(post):
+    """Brings one post's index entry in line with the row; call after committing a create/update."""
+    if _dialect() != "sqlite" or not index_ready():
+        return  # the Postgres tsvector is a generated column; a missing index is rebuilt whole
+    db.session.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :id"), {"id": post.id})
+    if post.is_published:
+        db.session.execute(
+            text(f"INSERT INTO {FTS_TABLE} (rowid, title, body) VALUES (:id, :title, :body)"),
+            {"id": post.id, "title": post.title, "body": post.body},
+        )
+    db.session.commit()
+
+
+def remove_post(post_id):
+    if _dialect() != "sqlite" or not index_ready():
+        return
+    db.session.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :id"), {"id": post_id})
+    db.session.commit()
+
+
+def search_posts(q, limit=20, offset=0):
+    """
+    Ranked search over published posts. Returns dicts with slug, created_at and HTML-safe
+    title/snippet with matches wrapped in <mark>; best match first.
+    """
+    q = (q or "").strip()
+    if not q:
+        return []
+    dialect = _dialect() if index_ready() else None
+    if dialect == "sqlite":
+        match = _fts_query(q)
+        if not match:
+            return []
+        rows = db.session.execute(text(
+            f"SELECT p.slug, p.created_at, "
+            f"highlight({FTS_TABLE}, 0, :o, :c) AS title, "
+            f"snippet({FTS_TABLE}, 1, :o, :c, '…', 24) AS snippet "
+            f"FROM {FTS_TABLE} JOIN sens_posts p ON p.id = {FTS_TABLE}.rowid "
+            f"WHERE {FTS_TABLE} MATCH :q AND p.is_published "
+            f"ORDER BY bm25({FTS_TABLE}, 10.0, 1.0) LIMIT :limit OFFSET :offset"
+        ).columns(**_RESULT_COLUMNS), {"q": match, "o": _OPEN, "c": _CLOSE, "limit": limit, "offset": offset}).all()
+    elif dialect == "postgresql":
+        rows = db.session.execute(text(
+            "SELECT slug, created_at, "
+            "ts_headline('english', title, query, 'StartSel=' || :o || ', StopSel=' || :c || ', HighlightAll=true') AS title, "
+            "ts_headline('english', body, query, 'StartSel=' || :o || ', StopSel=' || :c || ', MaxWords=35, MinWords=15') AS snippet "
+            "FROM (SELECT slug, created_at, title, body, query, ts_rank_cd(search_vector, query) AS rank "
+            "      FROM sens_posts, websearch_to_tsquery('english', :q) AS query "
+            "      WHERE is_published AND search_vector @@ query "
+            "      ORDER BY rank DESC LIMIT :limit OFFSET :offset) hits "
+            "ORDER BY rank DESC"
+        ).columns(**_RESULT_COLUMNS), {"q": q, "o": _OPEN, "c": _CLOSE, "limit": limit, "offset": offset}).all()
+    else:
+        # no full-text index (other databases, or not migrated yet): a slow but correct scan
+        like = f"%{q}%"
+        posts = (
+            SensitizationPost.query
+            .filter(SensitizationPost.is_published.is_(True))
+            .filter(SensitizationPost.title.ilike(like) | SensitizationPost.body.ilike(like))
+            .order_by(SensitizationPost.created_at.desc())
+            .limit(limit).offset(offset).all()
+        )
+        rows = [(p.slug, p.created_at, p.title, p.body[:200]) for p in posts]
+
+    return [
+        {"slug": slug, "created_at": created_at, "title": _marked(title), "snippet": _marked(snippet)}
+        for slug, created_at, title, snippet in rows
+    ]
@@ -1,6 +1,13 @@
 import os
 import json
+import logging
 import pickle
+import threading
+import time
+
+from .metrics import metrics
+
+log = logging.getLogger(__name__)
 
 class HeartPredictor:
     def __init__(self, model_path: str, features_path: str):
@@ -8,6 +15,7 @@ class HeartPredictor:
         self.features_path = features_path
         self.model = None
         self.features = None
+        self.load_error = None
         self._load()
 
     def _load(self):
@@ -16,32 +24,77 @@ class HeartPredictor:
                 self.features = json.load(f)
 
         if os.path.exists(self.model_path):
-            with open(self.model_path, "rb") as f:
-                self.model = pickle.load(f)
+            try:
+                with open(self.model_path, "rb") as f:
+                    self.model = pickle.load(f)
+            except Exception as e:
+                # e.g. the model's library isn't installed; reported by ready() and /readyz
+                self.load_error = f"{type(e).__name__}: {e}"
+                log.exception("loading heart model %s failed", self.model_path)
 
     def ready(self) -> bool:
         return self.model is not None and isinstance(self.features, list) and len(self.features) > 0
 
-    def predict(self, payload: dict):
-        if not self.ready():
-            raise RuntimeError(
-                "Heart disease model not configured. Provide models/heart_xgb.pkl and models/heart_features.json."
-            )
-
-        # Build 2D list in the exact feature order expected by the model
+    def _row(self, payload: dict):
+        # Build the row in the exact feature order expected by the model
         row = []
         for feat in self.features:
             if feat not in payload:
                 raise ValueError(f"Missing feature: {feat}")
             row.append(payload[feat])
+        return row
 
-        X = [row]  # shape (1, n_features)
+    def predict(self, payload: dict):
+        return self.predict_many([payload])[0]
+
+    def predict_many(self, payloads):
+        """[(yhat, proba), ...] for a list of payloads, evaluated as one model call."""
+        if not self.ready():
+            raise RuntimeError(
+                "Heart disease model not configured. Provide models/heart_xgb.pkl and models/heart_features.json."
+            )
+
+        X = [self._row(payload) for payload in payloads]  # shape (n, n_features)
 
         # Predict
-        if hasattr(self.model, "predict_proba"):
-            proba = float(self.model.predict_proba(X)[0][1])
-            yhat = int(proba >= 0.5)
-            return yhat, proba
+        started = time.perf_counter()
+        try:
+            if hasattr(self.model, "predict_proba"):
+                results = []
+                for probs in self.model.predict_proba(X):
+                    proba = float(probs[1])
+                    results.append((int(proba >= 0.5), proba))
+                return results
+
+            return [(int(yhat), None) for yhat in self.model.predict(X)]
+        finally:
+            metrics.observe_model(time.perf_counter() - started)
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def get_predictor() -> HeartPredictor:
+    """Process-wide predictor, loaded once (in the gunicorn master when the app is preloaded)."""
+    global _shared
+    if _shared is None:
+        with _shared_lock:
+            if _shared is None:
+                _shared = HeartPredictor(
+                    model_path=os.getenv("HEART_MODEL_PATH", "models/heart_xgb.pkl"),
+                    features_path=os.getenv("HEART_FEATURES_PATH", "models/heart_features.json"),
+                )
+    return _shared
+
 
-        yhat = int(self.model.predict(X)[0])
-        return yhat, None
+def warm_up(predictor: HeartPredictor) -> bool:
+    """One throwaway prediction so the first real request doesn't pay for lazy model setup."""
+    if not predictor.ready():
+        return False
+    try:
+        predictor.predict({feat: 0 for feat in predictor.features})
+    except Exception:
+        log.exception("model warm-up prediction failed")
+        return False
+    return True
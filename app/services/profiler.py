@@ -0,0 +1,213 @@
+import cProfile
+import logging
+import os
+import random
+import sys
+import threading
+import time as _time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+
+from flask import current_app, g, request
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+log = logging.getLogger(__name__)
+
+HEADER = "X-Profile"
+MODES = ("cprofile", "tracemalloc")
+TOKEN_MAX_AGE = 3600
+EXTENSIONS = (".pstats", ".collapsed", ".alloc.txt")
+
+
+def _signer(app):
+    return URLSafeTimedSerializer(app.config["SECRET_KEY"], salt="request-profiler")
+
+
+def make_token(app, mode="cprofile"):
+    """Signed X-Profile header value; valid for TOKEN_MAX_AGE seconds."""
+    return _signer(app).dumps({"mode": mode})
+
+
+class StackSampler:
+    """
+    One background thread that snapshots the stacks of registered request threads every
+    `interval` seconds and counts them in collapsed ("a;b;c") form for flamegraph tools.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._targets = {}
+        self._thread = None
+        self._pid = None
+
+    def _ensure_thread(self):
+        # (re)start after fork, like the page-view flusher
+        if self._pid == os.getpid() and self._thread and self._thread.is_alive():
+            return
+        self._pid = os.getpid()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+        self._thread.start()
+
+    def start(self, thread_id):
+        with self._lock:
+            self._targets[thread_id] = Counter()
+            self._ensure_thread()
+
+    def stop(self, thread_id):
+        with self._lock:
+            return self._targets.pop(thread_id, Counter())
+
+    def _run(self):
+        while True:
+            _time.sleep(self.interval)
+            with self._lock:
+                if not self._targets:
+                    continue
+                frames = sys._current_frames()
+                for thread_id, counts in self._targets.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        counts[_collapse(frame)] += 1
+
+
+def _collapse(frame):
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class RequestProfiler:
+    """
+    Profiles a random PROFILE_SAMPLE_RATE share of requests (optionally only PROFILE_ENDPOINTS),
+    plus any request carrying a valid signed X-Profile header. cprofile mode writes a .pstats
+    file and sampled .collapsed stacks; tracemalloc mode writes the top allocation sites
+    grown during the request. Files go to PROFILE_DIR, keeping the newest PROFILE_KEEP runs.
+    """
+
+    def __init__(self):
+        self.sampler = StackSampler()
+        self._tracemalloc_lock = threading.Lock()
+
+    def init_app(self, app):
+        self.sample_rate = float(os.getenv("PROFILE_SAMPLE_RATE", "0") or 0)
+        self.endpoints = {e.strip() for e in os.getenv("PROFILE_ENDPOINTS", "").split(",") if e.strip()}
+        self.mode = os.getenv("PROFILE_MODE", "cprofile")
+        self.keep = int(os.getenv("PROFILE_KEEP", "200"))
+        self.sampler.interval = float(os.getenv("PROFILE_INTERVAL_MS", "5")) / 1000
+        app.config.setdefault("PROFILE_DIR", os.getenv("PROFILE_DIR") or os.path.join(app.instance_path, "profiles"))
+        app.before_request(self._before_request)
+        app.teardown_request(self._teardown_request)
+        app.extensions["request_profiler"] = self
+
+    def _wanted(self):
+        token = request.headers.get(HEADER)
+        if token:
+            try:
+                mode = _signer(current_app).loads(token, max_age=TOKEN_MAX_AGE).get("mode")
+            except BadSignature:
+                return None
+            return mode if mode in MODES else None
+        if self.sample_rate <= 0 or (self.endpoints and request.endpoint not in self.endpoints):
+            return None
+        return self.mode if random.random() < self.sample_rate else None
+
+    def _before_request(self):
+        mode = self._wanted()
+        if mode is None:
+            return
+        if mode == "tracemalloc":
+            # tracing is process-wide: one request at a time
+            if not self._tracemalloc_lock.acquire(blocking=False):
+                return
+            tracemalloc.start(25)
+            g._profile = ("tracemalloc", _time.perf_counter(), tracemalloc.take_snapshot())
+        else:
+            prof = cProfile.Profile()
+            try:
+                prof.enable()
+            except ValueError:
+                # 3.12+: another thread's profile holds the process-wide hook
+                return
+            self.sampler.start(threading.get_ident())
+            g._profile = ("cprofile", _time.perf_counter(), prof)
+
+    def _teardown_request(self, exc):
+        state = g.pop("_profile", None)
+        if state is None:
+            return
+        mode, started, handle = state
+        elapsed_ms = (_time.perf_counter() - started) * 1000
+        # stop tracing and give back the process-wide hooks first: the file I/O below may fail
+        try:
+            if mode == "tracemalloc":
+                try:
+                    top = tracemalloc.take_snapshot().compare_to(handle, "lineno")[:30]
+                finally:
+                    tracemalloc.stop()
+                    self._tracemalloc_lock.release()
+            else:
+                try:
+                    handle.disable()
+                finally:
+                    stacks = self.sampler.stop(threading.get_ident())
+        except Exception:
+            log.exception("stopping request profile failed")
+            return
+        try:
+            stem = os.path.join(self.directory(), "{}-{}-{:.0f}ms".format(
+                datetime.utcnow().strftime("%Y%m%dT%H%M%S%f"), request.endpoint or "unmatched", elapsed_ms))
+            if mode == "tracemalloc":
+                with open(stem + ".alloc.txt", "w") as fh:
+                    fh.write(f"{request.method} {request.full_path} {elapsed_ms:.1f} ms\n")
+                    fh.writelines(f"{stat}\n" for stat in top)
+            else:
+                handle.dump_stats(stem + ".pstats")
+                with open(stem + ".collapsed", "w") as fh:
+                    fh.writelines(f"{stack} {n}\n" for stack, n in stacks.most_common())
+            self._rotate()
+        except Exception:
+            log.exception("writing request profile failed")
+
+    def directory(self):
+        path = current_app.config["PROFILE_DIR"]
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def _rotate(self):
+        runs = list_profiles(self.directory())
+        for run in runs[self.keep:]:
+            for name in run["files"]:
+                try:
+                    os.unlink(os.path.join(self.directory(), name))
+                except FileNotFoundError:
+                    pass
+
+
+def list_profiles(directory):
+    """Newest first: [{stem, endpoint, ms, created, files: [names]}]."""
+    if not os.path.isdir(directory):
+        return []
+    runs = {}
+    for name in os.listdir(directory):
+        ext = next((e for e in EXTENSIONS if name.endswith(e)), None)
+        if ext is None:
+            continue
+        stem = name[: -len(ext)]
+        try:
+            ts, rest = stem.split("-", 1)
+            endpoint, ms = rest.rsplit("-", 1)
+            created = datetime.strptime(ts, "%Y%m%dT%H%M%S%f")
+        except ValueError:
+            continue
+        run = runs.setdefault(stem, {"stem": stem, "endpoint": endpoint, "ms": int(ms[:-2]),
+                                     "created": created, "files": []})
+        run["files"].append(name)
+    return sorted(runs.values(), key=lambda r: r["stem"], reverse=True)
+
+
+profiler = RequestProfiler()
@@ -0,0 +1,101 @@
+import re
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import func, select, text
+
+from .. import db
+from ..models import Appointment, AppointmentStatus
+from ..utils.pagination import keyset_query
+from . import event_archive, no_show_sweeper, pageview_rollup
+from .schedule_export import export_query
+from .scheduling import default_unit, occupancy_query
+from .waitlist import waiting_entries_query
+
+# SQLite prints "SCAN appointments" ("SCAN TABLE ..." before 3.36) for a full table scan;
+# index scans read "SCAN ... USING [COVERING] INDEX" and point lookups "SEARCH ..."
+_SQLITE_FULL_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$")
+_PG_FULL_SCAN = re.compile(r"Seq Scan on (\w+)")
+
+
+def _count(query):
+    # what Query.count() runs
+    return select(func.count()).select_from(query.subquery())
+
+
+def hot_queries(today=None):
+    """
+    (name, statement) for the queries behind the busiest pages and jobs, with sample
+    parameters, built by the same helpers the views and jobs run. Needs an app context.
+    """
+    # the blueprints import services, so import them only when asked
+    from ..routes import admin, appointments, auth, sensitization
+
+    today = today or date.today()
+    month_ago = today - timedelta(days=30)
+    since = datetime.combine(month_ago, time())
+    dashboard = admin.dashboard_query(month_ago, today)
+    return [
+        ("admin.schedule day page",
+         keyset_query(admin.schedule_query(today), admin.SCHEDULE_KEYS, None, admin.SCHEDULE_PAGE_SIZE).statement),
+        ("admin.schedule next page",
+         keyset_query(admin.schedule_query(today), admin.SCHEDULE_KEYS, (today, time(10), 1),
+                      admin.SCHEDULE_PAGE_SIZE).statement),
+        ("admin.dashboard status count",
+         _count(dashboard.filter(Appointment.status == AppointmentStatus.NO_SHOW.value))),
+        ("admin.dashboard risk count",
+         _count(dashboard.filter(Appointment.risk_score.isnot(None), Appointment.risk_score >= 0.5))),
+        ("appointments.list_my page",
+         keyset_query(appointments.my_appointments_query(1), appointments.MY_KEYS, None, appointments.PAGE_SIZE,
+                      descending=True).statement),
+        ("slot occupancy for a day", occupancy_query(default_unit(), today).statement),
+        ("no-show sweep batch",
+         no_show_sweeper.stale_booked_batch(datetime.combine(today, time()), 0, no_show_sweeper.DEFAULT_BATCH_SIZE)),
+        ("schedule export range", export_query(month_ago, today)),
+        ("appointment timeline page",
+         keyset_query(admin.timeline_query(1), admin.TIMELINE_KEYS, None, admin.TIMELINE_PAGE_SIZE).statement),
+        ("event archive batch", event_archive.archive_batch(since, 0, event_archive.DEFAULT_BATCH_SIZE)),
+        ("waitlist waiting entries", waiting_entries_query().statement),
+        ("login by email", auth.user_by_email_query("patient@example.org").limit(1).statement),
+        ("page view rollup batch", pageview_rollup.rollup_batch(0, pageview_rollup.DEFAULT_BATCH_SIZE)),
+        ("reach report days", pageview_rollup.reach_days_query(month_ago, today).statement),
+        ("sensitization.index", sensitization.published_posts_query().statement),
+        ("sensitization.post", sensitization.published_post_query("know-your-numbers").limit(1).statement),
+    ]
+
+
+def explain(stmt, session=None):
+    """The database's plan for stmt, one string per line (EXPLAIN QUERY PLAN on SQLite, EXPLAIN elsewhere)."""
+    session = session or db.session
+    dialect = session.get_bind().dialect
+    sql = str(stmt.compile(dialect=dialect, compile_kwargs={"literal_binds": True}))
+    if dialect.name == "sqlite":
+        return [row[-1] for row in session.execute(text("EXPLAIN QUERY PLAN " + sql))]
+    # small dev tables make a seq scan the cheapest plan; forbid it so only a missing index shows one
+    session.execute(text("SET LOCAL enable_seqscan = off"))
+    try:
+        return [row[0] for row in session.execute(text("EXPLAIN " + sql))]
+    finally:
+        session.rollback()
+
+
+def full_scans(plan, dialect_name):
+    """Tables the plan reads in full."""
+    pattern = _SQLITE_FULL_SCAN if dialect_name == "sqlite" else _PG_FULL_SCAN
+    found = []
+    for line in plan:
+        m = pattern.search(line.strip())
+        if m and m.group(1) not in found:
+            found.append(m.group(1))
+    return found
+
+
+def check_query_plans(queries=None, session=None):
+    """[{"name", "plan", "full_scans"}] for each hot query; any full_scans entry is a regression."""
+    session = session or db.session
+    dialect_name = session.get_bind().dialect.name
+    results = []
+    for name, stmt in queries if queries is not None else hot_queries():
+        plan = explain(stmt, session)
+        results.append({"name": name, "plan": plan, "full_scans": full_scans(plan, dialect_name)})
+    session.rollback()
+    return results
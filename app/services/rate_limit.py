@@ -0,0 +1,48 @@
+import os
+import threading
+import time as _time
+from collections import OrderedDict
+
+
+class TokenBucketLimiter:
+    """
+    In-memory token buckets keyed by string (client IP, email, ...).
+
+    Each key refills at `rate` tokens/second up to `burst`. Keys are kept in LRU order
+    and the least recently seen are dropped past `max_keys`, so memory stays bounded
+    during a credential-stuffing burst.
+    """
+
+    def __init__(self, rate, burst, max_keys=100000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()
+        self.rejected = 0
+
+    def allow(self, key, cost=1.0):
+        now = _time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            else:
+                self.rejected += 1
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return allowed
+
+
+# defaults: 10 attempts per IP burst then 1 per 2s; 5 per email then 1 per 10s
+ip_limiter = TokenBucketLimiter(
+    rate=float(os.getenv("LOGIN_IP_RATE", "0.5")),
+    burst=float(os.getenv("LOGIN_IP_BURST", "10")),
+)
+email_limiter = TokenBucketLimiter(
+    rate=float(os.getenv("LOGIN_EMAIL_RATE", "0.1")),
+    burst=float(os.getenv("LOGIN_EMAIL_BURST", "5")),
+)
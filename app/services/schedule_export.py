@@ -0,0 +1,142 @@
+import csv
+import hashlib
+import io
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+
+from .. import db
+from ..models import Appointment, ClinicUnit, User
+from .scheduling import _unit_filter
+
+CHUNK_ROWS = 500
+DEFAULT_SLOT_MINUTES = 30
+
+CSV_HEADER = ["id", "date", "time", "clinic_unit", "status", "patient", "patient_email", "risk_score", "risk_label", "updated_at"]
+
+
+def _filters(date_from, date_to, unit_id=None):
+    clauses = [Appointment.appointment_date >= date_from, Appointment.appointment_date <= date_to]
+    if unit_id:
+        unit = db.session.get(ClinicUnit, int(unit_id))
+        # the default unit also owns legacy rows without a unit
+        clauses.append(_unit_filter(unit) if unit is not None else Appointment.clinic_unit_id == unit_id)
+    return clauses
+
+
+def export_validators(date_from, date_to, unit_id, fmt):
+    """
+    (etag, last_modified) for an export, from a single aggregate over the range.
+
+    Any booking, cancellation or status change bumps updated_at and/or the row count, and
+    a patient name or email change bumps their user's updated_at, so unchanged ranges can
+    be answered with 304 without reading the rows.
+    """
+    appts_modified, users_modified, count = db.session.execute(
+        select(func.max(Appointment.updated_at), func.max(User.updated_at), func.count(Appointment.id))
+        .join(User, User.id == Appointment.patient_id)
+        .where(*_filters(date_from, date_to, unit_id))
+    ).one()
+    last_modified = max(filter(None, (appts_modified, users_modified)), default=None)
+    seed = f"{fmt}|{date_from}|{date_to}|{unit_id or ''}|{appts_modified or ''}|{users_modified or ''}|{count}"
+    return hashlib.sha1(seed.encode("utf-8")).hexdigest(), last_modified
+
+
+def export_query(date_from, date_to, unit_id=None):
+    return (
+        select(
+            Appointment.id,
+            Appointment.appointment_date,
+            Appointment.appointment_time,
+            Appointment.clinic_unit,
+            Appointment.status,
+            Appointment.risk_score,
+            Appointment.risk_label,
+            Appointment.updated_at,
+            User.full_name,
+            User.email,
+            ClinicUnit.slot_minutes,
+        )
+        .join(User, User.id == Appointment.patient_id)
+        .outerjoin(ClinicUnit, ClinicUnit.id == Appointment.clinic_unit_id)
+        .where(*_filters(date_from, date_to, unit_id))
+        .order_by(Appointment.appointment_date.asc(), Appointment.appointment_time.asc(), Appointment.id.asc())
+        .execution_options(yield_per=CHUNK_ROWS)
+    )
+
+
+def _rows(date_from, date_to, unit_id=None):
+    return db.session.execute(export_query(date_from, date_to, unit_id))
+
+
+def iter_csv(date_from, date_to, unit_id=None):
+    """Yields the CSV export a chunk of CHUNK_ROWS rows at a time."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(CSV_HEADER)
+    for i, r in enumerate(_rows(date_from, date_to, unit_id), 1):
+        writer.writerow([
+            r.id,
+            r.appointment_date.isoformat(),
+            r.appointment_time.strftime("%H:%M"),
+            r.clinic_unit or "",
+            r.status,
+            r.full_name,
+            r.email,
+            "" if r.risk_score is None else f"{r.risk_score:.4f}",
+            r.risk_label or "",
+            r.updated_at.isoformat() if r.updated_at else "",
+        ])
+        if i % CHUNK_ROWS == 0:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue()
+
+
+def _ical_text(s):
+    return (s or "").replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+
+def _fold(line):
+    # RFC 5545: lines longer than 75 octets continue with CRLF + space
+    raw = line.encode("utf-8")
+    if len(raw) <= 75:
+        return line + "\r\n"
+    parts, chunk = [], b""
+    for ch in line:
+        b = ch.encode("utf-8")
+        if len(chunk) + len(b) > (75 if not parts else 74):
+            parts.append(chunk.decode("utf-8"))
+            chunk = b""
+        chunk += b
+    parts.append(chunk.decode("utf-8"))
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def iter_ical(date_from, date_to, unit_id=None, host="iih.local"):
+    """Yields a VCALENDAR of the range, one VEVENT per appointment, in CHUNK_ROWS chunks."""
+    head = ["BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//IIH Web//Clinic Schedule//EN", "CALSCALE:GREGORIAN"]
+    out = [_fold(l) for l in head]
+    stamp_now = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+    for i, r in enumerate(_rows(date_from, date_to, unit_id), 1):
+        start = datetime.combine(r.appointment_date, r.appointment_time)
+        end = start + timedelta(minutes=r.slot_minutes or DEFAULT_SLOT_MINUTES)
+        stamp = r.updated_at.strftime("%Y%m%dT%H%M%SZ") if r.updated_at else stamp_now
+        lines = [
+            "BEGIN:VEVENT",
+            f"UID:appointment-{r.id}@{host}",
+            f"DTSTAMP:{stamp}",
+            f"DTSTART:{start.strftime('%Y%m%dT%H%M%S')}",
+            f"DTEND:{end.strftime('%Y%m%dT%H%M%S')}",
+            f"SUMMARY:{_ical_text(f'{r.full_name} ({r.status})')}",
+            f"LOCATION:{_ical_text(r.clinic_unit)}",
+            "STATUS:CANCELLED" if r.status == "cancelled" else "STATUS:CONFIRMED",
+            "END:VEVENT",
+        ]
+        out.extend(_fold(l) for l in lines)
+        if i % CHUNK_ROWS == 0:
+            yield "".join(out)
+            out = []
+    out.append(_fold("END:VCALENDAR"))
+    yield "".join(out)
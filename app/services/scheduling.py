@@ -0,0 +1,188 @@
+from collections import Counter
+from datetime import datetime, time, timedelta
+
+from sqlalchemy import func, or_, text
+
+from .. import db
+from ..models import Appointment, AppointmentStatus, ClinicUnit
+from .occupancy import occupancy
+
+# statuses that hold a slot
+ACTIVE_STATUSES = (AppointmentStatus.BOOKED.value, AppointmentStatus.COMPLETED.value)
+
+DEFAULT_UNIT_NAME = "General"
+DEFAULT_OPENS_AT = time(9, 0)
+DEFAULT_CLOSES_AT = time(16, 0)
+
+
+def active_units():
+    return ClinicUnit.query.filter_by(is_active=True).order_by(ClinicUnit.id.asc()).all()
+
+
+_default_unit_id = None
+
+
+def _new_default_unit():
+    # the migration's seed row: the hospital-wide rule from before units existed
+    return ClinicUnit(
+        name=DEFAULT_UNIT_NAME,
+        opens_at=DEFAULT_OPENS_AT,
+        closes_at=DEFAULT_CLOSES_AT,
+        slot_minutes=30,
+        capacity=1,
+        is_active=True,
+    )
+
+
+def default_unit():
+    """
+    The lowest-id active unit; appointments without a unit belong to it. Never writes: with
+    no active unit it returns an unsaved default (id None), so legacy NULL-unit rules apply.
+    """
+    global _default_unit_id
+    unit = db.session.get(ClinicUnit, _default_unit_id) if _default_unit_id else None
+    if unit is None or not unit.is_active:
+        unit = ClinicUnit.query.filter_by(is_active=True).order_by(ClinicUnit.id.asc()).first()
+    if unit is None:
+        return _new_default_unit()
+    _default_unit_id = unit.id
+    return unit
+
+
+def ensure_default_unit():
+    """Seeds the default unit for databases built with create_all() instead of the migrations."""
+    unit = default_unit()
+    if unit.id is None:
+        db.session.add(unit)
+        db.session.commit()
+    return unit
+
+
+def resolve_unit(unit_id=None):
+    if unit_id:
+        unit = db.session.get(ClinicUnit, int(unit_id))
+        if unit is not None and unit.is_active:
+            return unit
+    return default_unit()
+
+
+def within_hours(unit, t):
+    return unit.opens_at <= t <= unit.closes_at
+
+
+def slot_start(unit, t):
+    """Maps any time inside the working day onto the start of its slot."""
+    opens = datetime.combine(datetime.min, unit.opens_at)
+    offset = (datetime.combine(datetime.min, t) - opens).total_seconds() // 60
+    return (opens + timedelta(minutes=(offset // unit.slot_minutes) * unit.slot_minutes)).time()
+
+
+def slot_times(unit):
+    slots = []
+    cursor = datetime.combine(datetime.min, unit.opens_at)
+    end = datetime.combine(datetime.min, unit.closes_at)
+    while cursor <= end:
+        slots.append(cursor.time())
+        cursor += timedelta(minutes=unit.slot_minutes)
+    return slots
+
+
+def _unit_filter(unit):
+    if unit.id == default_unit().id:
+        return or_(Appointment.clinic_unit_id == unit.id, Appointment.clinic_unit_id.is_(None))
+    return Appointment.clinic_unit_id == unit.id
+
+
+def occupancy_query(unit, day):
+    """Active bookings per appointment time for one unit and day."""
+    return db.session.query(Appointment.appointment_time, func.count(Appointment.id)).filter(
+        Appointment.appointment_date == day,
+        Appointment.status.in_(ACTIVE_STATUSES),
+        _unit_filter(unit),
+    ).group_by(Appointment.appointment_time)
+
+
+def _load_occupancy(unit, day):
+    rows = occupancy_query(unit, day).all()
+    counts = Counter()
+    for t, n in rows:
+        counts[slot_start(unit, t)] += n
+    return counts
+
+
+def load_occupancy_for_days(days):
+    """
+    Bulk variant of the per-day load for import-sized workloads: one grouped query for
+    all units over `days`, returned as {(unit_id, day): Counter(slot start -> bookings)}.
+    """
+    units = {u.id: u for u in ClinicUnit.query.all()}
+    fallback = default_unit()
+    result = {}
+    if not days:
+        return result
+    rows = db.session.query(
+        Appointment.clinic_unit_id, Appointment.appointment_date, Appointment.appointment_time, func.count(Appointment.id)
+    ).filter(
+        Appointment.appointment_date.in_(list(days)),
+        Appointment.status.in_(ACTIVE_STATUSES),
+    ).group_by(Appointment.clinic_unit_id, Appointment.appointment_date, Appointment.appointment_time).all()
+    for unit_id, day, t, n in rows:
+        unit = units.get(unit_id) or fallback
+        result.setdefault((unit.id, day), Counter())[slot_start(unit, t)] += n
+    return result
+
+
+def day_occupancy(unit, day):
+    """Slot start -> active bookings; served from the occupancy cache after the first load."""
+    return occupancy.get(unit.id, day, lambda: _load_occupancy(unit, day))
+
+
+def free_slots(unit, day, max_items=None):
+    counts = day_occupancy(unit, day)
+    slots = []
+    for t in slot_times(unit):
+        if counts[t] < unit.capacity:
+            slots.append(t)
+            if max_items and len(slots) >= max_items:
+                break
+    return slots
+
+
+def lock_unit_day(unit, day):
+    """
+    Serializes bookings for one unit and day until the transaction ends, so two workers
+    can't both count a slot as free and both insert. SQLite already allows one writer.
+    """
+    if db.session.get_bind().dialect.name == "postgresql":
+        db.session.execute(text("SELECT pg_advisory_xact_lock(:unit_id, :day)"),
+                           {"unit_id": unit.id, "day": day.toordinal()})
+
+
+def has_capacity(unit, day, t):
+    """
+    Cached occupancy rejects full slots without a query; a slot that looks free is
+    confirmed against the database before a booking is written. The confirmation takes
+    the unit/day lock, so call it in the transaction that inserts the booking.
+    """
+    start = slot_start(unit, t)
+    counts, cached = occupancy.lookup(unit.id, day, lambda: _load_occupancy(unit, day))
+    if counts[start] >= unit.capacity:
+        if cached:
+            occupancy.record_saved()
+        return False
+    lock_unit_day(unit, day)
+    end = (datetime.combine(day, start) + timedelta(minutes=unit.slot_minutes)).time()
+    q = Appointment.query.filter(
+        Appointment.appointment_date == day,
+        Appointment.appointment_time >= start,
+        Appointment.status.in_(ACTIVE_STATUSES),
+        _unit_filter(unit),
+    )
+    if end > start:
+        q = q.filter(Appointment.appointment_time < end)
+    return q.count() < unit.capacity
+
+
+def invalidate_for(appt):
+    unit_id = appt.clinic_unit_id or default_unit().id
+    occupancy.invalidate(unit_id, appt.appointment_date)
@@ -0,0 +1,188 @@
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import re
+import shutil
+
+from flask import current_app, request, send_from_directory
+
+log = logging.getLogger(__name__)
+
+DIST_DIR = "dist"
+MANIFEST = "manifest.json"
+ONE_YEAR = 365 * 24 * 3600
+# already-compressed formats gain nothing from gzip/brotli
+COMPRESSIBLE = {".css", ".js", ".svg", ".json", ".txt", ".html", ".map", ".ico", ".xml"}
+MIN_SAVING = 0.05
+_ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+_STATIC_REF = re.compile(r"""/static/([^"'()\s?#]+)""")
+
+
+def _brotli():
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def _hashed_name(rel, digest):
+    stem, ext = os.path.splitext(rel)
+    return f"{stem}.{digest}{ext}"
+
+
+def build_assets(static_folder):
+    """
+    Copies every static file to dist/ under a content-hash name, writes .gz and .br
+    (Brotli is optional) next to compressible files when they save at least MIN_SAVING,
+    and writes dist/manifest.json: {source path: {path, bytes, sha256, encodings: {br|gzip: bytes}}}.
+    Returns the manifest.
+    """
+    dist = os.path.join(static_folder, DIST_DIR)
+    if os.path.isdir(dist):
+        shutil.rmtree(dist)
+    brotli = _brotli()
+    if brotli is None:
+        log.warning("brotli is not installed; writing gzip variants only")
+
+    manifest = {}
+    for root, dirs, files in os.walk(static_folder):
+        dirs[:] = sorted(d for d in dirs if os.path.join(root, d) != dist)
+        for fn in sorted(files):
+            src = os.path.join(root, fn)
+            rel = os.path.relpath(src, static_folder).replace(os.sep, "/")
+            with open(src, "rb") as fh:
+                data = fh.read()
+            digest = hashlib.sha256(data).hexdigest()
+            hashed = _hashed_name(rel, digest[:12])
+            out = os.path.join(dist, hashed)
+            os.makedirs(os.path.dirname(out), exist_ok=True)
+            with open(out, "wb") as fh:
+                fh.write(data)
+
+            encodings = {}
+            if os.path.splitext(fn)[1].lower() in COMPRESSIBLE:
+                variants = {"gzip": gzip.compress(data, compresslevel=9, mtime=0)}
+                if brotli is not None:
+                    variants["br"] = brotli.compress(data, quality=11)
+                for enc, suffix in _ENCODINGS:
+                    blob = variants.get(enc)
+                    if blob is not None and len(blob) <= len(data) * (1 - MIN_SAVING):
+                        with open(out + suffix, "wb") as fh:
+                            fh.write(blob)
+                        encodings[enc] = len(blob)
+            manifest[rel] = {"path": f"{DIST_DIR}/{hashed}", "bytes": len(data), "sha256": digest,
+                             "encodings": encodings}
+
+    os.makedirs(dist, exist_ok=True)
+    with open(os.path.join(dist, MANIFEST), "w") as fh:
+        json.dump(manifest, fh, indent=1, sort_keys=True)
+    return manifest
+
+
+def _current(static_folder, rel, entry):
+    """True if the source file still has the size and content the manifest was built from."""
+    src = os.path.join(static_folder, rel)
+    try:
+        if os.path.getsize(src) != entry["bytes"]:
+            return False
+        if "sha256" not in entry:  # manifests from before the digest was recorded
+            return True
+        with open(src, "rb") as fh:
+            return hashlib.sha256(fh.read()).hexdigest() == entry["sha256"]
+    except OSError:
+        return False
+
+
+class StaticAssets:
+    """
+    Points url_for('static', ...) at the fingerprinted copies listed in dist/manifest.json
+    and serves them with one-year immutable caching, picking the .br/.gz variant the client
+    accepts. Files missing from the manifest (or no manifest at all) are served as before,
+    and so are files edited since the build. Debug mode ignores the manifest.
+    """
+
+    def __init__(self):
+        self.manifest = {}
+        self._by_path = {}
+
+    def init_app(self, app):
+        path = os.path.join(app.static_folder, DIST_DIR, MANIFEST)
+        if app.debug or not app.config.get("STATIC_FINGERPRINTS", True) or not os.path.exists(path):
+            return
+        self.load(path, app.static_folder)
+        app.url_defaults(self._url_defaults)
+        app.view_functions["static"] = self.send_static
+        app.extensions["static_assets"] = self
+
+    def load(self, path, static_folder=None):
+        """Reads the manifest; with static_folder, drops entries whose source no longer matches."""
+        with open(path) as fh:
+            self.manifest = json.load(fh)
+        if static_folder is not None:
+            stale = [rel for rel, entry in self.manifest.items() if not _current(static_folder, rel, entry)]
+            for rel in stale:
+                del self.manifest[rel]
+            if stale:
+                log.warning("%d static files changed since the last build-assets; serving them unhashed: %s",
+                            len(stale), ", ".join(stale[:5]))
+        self._by_path = {entry["path"]: entry for entry in self.manifest.values()}
+
+    def _url_defaults(self, endpoint, values):
+        if endpoint == "static":
+            entry = self.manifest.get(values.get("filename"))
+            if entry is not None:
+                values["filename"] = entry["path"]
+
+    def send_static(self, filename):
+        entry = self._by_path.get(filename)
+        if entry is None:
+            return current_app.send_static_file(filename)
+        mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        folder = current_app.static_folder
+        for enc, suffix in _ENCODINGS:
+            if enc in entry["encodings"] and request.accept_encodings[enc]:
+                resp = send_from_directory(folder, filename + suffix, mimetype=mimetype, max_age=ONE_YEAR)
+                resp.headers["Content-Encoding"] = enc
+                break
+        else:
+            resp = send_from_directory(folder, filename, mimetype=mimetype, max_age=ONE_YEAR)
+        resp.vary.add("Accept-Encoding")
+        resp.cache_control.public = True
+        resp.cache_control.immutable = True
+        return resp
+
+
+static_assets = StaticAssets()
+
+
+def page_report(app, paths, accept_encoding="br, gzip"):
+    """
+    For each page: static files it references, their raw bytes and the bytes actually
+    sent for a client accepting `accept_encoding`. Returns a list of row dicts.
+    """
+    accepted = [e.strip() for e in accept_encoding.split(",")]
+    assets = app.extensions.get("static_assets") or static_assets
+    by_path = assets._by_path
+    rows = []
+    client = app.test_client()
+    for page in paths:
+        resp = client.get(page)
+        html = resp.get_data(as_text=True)
+        refs = sorted(set(_STATIC_REF.findall(html)))
+        raw = sent = 0
+        for ref in refs:
+            entry = by_path.get(ref) or assets.manifest.get(ref)
+            if entry is None:
+                full = os.path.join(app.static_folder, ref)
+                size = os.path.getsize(full) if os.path.exists(full) else 0
+                raw += size
+                sent += size
+                continue
+            raw += entry["bytes"]
+            sent += min([entry["bytes"]] + [n for enc, n in entry["encodings"].items() if enc in accepted])
+        rows.append({"page": page, "status": resp.status_code, "files": len(refs), "raw": raw, "sent": sent, "saved": raw - sent})
+    return rows
@@ -0,0 +1,427 @@
+import csv
+import logging
+import math
+import os
+import random
+import time as _time
+from bisect import bisect_right
+from array import array
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert, select, text
+
+from .. import db
+from ..models import (
+    Appointment, AppointmentEvent, AppointmentStatus, ClinicUnit, PageView, Role, SensitizationPost, User,
+)
+from ..utils.post_render import plain_excerpt, reading_minutes, render_body
+from .passwords import hash_password
+from .scheduling import ACTIVE_STATUSES, active_units, default_unit, ensure_default_unit, slot_start, slot_times
+
+log = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 5000
+HEART_CSV = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "heart.csv")
+HEART_FEATURES = ["age", "sex", "cp", "trestbps", "chol", "fbs", "restecg", "thalach", "exang",
+                  "oldpeak", "slope", "ca", "thal"]
+# continuous columns get kernel noise (share of the column's std) and are rounded to these places
+HEART_CONTINUOUS = {"age": 0, "trestbps": 0, "chol": 0, "thalach": 0, "oldpeak": 1}
+HEART_BANDWIDTH = 0.15
+
+STAFF_EVERY = 2000  # one clinician per this many synthetic users
+PAST_STATUSES = {
+    AppointmentStatus.COMPLETED.value: 0.70,
+    AppointmentStatus.NO_SHOW.value: 0.12,
+    AppointmentStatus.CANCELLED.value: 0.13,
+    AppointmentStatus.BOOKED.value: 0.05,  # not swept yet
+}
+FUTURE_STATUSES = {
+    AppointmentStatus.BOOKED.value: 0.88,
+    AppointmentStatus.CANCELLED.value: 0.12,
+}
+RISK_SHARE = 0.6  # bookings that came through the risk form
+# slot-holding appointments fill at most this share of the places; extra units are added to fit
+TARGET_FILL = 0.8
+EXTRA_UNIT_CAPACITY = 4
+# random draws before scanning for a free place in a nearly full schedule
+PLACE_TRIES = 50
+VIEW_USER_SHARE = 0.15
+VIEWS_PER_SESSION = 5
+PUBLISHED_SHARE = 0.9
+
+FIRST_NAMES = ["Amina", "John", "Grace", "Peter", "Faith", "David", "Mary", "Joseph", "Esther", "Samuel",
+               "Ruth", "Daniel", "Sarah", "Moses", "Joy", "Brian", "Mercy", "Kevin", "Ann", "Victor"]
+LAST_NAMES = ["Otieno", "Wanjiru", "Mwangi", "Achieng", "Kamau", "Njeri", "Ochieng", "Mutua", "Kiptoo",
+              "Wambui", "Odhiambo", "Chebet", "Kariuki", "Atieno", "Mugo", "Nyambura", "Korir", "Adhiambo"]
+SITE_PAGES = ["/", "/sensitization", "/predict/form", "/auth/login", "/appointments/", "/sensitization/search"]
+TOPICS = ["blood pressure", "cholesterol", "stroke", "salt", "exercise", "smoking", "diabetes", "sleep",
+          "stress", "weight", "chest pain", "heart rhythm"]
+SENTENCES = [
+    "Regular check-ups catch {t} problems before they cause symptoms.",
+    "Small daily habits matter more for {t} than occasional big changes.",
+    "Ask a clinician what your {t} numbers mean for you.",
+    "Most people with {t} risks feel completely well.",
+    "Family history makes {t} worth checking earlier.",
+    "Community health workers can help you track {t} over time.",
+]
+TIPS = ["Walk for 30 minutes a day", "Cut down on added salt", "Take medication as prescribed",
+        "Keep a record of your readings", "Avoid tobacco in all forms", "Eat more vegetables and fruit"]
+
+
+class HeartSampler:
+    """
+    Draws synthetic clinical rows from app/data/heart.csv by smoothed bootstrap: pick a
+    real row of the sampled class, then add Gaussian noise to its continuous columns.
+    Keeps the class balance and the correlations between features.
+    """
+
+    def __init__(self, path=HEART_CSV):
+        rows = []
+        with open(path, newline="", encoding="utf-8") as fh:
+            for raw in csv.reader(fh):
+                if len(raw) != len(HEART_FEATURES) + 1 or "?" in raw:
+                    continue
+                try:
+                    values = [float(v) for v in raw]
+                except ValueError:  # header line
+                    continue
+                rows.append((values[:-1], int(values[-1] > 0)))
+        if not rows:
+            raise ValueError(f"no usable rows in {path}")
+        self.by_class = {0: [r for r, y in rows if y == 0], 1: [r for r, y in rows if y == 1]}
+        self.prevalence = len(self.by_class[1]) / len(rows)
+        self.noise, self.bounds = {}, {}
+        for i, name in enumerate(HEART_FEATURES):
+            if name in HEART_CONTINUOUS:
+                col = [r[i] for r, _ in rows]
+                mean = sum(col) / len(col)
+                std = math.sqrt(sum((v - mean) ** 2 for v in col) / len(col))
+                self.noise[i] = std * HEART_BANDWIDTH
+                self.bounds[i] = (min(col), max(col))
+
+    def sample_target(self, rng):
+        return int(rng.random() < self.prevalence)
+
+    def sample(self, rng, target=None):
+        """One row as {feature: value, ..., "target": 0/1}."""
+        target = self.sample_target(rng) if target is None else target
+        row = list(rng.choice(self.by_class[target]))
+        for i, sigma in self.noise.items():
+            lo, hi = self.bounds[i]
+            row[i] = round(min(hi, max(lo, rng.gauss(row[i], sigma))), HEART_CONTINUOUS[HEART_FEATURES[i]])
+        out = {name: (v if name in HEART_CONTINUOUS and HEART_CONTINUOUS[name] else int(v))
+               for name, v in zip(HEART_FEATURES, row)}
+        out["target"] = target
+        return out
+
+
+def write_feature_rows(path, count, seed=None, sampler=None):
+    """Writes `count` sampled rows to path in heart.csv's layout (no header, target last)."""
+    rng = random.Random(seed)
+    sampler = sampler or HeartSampler()
+    with open(path, "w", newline="", encoding="utf-8") as fh:
+        writer = csv.writer(fh)
+        for _ in range(count):
+            row = sampler.sample(rng)
+            writer.writerow([row[name] for name in HEART_FEATURES] + [row["target"]])
+    return count
+
+
+def _weighted(choices):
+    names = list(choices)
+    cum, total = [], 0.0
+    for name in names:
+        total += choices[name]
+        cum.append(total)
+    return names, cum
+
+
+def _timestamp(rng, start, seconds):
+    return start + timedelta(seconds=rng.random() * seconds)
+
+
+def _bulk(model):
+    # Core inserts on the table: the ORM bulk path regroups rows by which columns are NULL
+    def write(batch):
+        db.session.execute(insert(model.__table__), batch)
+        return len(batch)
+    return write
+
+
+def _sync_sequence(model):
+    """Moves a Postgres id sequence past ids that were inserted explicitly."""
+    if db.session.get_bind().dialect.name != "postgresql":
+        return
+    table = model.__tablename__
+    db.session.execute(text(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT max(id) FROM {table}))"))
+    db.session.commit()
+
+
+class SyntheticData:
+    """
+    Fills the database with synthetic users, appointments (+ their events), posts and
+    page views. Every table is written with bulk INSERTs of `chunk_size` rows, each chunk
+    committed on its own; `on_chunk(table, rows_so_far, seconds)` is called after each.
+    """
+
+    def __init__(self, chunk_size=DEFAULT_CHUNK_SIZE, days=365, days_ahead=60, seed=None,
+                 password="Synthetic@123", on_chunk=None, today=None):
+        self.chunk_size = chunk_size
+        self.rng = random.Random(seed)
+        self.now = datetime.utcnow()
+        self.today = today or self.now.date()
+        self.start = self.now - timedelta(days=days)
+        self.window = days * 86400
+        self.days, self.days_ahead = days, days_ahead
+        self.password = password
+        self.on_chunk = on_chunk
+        self.tag = os.urandom(4).hex()  # keeps emails and slugs unique across runs, even with a fixed seed
+        self.sampler = HeartSampler()
+        self.stats = {}
+
+    def _chunks(self, total):
+        for start in range(0, total, self.chunk_size):
+            yield min(self.chunk_size, total - start)
+
+    def _write(self, table, total, make_rows, write):
+        stats = self.stats.setdefault(table, {"rows": 0, "seconds": 0.0})
+        started = _time.perf_counter()
+        for size in self._chunks(total):
+            try:
+                stats["rows"] += write(make_rows(size))
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            if self.on_chunk:
+                self.on_chunk(table, stats["rows"], _time.perf_counter() - started)
+        stats["seconds"] += _time.perf_counter() - started
+        log.info("synthetic %s: %d rows in %.1fs", table, stats["rows"], stats["seconds"])
+
+    # -- users -----------------------------------------------------------------
+
+    def users(self, count):
+        # one hash shared by every synthetic account: they can all sign in, and hashing
+        # millions of passwords would dominate the run
+        password_hash = hash_password(self.password)
+        rng, made = self.rng, [0]
+
+        def rows(size):
+            out = []
+            for _ in range(size):
+                made[0] += 1
+                staff = made[0] % STAFF_EVERY == 0
+                out.append({
+                    "email": f"{'staff' if staff else 'patient'}{made[0]}.{self.tag}@synthetic.local",
+                    "full_name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+                    "password_hash": password_hash,
+                    "role": Role.CLINICIAN.value if staff else Role.PATIENT.value,
+                    "created_at": _timestamp(rng, self.start, self.window),
+                })
+            return out
+
+        self._write("users", count, rows, _bulk(User))
+
+    # -- appointments + events -----------------------------------------------------
+
+    def _places(self, span):
+        """[(unit, slots)], a flat array of free places per (unit, day, slot) and each unit's first index."""
+        units = [(u, slot_times(u)) for u in active_units()]
+        offsets, free = [], array("l")
+        for unit, slots in units:
+            offsets.append(len(free))
+            free.extend(array("l", [unit.capacity]) * (span * len(slots)))
+        # bookings already in the window hold their places too
+        first_day = self.today - timedelta(days=self.days)
+        by_unit = {u.id: (u, slots, offset) for (u, slots), offset in zip(units, offsets)}
+        fallback = default_unit().id
+        for unit_id, day, t, n in db.session.execute(
+            select(Appointment.clinic_unit_id, Appointment.appointment_date, Appointment.appointment_time,
+                   func.count(Appointment.id))
+            .where(Appointment.appointment_date >= first_day,
+                   Appointment.appointment_date < first_day + timedelta(days=span),
+                   Appointment.status.in_(ACTIVE_STATUSES))
+            .group_by(Appointment.clinic_unit_id, Appointment.appointment_date, Appointment.appointment_time)
+        ):
+            entry = by_unit.get(unit_id or fallback)
+            if entry is None:
+                continue
+            unit, slots, offset = entry
+            start = slot_start(unit, t)
+            if start in slots:
+                i = offset + (day - first_day).days * len(slots) + slots.index(start)
+                free[i] = max(0, free[i] - n)
+        return units, free, offsets
+
+    def _add_units(self, needed_places):
+        """Adds synthetic clinic units with at least `needed_places` places over the generated window."""
+        template = default_unit()
+        span = self.days + self.days_ahead + 1
+        per_unit = len(slot_times(template)) * EXTRA_UNIT_CAPACITY * span
+        added = math.ceil(needed_places / per_unit)
+        for n in range(added):
+            db.session.add(ClinicUnit(name=f"Synthetic clinic {self.tag}-{n + 1}", opens_at=template.opens_at,
+                                      closes_at=template.closes_at, slot_minutes=template.slot_minutes,
+                                      capacity=EXTRA_UNIT_CAPACITY, is_active=True))
+        db.session.commit()
+        log.info("synthetic: added %d clinic units of capacity %d", added, EXTRA_UNIT_CAPACITY)
+
+    def appointments(self, count, add_units=True):
+        """
+        Books `count` appointments without overbooking: slot-holding ones (booked, completed)
+        never exceed a unit's capacity in a slot. With add_units, clinic units are added until
+        they fill at most TARGET_FILL of the places; otherwise more bookings than places is a ValueError.
+        """
+        rng = self.rng
+        patients = array("q", db.session.execute(
+            select(User.id).where(User.role == Role.PATIENT.value)).scalars())
+        if not patients:
+            raise ValueError("no patients to book appointments for; generate users first")
+        ensure_default_unit()
+        span = self.days + self.days_ahead + 1
+        units, free, offsets = self._places(span)
+        if add_units and sum(free) * TARGET_FILL < count:
+            self._add_units(count / TARGET_FILL - sum(free))
+            units, free, offsets = self._places(span)
+        if count > sum(free):
+            raise ValueError(
+                f"{count} appointments don't fit: {len(units)} active clinic units have {sum(free)} free places "
+                f"over {span} days; generate fewer appointments, use a longer --days window or add units"
+            )
+        past = _weighted(PAST_STATUSES)
+        future = _weighted(FUTURE_STATUSES)
+        first_day = self.today - timedelta(days=self.days)
+        events = self.stats.setdefault("appointment_events", {"rows": 0, "seconds": 0.0})
+
+        def at_place(i):
+            u = bisect_right(offsets, i) - 1
+            unit, slots = units[u]
+            day, slot = divmod(i - offsets[u], len(slots))
+            return unit, datetime.combine(first_day + timedelta(days=day), slots[slot])
+
+        def book():
+            """(unit, start, status); only booked/completed rows take one of a slot's places."""
+            for _ in range(PLACE_TRIES):
+                i = rng.randrange(len(free))
+                unit, at = at_place(i)
+                names, cum = past if at < self.now else future
+                status = rng.choices(names, cum_weights=cum)[0]
+                if status not in ACTIVE_STATUSES:
+                    return unit, at, status
+                if free[i]:
+                    free[i] -= 1
+                    return unit, at, status
+            # nearly full: take the next free place after the last draw
+            i = next(j % len(free) for j in range(i, i + len(free)) if free[j % len(free)])
+            free[i] -= 1
+            unit, at = at_place(i)
+            return unit, at, (AppointmentStatus.COMPLETED.value if at < self.now else AppointmentStatus.BOOKED.value)
+
+        def rows(size):
+            out = []
+            for _ in range(size):
+                unit, at, status = book()
+                risk = label = None
+                if rng.random() < RISK_SHARE:
+                    # skewed high for patients drawn from the diseased class, low otherwise
+                    risk = round(rng.betavariate(5, 2) if self.sampler.sample_target(rng) else rng.betavariate(2, 5), 4)
+                    label = "high" if risk >= 0.5 else "low"
+                created = at - timedelta(seconds=rng.randrange(3600, 30 * 86400))
+                out.append({
+                    "patient_id": rng.choice(patients),
+                    "appointment_date": at.date(),
+                    "appointment_time": at.time(),
+                    "clinic_unit": unit.name,
+                    "clinic_unit_id": unit.id,
+                    "status": status,
+                    "risk_score": risk,
+                    "risk_label": label,
+                    "created_at": created,
+                    "updated_at": created if status == AppointmentStatus.BOOKED.value else at,
+                })
+            return out
+
+        def write(batch):
+            # explicit ids instead of RETURNING, which SQLite can only do one row per statement
+            first = (db.session.execute(select(func.max(Appointment.id))).scalar() or 0) + 1
+            ids = range(first, first + len(batch))
+            for appt_id, row in zip(ids, batch):
+                row["id"] = appt_id
+            db.session.execute(insert(Appointment.__table__), batch)
+            trail = []
+            for appt_id, row in zip(ids, batch):
+                trail.append({"appointment_id": appt_id, "event_type": "booked",
+                              "event_time": row["created_at"], "notes": "Booked via web portal"})
+                if row["risk_score"] is not None:
+                    trail.append({"appointment_id": appt_id, "event_type": "risk_attached",
+                                  "event_time": row["created_at"],
+                                  "notes": f"Risk score attached: {row['risk_score']:.4f} ({row['risk_label']})"})
+                if row["status"] != AppointmentStatus.BOOKED.value:
+                    trail.append({"appointment_id": appt_id, "event_type": f"status:{row['status']}",
+                                  "event_time": row["updated_at"], "notes": "Updated by staff"})
+            db.session.execute(insert(AppointmentEvent.__table__), trail)
+            events["rows"] += len(trail)
+            return len(ids)
+
+        self._write("appointments", count, rows, write)
+        _sync_sequence(Appointment)
+        events["seconds"] = self.stats["appointments"]["seconds"]  # written in the same transactions
+
+    # -- awareness posts ------------------------------------------------------------
+
+    def posts(self, count):
+        rng, made = self.rng, [0]
+
+        def rows(size):
+            out = []
+            for _ in range(size):
+                made[0] += 1
+                topic = rng.choice(TOPICS)
+                paragraphs = [" ".join(s.format(t=topic) for s in rng.sample(SENTENCES, 3)) for _ in range(rng.randint(2, 5))]
+                body = "\n\n".join(paragraphs) + "\n\n" + "\n".join(f"• {tip}" for tip in rng.sample(TIPS, 3))
+                out.append({
+                    "title": f"{topic.capitalize()}: what to know ({made[0]})",
+                    "slug": f"{topic.replace(' ', '-')}-{self.tag}-{made[0]}",
+                    "body": body,
+                    "body_html": render_body(body),
+                    "excerpt": plain_excerpt(body),
+                    "reading_minutes": reading_minutes(body),
+                    "is_published": rng.random() < PUBLISHED_SHARE,
+                    "created_at": _timestamp(rng, self.start, self.window),
+                })
+            return out
+
+        self._write("posts", count, rows, _bulk(SensitizationPost))
+
+    # -- page views -------------------------------------------------------------------
+
+    def page_views(self, count):
+        rng = self.rng
+        slugs = db.session.execute(
+            select(SensitizationPost.slug).where(SensitizationPost.is_published.is_(True))
+        ).scalars().all()
+        pages = SITE_PAGES + [f"/sensitization/post/{s}" for s in slugs]
+        # Zipf-like popularity: a handful of pages get most of the traffic
+        names, cum = _weighted({p: 1 / (rank + 1) ** 1.1 for rank, p in enumerate(pages)})
+        users = db.session.execute(select(User.id).limit(100000)).scalars().all()
+        session = [None, 0]
+        made = [0]
+        step = self.window / max(count, 1)
+
+        def rows(size):
+            out = []
+            for _ in range(size):
+                made[0] += 1
+                if session[1] <= 0:
+                    session[:] = [f"{rng.getrandbits(128):032x}", rng.randint(1, 2 * VIEWS_PER_SESSION)]
+                session[1] -= 1
+                out.append({
+                    "page": rng.choices(names, cum_weights=cum)[0],
+                    "user_id": rng.choice(users) if users and rng.random() < VIEW_USER_SHARE else None,
+                    "session_id": session[0],
+                    # in id order, like the append-only log, so the rollup's high-water mark works
+                    "timestamp": self.start + timedelta(seconds=(made[0] - rng.random()) * step),
+                })
+            return out
+
+        self._write("page_views", count, rows, _bulk(PageView))
@@ -0,0 +1,121 @@
+import os
+import threading
+import time as _time
+
+from flask_login import UserMixin
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from .. import db, login_manager
+from ..models import User
+
+# session.info key: users changed in the session's open transaction
+_PENDING = "user_cache_pending"
+
+
+class CachedUser(UserMixin):
+    """Detached, read-only stand-in for User used as current_user."""
+
+    __slots__ = ("id", "role", "full_name", "email")
+
+    def __init__(self, id, role, full_name, email):
+        self.id = id
+        self.role = role
+        self.full_name = full_name
+        self.email = email
+
+    def has_role(self, *roles: str) -> bool:
+        return self.role in roles
+
+
+class UserCache:
+    """
+    Per-process TTL cache of CachedUser records keyed by user id.
+
+    Local writes invalidate through SQLAlchemy events on User, at flush and again after
+    commit so a request that loads the user in between can't re-cache the old row. The TTL
+    bounds how long another worker process can serve a stale role. ttl <= 0 disables caching.
+    """
+
+    def __init__(self, ttl=60.0, max_entries=50000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id, loader):
+        if self.ttl <= 0:
+            self.misses += 1
+            return loader(user_id)
+        now = _time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > now:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        record = loader(user_id)
+        if record is not None:
+            with self._lock:
+                if len(self._entries) >= self.max_entries:
+                    self._entries.clear()
+                self._entries[user_id] = (now + self.ttl, record)
+        return record
+
+    def init_app(self, app):
+        """Installs the cached Flask-Login user loader and the User invalidation hooks."""
+        login_manager.user_loader(_load_user)
+        for target, name, fn in ((User, "after_update", _invalidate_on_flush),
+                                 (User, "after_delete", _invalidate_on_flush),
+                                 (Session, "after_commit", _invalidate_on_commit),
+                                 (Session, "after_rollback", _forget_pending)):
+            if not event.contains(target, name, fn):
+                event.listen(target, name, fn)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+user_cache = UserCache(ttl=float(os.getenv("USER_CACHE_TTL", "60")))
+
+
+def _load_cached_user(user_id):
+    row = db.session.query(User.id, User.role, User.full_name, User.email).filter(User.id == user_id).first()
+    return CachedUser(*row) if row else None
+
+
+def _load_user(user_id):
+    return user_cache.get(int(user_id), _load_cached_user)
+
+
+def _invalidate_on_flush(mapper, connection, target):
+    user_cache.invalidate(target.id)
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(_PENDING, set()).add(target.id)
+
+
+def _invalidate_on_commit(session):
+    for user_id in session.info.pop(_PENDING, ()):
+        user_cache.invalidate(user_id)
+
+
+def _forget_pending(session):
+    session.info.pop(_PENDING, None)
@@ -0,0 +1,101 @@
+import csv
+import logging
+import os
+import time as _time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from sqlalchemy import insert, select
+from werkzeug.security import generate_password_hash
+
+from .. import db
+from ..models import Role, User
+from .passwords import HASH_METHOD
+
+log = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 1000
+CSV_COLUMNS = ["email", "full_name", "role", "password"]
+ROLES = {r.value for r in Role}
+
+
+def _batches(reader, size):
+    batch = []
+    for item in reader:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def provision_users(fileobj, batch_size=DEFAULT_BATCH_SIZE, workers=None, method=HASH_METHOD,
+                    on_reject=None, on_batch=None):
+    """
+    Streams a CSV of users (see CSV_COLUMNS) into the users table.
+
+    Per batch: one `email IN (...)` lookup drops accounts that already exist, passwords
+    are hashed in parallel on a process pool, and the rows go in with one bulk INSERT
+    committed on its own. Returns stats incl. rows_per_sec.
+    """
+    stats = {"read": 0, "created": 0, "skipped": 0, "rejected": 0, "batches": 0, "seconds": 0.0, "rows_per_sec": 0.0}
+    started = _time.perf_counter()
+    hash_fn = partial(generate_password_hash, method=method)
+    workers = workers or os.cpu_count() or 1
+    seen = set()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for batch in _batches(enumerate(csv.DictReader(fileobj), start=2), batch_size):
+            t0 = _time.perf_counter()
+            stats["read"] += len(batch)
+
+            rows = []
+            for line_no, raw in batch:
+                email = (raw.get("email") or "").strip().lower()
+                full_name = (raw.get("full_name") or "").strip()
+                role = (raw.get("role") or Role.PATIENT.value).strip().lower()
+                password = raw.get("password") or ""
+                reason = None
+                if not email or not full_name or not password:
+                    reason = "email, full_name and password are required"
+                elif role not in ROLES:
+                    reason = f"invalid role {role}"
+                elif email in seen:
+                    reason = "duplicate email in file"
+                if reason:
+                    stats["rejected"] += 1
+                    if on_reject:
+                        on_reject(line_no, raw, reason)
+                    continue
+                seen.add(email)
+                rows.append({"email": email, "full_name": full_name, "role": role, "password": password})
+
+            existing = set(db.session.execute(
+                select(User.email).where(User.email.in_([r["email"] for r in rows]))
+            ).scalars()) if rows else set()
+            new_rows = [r for r in rows if r["email"] not in existing]
+            stats["skipped"] += len(rows) - len(new_rows)
+
+            if new_rows:
+                chunksize = max(1, len(new_rows) // (workers * 4))
+                hashes = pool.map(hash_fn, [r.pop("password") for r in new_rows], chunksize=chunksize)
+                for r, h in zip(new_rows, hashes):
+                    r["password_hash"] = h
+                try:
+                    db.session.execute(insert(User), new_rows)
+                    db.session.commit()
+                except Exception:
+                    db.session.rollback()
+                    raise
+                stats["created"] += len(new_rows)
+
+            stats["batches"] += 1
+            elapsed = _time.perf_counter() - t0
+            log.info("provision batch %d: %d created of %d in %.3fs", stats["batches"], len(new_rows), len(batch), elapsed)
+            if on_batch:
+                on_batch(stats, elapsed)
+
+    stats["seconds"] = _time.perf_counter() - started
+    stats["rows_per_sec"] = stats["read"] / stats["seconds"] if stats["seconds"] else 0.0
+    return stats
@@ -0,0 +1,177 @@
+import heapq
+import logging
+import threading
+import time as _time
+from datetime import datetime
+
+from sqlalchemy import update
+
+from .. import db
+from ..models import Appointment, AppointmentEvent, AppointmentStatus, WaitlistEntry, WaitlistStatus
+from .scheduling import has_capacity, invalidate_for, resolve_unit
+
+log = logging.getLogger(__name__)
+
+ANY_DAY = None
+
+
+def _priority(entry):
+    # min-heap: highest risk first, then longest wait, then id for a stable order
+    created = entry.created_at or datetime.utcnow()
+    return (-(entry.risk_score or 0.0), created.timestamp(), entry.id)
+
+
+def waiting_entries_query():
+    return WaitlistEntry.query.filter_by(status=WaitlistStatus.WAITING.value)
+
+
+class WaitlistQueue:
+    """
+    In-process priority queue over WAITING waitlist entries.
+
+    One heap per desired date plus one for "any day"; a freed slot compares the heads of
+    its day's heap and the any-day heap, so picking the next patient is O(log n).
+    The database stays the source of truth: entries claimed elsewhere are dropped lazily
+    when their conditional UPDATE fails, and the heaps are rebuilt every `refresh_seconds`
+    so joins made by other worker processes show up.
+    """
+
+    def __init__(self, refresh_seconds=60):
+        self.refresh_seconds = refresh_seconds
+        self.lock = threading.RLock()
+        self._heaps = {}
+        self._loaded_at = None
+
+    def ensure_loaded(self):
+        with self.lock:
+            if self._loaded_at is not None and _time.monotonic() - self._loaded_at < self.refresh_seconds:
+                return
+            heaps = {}
+            for e in waiting_entries_query().all():
+                heaps.setdefault(e.desired_date, []).append(_priority(e))
+            for h in heaps.values():
+                heapq.heapify(h)
+            self._heaps = heaps
+            self._loaded_at = _time.monotonic()
+
+    def invalidate(self):
+        with self.lock:
+            self._loaded_at = None
+
+    def push(self, entry):
+        with self.lock:
+            if self._loaded_at is None:
+                return  # picked up by the next full load
+            heapq.heappush(self._heaps.setdefault(entry.desired_date, []), _priority(entry))
+
+    def _push_key(self, day, key):
+        heapq.heappush(self._heaps.setdefault(day, []), key)
+
+    def pop_for(self, slot_date):
+        """Pops the best candidate for slot_date; returns (day, key) or None."""
+        with self.lock:
+            self.ensure_loaded()
+            day_heap = self._heaps.get(slot_date) or []
+            any_heap = self._heaps.get(ANY_DAY) or []
+            if not day_heap and not any_heap:
+                return None
+            if day_heap and (not any_heap or day_heap[0] <= any_heap[0]):
+                return slot_date, heapq.heappop(day_heap)
+            return ANY_DAY, heapq.heappop(any_heap)
+
+    def __len__(self):
+        with self.lock:
+            return sum(len(h) for h in self._heaps.values())
+
+
+waitlist = WaitlistQueue()
+
+
+def join_waitlist(patient_id, desired_date=None, risk_score=None):
+    entry = WaitlistEntry(
+        patient_id=patient_id,
+        desired_date=desired_date,
+        risk_score=risk_score,
+        status=WaitlistStatus.WAITING.value,
+    )
+    db.session.add(entry)
+    db.session.commit()
+    waitlist.push(entry)
+    return entry
+
+
+def allocate_slot(slot_date, slot_time, clinic_unit_id=None, now=None):
+    """
+    Offers a freed slot to the highest-priority waiting patient.
+
+    The entry claim, the slot re-check and the new booking are committed in one
+    transaction, so a slot is never handed out twice and an entry is never
+    allocated twice. Returns the new Appointment, or None if nobody could take it.
+    """
+    now = now or datetime.utcnow()
+    if datetime.combine(slot_date, slot_time) <= now:
+        return None
+    unit = resolve_unit(clinic_unit_id)
+
+    with waitlist.lock:
+        while True:
+            candidate = waitlist.pop_for(slot_date)
+            if candidate is None:
+                return None
+            day, key = candidate
+            entry_id = key[2]
+            try:
+                claimed = db.session.execute(
+                    update(WaitlistEntry)
+                    .where(WaitlistEntry.id == entry_id, WaitlistEntry.status == WaitlistStatus.WAITING.value)
+                    .values(status=WaitlistStatus.ALLOCATED.value, allocated_at=now)
+                    .execution_options(synchronize_session=False)
+                ).rowcount
+                if claimed != 1:
+                    # withdrawn or allocated by another worker; drop it and try the next one
+                    db.session.rollback()
+                    continue
+
+                if not has_capacity(unit, slot_date, slot_time):
+                    db.session.rollback()
+                    waitlist._push_key(day, key)
+                    return None
+
+                entry = db.session.get(WaitlistEntry, entry_id)
+                appt = Appointment(
+                    patient_id=entry.patient_id,
+                    appointment_date=slot_date,
+                    appointment_time=slot_time,
+                    clinic_unit=unit.name,
+                    clinic_unit_id=unit.id,
+                    status=AppointmentStatus.BOOKED.value,
+                    risk_score=entry.risk_score,
+                    risk_label=None if entry.risk_score is None else ("high" if entry.risk_score >= 0.5 else "low"),
+                )
+                db.session.add(appt)
+                db.session.flush()
+                entry.appointment_id = appt.id
+                db.session.add(AppointmentEvent(
+                    appointment_id=appt.id,
+                    event_type="booked",
+                    notes=f"Allocated from waitlist (entry #{entry.id})",
+                ))
+                db.session.commit()
+                invalidate_for(appt)
+                return appt
+            except Exception:
+                db.session.rollback()
+                waitlist._push_key(day, key)
+                raise
+
+
+def offer_freed_slot(slot_date, slot_time, clinic_unit_id=None):
+    """Hook for cancel/no-show paths; never lets a waitlist failure break the caller."""
+    try:
+        appt = allocate_slot(slot_date, slot_time, clinic_unit_id)
+    except Exception:
+        log.exception("waitlist allocation failed for %s %s", slot_date, slot_time)
+        return None
+    if appt:
+        log.info("waitlist: slot %s given to patient %s", appt.slot_key, appt.patient_id)
+    return appt
@@ -0,0 +1,50 @@
+import os
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+
+def _env_int(name, default):
+    return int(os.getenv(name, "") or default)
+
+
+def engine_options(db_url):
+    """SQLALCHEMY_ENGINE_OPTIONS for db_url, tuned from DB_* / SQLITE_* environment variables."""
+    backend = make_url(db_url).get_backend_name()
+    if backend == "sqlite":
+        # the sqlite3 driver's own busy handler; the busy_timeout pragma below matches it
+        return {"connect_args": {"timeout": _env_int("SQLITE_BUSY_TIMEOUT_MS", 5000) / 1000}}
+    return {
+        "pool_size": _env_int("DB_POOL_SIZE", 5),
+        "max_overflow": _env_int("DB_MAX_OVERFLOW", 10),
+        "pool_timeout": _env_int("DB_POOL_TIMEOUT", 30),
+        "pool_recycle": _env_int("DB_POOL_RECYCLE", 1800),
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "1") == "1",
+    }
+
+
+def sqlite_pragmas():
+    return {
+        "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+        "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+        "busy_timeout": _env_int("SQLITE_BUSY_TIMEOUT_MS", 5000),
+        # negative cache_size is in KiB
+        "cache_size": -_env_int("SQLITE_CACHE_SIZE_KB", 20000),
+        "mmap_size": _env_int("SQLITE_MMAP_SIZE", 256 * 1024 * 1024),
+    }
+
+
+def apply_sqlite_pragmas(engine, pragmas=None):
+    """Runs the pragmas on every new SQLite connection of `engine`; no-op for other databases."""
+    if engine.dialect.name != "sqlite" or engine.url.database in (None, "", ":memory:"):
+        return
+    pragmas = pragmas or sqlite_pragmas()
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_conn, _record):
+        cur = dbapi_conn.cursor()
+        try:
+            for name, value in pragmas.items():
+                cur.execute(f"PRAGMA {name}={value}")
+        finally:
+            cur.close()
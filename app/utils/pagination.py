@@ -0,0 +1,75 @@
+from datetime import datetime
+
+from sqlalchemy import literal, tuple_
+
+CURSOR_SEP = "_"
+
+
+def encode_cursor(appt):
+    """(appointment_date, appointment_time, id) -> opaque query-string token."""
+    return CURSOR_SEP.join((
+        appt.appointment_date.isoformat(),
+        appt.appointment_time.strftime("%H:%M:%S"),
+        str(appt.id),
+    ))
+
+
+def decode_cursor(token):
+    """Returns (date, time, id) or None for a missing/garbled token."""
+    if not token:
+        return None
+    try:
+        d, t, i = token.split(CURSOR_SEP)
+        return (
+            datetime.strptime(d, "%Y-%m-%d").date(),
+            datetime.strptime(t, "%H:%M:%S").time(),
+            int(i),
+        )
+    except Exception:
+        return None
+
+
+def encode_event_cursor(event):
+    """(event_time, id) -> token for appointment timelines."""
+    return f"{event.event_time.isoformat()}{CURSOR_SEP}{event.id}"
+
+
+def decode_event_cursor(token):
+    if not token:
+        return None
+    try:
+        ts, i = token.rsplit(CURSOR_SEP, 1)
+        return datetime.fromisoformat(ts), int(i)
+    except Exception:
+        return None
+
+
+def seek_after(columns, values, descending=False):
+    """
+    Keyset predicate "rows strictly after `values` in (columns...) order".
+
+    Written as a row-value comparison: SQLite (>= 3.15) and Postgres both turn it into an
+    index range scan, whereas the equivalent nested OR/AND only seeks on the equality
+    prefix once the values are bound parameters.
+    """
+    row = tuple_(*columns)
+    bound = tuple_(*[literal(v, type_=c.type) for c, v in zip(columns, values)])
+    return row < bound if descending else row > bound
+
+
+def keyset_query(query, columns, cursor, page_size, descending=False):
+    """The page query: seek predicate + ORDER BY + LIMIT page_size + 1."""
+    if cursor is not None:
+        query = query.filter(seek_after(columns, cursor, descending))
+    order = [c.desc() if descending else c.asc() for c in columns]
+    return query.order_by(*order).limit(page_size + 1)
+
+
+def keyset_page(query, columns, cursor, page_size, descending=False):
+    """
+    Runs keyset_query and returns (rows, has_more).
+
+    Fetches one extra row to tell whether a next page exists, so no COUNT is needed.
+    """
+    rows = keyset_query(query, columns, cursor, page_size, descending).all()
+    return rows[:page_size], len(rows) > page_size
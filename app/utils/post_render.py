@@ -0,0 +1,69 @@
+import html
+import math
+import re
+
+BULLETS = ("•", "-", "*")
+EXCERPT_LENGTH = 140
+WORDS_PER_MINUTE = 200
+_WS = re.compile(r"\s+")
+
+
+def _bullet(line):
+    for mark in BULLETS:
+        if line.startswith(mark + " ") or (mark == "•" and line.startswith(mark)):
+            return line[len(mark):].strip()
+    return None
+
+
+def render_body(text):
+    """
+    Plain-text post body -> HTML. Blank lines separate paragraphs, runs of bullet lines
+    (•, - or *) become a <ul>, other single newlines become <br>. Every piece of text is
+    escaped, so the output is safe to emit as-is.
+    """
+    blocks = []
+    for chunk in re.split(r"\n\s*\n", (text or "").replace("\r\n", "\n").strip()):
+        lines = [line.strip() for line in chunk.split("\n") if line.strip()]
+        para, items = [], []
+
+        def close_para():
+            if para:
+                blocks.append("<p>" + "<br>".join(para) + "</p>")
+                para.clear()
+
+        def close_list():
+            if items:
+                blocks.append("<ul>" + "".join(f"<li>{i}</li>" for i in items) + "</ul>")
+                items.clear()
+
+        for line in lines:
+            item = _bullet(line)
+            if item is not None:
+                close_para()
+                items.append(html.escape(item))
+            else:
+                close_list()
+                para.append(html.escape(line))
+        close_para()
+        close_list()
+    return "\n".join(blocks)
+
+
+def plain_excerpt(text, length=EXCERPT_LENGTH):
+    flat = _WS.sub(" ", (text or "").replace("•", " ")).strip()
+    if len(flat) <= length:
+        return flat
+    cut = flat[:length].rsplit(" ", 1)[0] or flat[:length]
+    return cut.rstrip(" ,;:.") + "…"
+
+
+def reading_minutes(text):
+    return max(1, math.ceil(len((text or "").split()) / WORDS_PER_MINUTE))
+
+
+def prerender(post):
+    """Fills the stored body_html / excerpt / reading_minutes columns from post.body."""
+    post.body_html = render_body(post.body)
+    post.excerpt = plain_excerpt(post.body)
+    post.reading_minutes = reading_minutes(post.body)
+    return post
@@ -0,0 +1,83 @@
+"""
+Page latency for the patient appointment list and the day schedule, keyset vs OFFSET,
+on a scratch SQLite database with one very long patient history and one very busy day.
+
+    python benchmarks/appointment_pages.py --history 200000 --busy-day 20000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, time as dtime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def timed(fn, repeat=20):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--history", type=int, default=200000, help="appointments for the long-history patient")
+    ap.add_argument("--busy-day", type=int, default=20000, help="appointments on the busy day")
+    ap.add_argument("--page-size", type=int, default=20)
+    args = ap.parse_args()
+
+    tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+    tmp.close()
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmp.name}"
+
+    from sqlalchemy import insert
+    from app import create_app, db
+    from app.models import User, Appointment
+    from app.utils.pagination import keyset_page
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        db.session.execute(insert(User), [
+            {"email": f"u{i}@bench.local", "full_name": f"U{i}", "password_hash": "x", "role": "patient"}
+            for i in range(2)
+        ])
+        start = date(2000, 1, 1)
+        busy = date(2030, 1, 1)
+        rows = [
+            {"patient_id": 1, "appointment_date": start + timedelta(days=i // 8),
+             "appointment_time": dtime(9 + i % 8, 0), "status": "completed"}
+            for i in range(args.history)
+        ] + [
+            {"patient_id": 2, "appointment_date": busy,
+             "appointment_time": dtime(8 + (i // 60) % 10, i % 60), "status": "booked"}
+            for i in range(args.busy_day)
+        ]
+        for i in range(0, len(rows), 50000):
+            db.session.execute(insert(Appointment), rows[i:i + 50000])
+        db.session.commit()
+
+        cols = [Appointment.appointment_date, Appointment.appointment_time, Appointment.id]
+        views = {
+            "patient list": (Appointment.query.filter_by(patient_id=1), args.history, True),
+            "day schedule": (Appointment.query.filter_by(appointment_date=busy), args.busy_day, False),
+        }
+        print(f"{'view':<14}{'depth':>10}{'keyset ms':>12}{'offset ms':>12}")
+        for name, (q, total, desc) in views.items():
+            order = [c.desc() if desc else c.asc() for c in cols]
+            for frac in (0.0, 0.5, 0.99):
+                offset = int(total * frac)
+                anchor = q.order_by(*order).offset(max(offset - 1, 0)).first() if offset else None
+                cursor = (anchor.appointment_date, anchor.appointment_time, anchor.id) if anchor else None
+                k = timed(lambda: keyset_page(q, cols, cursor, args.page_size, descending=desc))
+                o = timed(lambda: q.order_by(*order).offset(offset).limit(args.page_size).all())
+                print(f"{name:<14}{offset:>10}{k:>12.2f}{o:>12.2f}")
+    os.unlink(tmp.name)
+
+
+if __name__ == "__main__":
+    main()
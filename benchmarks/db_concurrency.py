@@ -0,0 +1,130 @@
+"""
+Mixed read/write load from many threads against SQLite, with the old connection settings
+(rollback journal, synchronous=FULL, small cache) and with the WAL/pragma defaults.
+
+Each thread loops for --seconds: a write is a page-view insert plus an appointment status
+update in one transaction, a read is a day's schedule plus the latest page views.
+
+    python benchmarks/db_concurrency.py --threads 16 --seconds 5 --write-ratio 0.3
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, datetime, time as dtime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+LEGACY = {"SQLITE_JOURNAL_MODE": "DELETE", "SQLITE_SYNCHRONOUS": "FULL",
+          "SQLITE_CACHE_SIZE_KB": "2000", "SQLITE_MMAP_SIZE": "0"}
+TUNED = {"SQLITE_JOURNAL_MODE": "WAL", "SQLITE_SYNCHRONOUS": "NORMAL",
+         "SQLITE_CACHE_SIZE_KB": "20000", "SQLITE_MMAP_SIZE": str(256 * 1024 * 1024)}
+
+
+def run(settings, args):
+    tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+    tmp.close()
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmp.name}"
+    os.environ.update(settings)
+
+    from sqlalchemy import insert, select, update
+    from sqlalchemy.exc import OperationalError
+    from app import create_app, db
+    from app.models import Appointment, AppointmentStatus, PageView, User
+
+    app = create_app()
+    start_day = date.today()
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(id=1, email="bench@bench.local", full_name="Bench", role="patient", password_hash="x"))
+        db.session.execute(insert(Appointment), [
+            {"patient_id": 1, "appointment_date": start_day + timedelta(days=i % 30),
+             "appointment_time": dtime(9 + (i // 30) % 8, (i * 7) % 60), "status": AppointmentStatus.BOOKED.value}
+            for i in range(args.appointments)
+        ])
+        db.session.commit()
+
+    stop = threading.Event()
+    lock = threading.Lock()
+    results = {"read": [], "write": [], "locked": 0}
+
+    def worker(seed):
+        rng = random.Random(seed)
+        reads, writes, locked = [], [], 0
+        with app.app_context():
+            while not stop.is_set():
+                is_write = rng.random() < args.write_ratio
+                t0 = time.perf_counter()
+                try:
+                    if is_write:
+                        db.session.execute(insert(PageView).values(page="/bench", timestamp=datetime.utcnow()))
+                        db.session.execute(
+                            update(Appointment)
+                            .where(Appointment.id == rng.randint(1, args.appointments))
+                            .values(status=rng.choice([AppointmentStatus.BOOKED.value, AppointmentStatus.COMPLETED.value]))
+                        )
+                        db.session.commit()
+                    else:
+                        day = start_day + timedelta(days=rng.randrange(30))
+                        db.session.execute(
+                            select(Appointment).where(Appointment.appointment_date == day)
+                            .order_by(Appointment.appointment_time)
+                        ).all()
+                        db.session.execute(select(PageView).order_by(PageView.id.desc()).limit(20)).all()
+                        db.session.commit()
+                except OperationalError:
+                    db.session.rollback()
+                    locked += 1
+                    continue
+                (writes if is_write else reads).append((time.perf_counter() - t0) * 1000)
+            db.session.remove()
+        with lock:
+            results["read"] += reads
+            results["write"] += writes
+            results["locked"] += locked
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+    for t in threads:
+        t.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    with app.app_context():
+        db.engine.dispose()
+    for suffix in ("", "-wal", "-shm", "-journal"):
+        if os.path.exists(tmp.name + suffix):
+            os.unlink(tmp.name + suffix)
+    return results
+
+
+def summary(samples):
+    if not samples:
+        return 0.0, 0.0
+    samples = sorted(samples)
+    return statistics.median(samples), samples[int(len(samples) * 0.95)]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--threads", type=int, default=16)
+    ap.add_argument("--seconds", type=float, default=5)
+    ap.add_argument("--write-ratio", type=float, default=0.3)
+    ap.add_argument("--appointments", type=int, default=3000)
+    args = ap.parse_args()
+
+    print(f"{'':<8}{'ops/s':>8}{'read p50':>10}{'read p95':>10}{'write p50':>11}{'write p95':>11}{'locked':>8}")
+    for label, settings in (("legacy", LEGACY), ("wal", TUNED)):
+        r = run(settings, args)
+        ops = (len(r["read"]) + len(r["write"])) / args.seconds
+        rp50, rp95 = summary(r["read"])
+        wp50, wp95 = summary(r["write"])
+        print(f"{label:<8}{ops:>8.0f}{rp50:>10.2f}{rp95:>10.2f}{wp50:>11.2f}{wp95:>11.2f}{r['locked']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,376 @@
+"""
+Load generator for the main user journeys against a locally started app.
+
+Virtual users pick a journey by weight and run it step by step over HTTP with their
+own cookie jar:
+  patient  register -> login -> predict form -> /predict/run -> booking form -> book -> my appointments
+  staff    login -> day schedule -> status update (prepare_database books a few slots per day)
+  reader   sensitization index -> post -> search
+Each step checks the status code (and redirect target), so flash-and-redirect failures
+count as errors. Reports throughput, p50/p90/p99 and error rate per step.
+
+    python benchmarks/loadtest.py --users 20 --duration 30
+    python benchmarks/loadtest.py --server gunicorn --workers 1,2,4 --worker-class sync,gthread --threads 4
+    python benchmarks/loadtest.py --mix patient=1,staff=0,reader=0    # patients only
+"""
+import argparse
+import http.cookiejar
+import itertools
+import os
+import random
+import re
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import Counter, defaultdict
+from datetime import date, timedelta
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+STAFF_EMAIL, STAFF_PASSWORD = "clinician@load.local", "Clinician@123"
+PREDICT_SAMPLE = {"age": 54, "sex": 1, "cp": 3, "trestbps": 130, "chol": 246, "fbs": 0, "restecg": 2,
+                  "thalach": 150, "exang": 0, "oldpeak": 1.0, "slope": 2, "ca": 0, "thal": 3}
+POSTS = 30
+BOOKING_DAYS = 120  # patients book, and staff open schedules, this many days ahead
+SEEDED_PER_DAY = 3  # bookings per day, so every schedule the staff journey opens has rows to update
+SEARCH_TERMS = ["blood pressure", "stroke", "salt", "exercise", "heart"]
+SERVER_ENV = {
+    # virtual users connect from 127.0.0.1 but send their own X-Forwarded-For, so the per-IP
+    # sign-in limits apply as they would per client behind a proxy
+    "PROXY_FIX_X_FOR": "1",
+    # every staff journey signs in as the same clinician
+    "LOGIN_EMAIL_BURST": "1000000",
+}
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class Stats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(Counter)
+        self.journeys = Counter()
+
+    def record(self, step, ms, error=None):
+        with self._lock:
+            self.latencies[step].append(ms)
+            if error:
+                self.errors[step][error] += 1
+
+
+class VirtualUser:
+    def __init__(self, base, stats, rng, uid):
+        self.base = base
+        self.stats = stats
+        self.rng = rng
+        self.uid = uid
+        self._openers = {}
+        self.opener = None
+        self.staff_logged_in = False
+
+    def use(self, journey, client_id=None):
+        """Each journey keeps its own cookie jar, so a patient sign-in never replaces the staff session."""
+        if journey not in self._openers:
+            opener = urllib.request.build_opener(
+                urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), _NoRedirect)
+            opener.addheaders.append(("X-Forwarded-For", _client_ip(self.uid if client_id is None else client_id)))
+            self._openers[journey] = opener
+        self.opener = self._openers[journey]
+
+    def step(self, name, path, data=None, expect=200, location=None):
+        """One request; `location` is the path a successful redirect must point at."""
+        body = urllib.parse.urlencode(data).encode() if data is not None else None
+        t0 = time.perf_counter()
+        error, text = None, ""
+        try:
+            with self.opener.open(self.base + path, data=body, timeout=60) as resp:
+                status, text = resp.status, resp.read().decode("utf-8", "replace")
+                headers = resp.headers
+        except urllib.error.HTTPError as e:
+            status, headers = e.code, e.headers
+            e.read()
+        except Exception as e:
+            status, headers, error = None, {}, type(e).__name__
+        ms = (time.perf_counter() - t0) * 1000
+        if error is None:
+            if status != expect:
+                error = f"HTTP {status}"
+            elif location and urllib.parse.urlparse(headers.get("Location", "")).path != location:
+                error = f"redirect to {urllib.parse.urlparse(headers.get('Location', '')).path or '?'}"
+        self.stats.record(name, ms, error)
+        return error is None, text
+
+    def patient(self):
+        # a fresh jar per patient journey: each one is a new person signing up
+        self._openers.pop("patient", None)
+        n = next(_ids)
+        self.use("patient", client_id=1_000_000 + n)
+        email = f"load{self.uid}-{n}@load.local"
+        ok, _ = self.step("register", "/auth/register",
+                          {"full_name": f"Load Patient {n}", "email": email, "password": "Patient@123"},
+                          expect=302, location="/auth/login")
+        if not ok:
+            return False
+        ok, _ = self.step("login", "/auth/login", {"email": email, "password": "Patient@123"},
+                          expect=302, location="/")
+        if not ok:
+            return False
+        self.step("predict form", "/predict/form")
+        self.step("predict run", "/predict/run", PREDICT_SAMPLE)
+        self.step("booking form", "/appointments/new")
+        day = date.today() + timedelta(days=self.rng.randint(1, BOOKING_DAYS))
+        slot = f"{self.rng.randint(9, 15):02d}:{self.rng.choice(['00', '30'])}"
+        ok, _ = self.step("book", "/appointments/new",
+                          {"appointment_date": day.isoformat(), "appointment_time": slot,
+                           "risk_score": f"{self.rng.random():.3f}"},
+                          expect=302, location="/appointments/")
+        self.step("my appointments", "/appointments/")
+        return ok
+
+    def staff(self):
+        if not self.staff_logged_in:
+            ok, _ = self.step("staff login", "/auth/login",
+                              {"email": STAFF_EMAIL, "password": STAFF_PASSWORD}, expect=302, location="/")
+            if not ok:
+                return False
+            self.staff_logged_in = True
+        day = date.today() + timedelta(days=self.rng.randint(1, BOOKING_DAYS))
+        ok, html = self.step("schedule", f"/admin/schedule?day={day.isoformat()}")
+        ids = re.findall(r"/admin/appointments/(\d+)/status", html)
+        if ok and ids:
+            self.step("status update", f"/admin/appointments/{self.rng.choice(ids)}/status",
+                      {"status": self.rng.choice(["completed", "no_show", "booked"])},
+                      expect=302, location="/admin/schedule")
+        return ok
+
+    def reader(self):
+        ok, _ = self.step("sensitization index", "/sensitization/")
+        self.step("post", f"/sensitization/post/load-post-{self.rng.randrange(POSTS)}")
+        q = urllib.parse.quote(self.rng.choice(SEARCH_TERMS))
+        self.step("search", f"/sensitization/search?q={q}")
+        return ok
+
+
+_ids = itertools.count(1)
+
+
+def _client_ip(n):
+    return f"10.{n >> 16 & 255}.{n >> 8 & 255}.{n & 255}"
+
+
+def prepare_database(db_path):
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    from app import create_app, db
+    from app.models import Appointment, AppointmentStatus, ClinicUnit, Role, SensitizationPost, User
+    from app.services.passwords import hash_password
+    from app.services.post_search import rebuild_index
+    from app.utils.post_render import prerender
+    from datetime import time as dtime
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(email=STAFF_EMAIL, full_name="Load Clinician", role=Role.CLINICIAN.value,
+                            password_hash=hash_password(STAFF_PASSWORD)))
+        unit = ClinicUnit.query.first()
+        if unit is None:
+            unit = ClinicUnit(name="General", opens_at=dtime(9), closes_at=dtime(16),
+                              slot_minutes=30, capacity=4, is_active=True)
+            db.session.add(unit)
+        seed_patient = User(email="seed@load.local", full_name="Seed Patient", role=Role.PATIENT.value,
+                            password_hash=hash_password("Patient@123"))
+        db.session.add(seed_patient)
+        db.session.flush()
+        rng = random.Random(0)
+        for d in range(1, BOOKING_DAYS + 1):
+            for _ in range(SEEDED_PER_DAY):
+                db.session.add(Appointment(
+                    patient_id=seed_patient.id, appointment_date=date.today() + timedelta(days=d),
+                    appointment_time=dtime(rng.randint(9, 15), rng.choice([0, 30])),
+                    clinic_unit=unit.name, clinic_unit_id=unit.id, status=AppointmentStatus.BOOKED.value))
+        for i in range(POSTS):
+            db.session.add(prerender(SensitizationPost(
+                title=f"Heart health {i}", slug=f"load-post-{i}", is_published=True,
+                body="Know your blood pressure.\n\n• Less salt\n• Exercise weekly\n• Stroke warning signs: FAST")))
+        db.session.commit()
+        rebuild_index()
+        db.engine.dispose()
+    return app
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_ready(base, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(base + "/auth/login", timeout=2).read()
+            return
+        except Exception:
+            time.sleep(0.2)
+    raise RuntimeError(f"server at {base} did not come up")
+
+
+def start_werkzeug(app):
+    import logging
+    from werkzeug.serving import make_server
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}", server.shutdown
+
+
+def start_gunicorn(workers, worker_class, threads):
+    if shutil.which("gunicorn") is None:
+        raise SystemExit("gunicorn is not installed (pip install -r requirements.txt)")
+    port = _free_port()
+    cmd = ["gunicorn", "-b", f"127.0.0.1:{port}", "-w", str(workers), "-k", worker_class,
+           "--log-level", "warning", "app:create_app()"]
+    # gunicorn.conf.py sets threads, and sync with threads > 1 silently becomes gthread
+    cmd[1:1] = ["--threads", str(threads if worker_class == "gthread" else 1)]
+    proc = subprocess.Popen(cmd, cwd=ROOT, env=dict(os.environ))
+    base = f"http://127.0.0.1:{port}"
+    try:
+        _wait_ready(base)
+    except Exception:
+        proc.terminate()
+        raise
+
+    def stop():
+        proc.terminate()
+        proc.wait(timeout=30)
+
+    stop.pid = proc.pid
+    return base, stop
+
+
+def run_load(base, args):
+    stats = Stats()
+    weights = dict(args.mix)
+    names = [n for n in ("patient", "staff", "reader") if weights.get(n, 0) > 0]
+    stop = threading.Event()
+
+    def loop(uid):
+        rng = random.Random(args.seed * 1000 + uid)
+        user = VirtualUser(base, stats, rng, uid)
+        while not stop.is_set():
+            journey = rng.choices(names, weights=[weights[n] for n in names])[0]
+            user.use(journey)
+            if getattr(user, journey)():
+                stats.journeys[journey] += 1
+            if args.think_ms:
+                time.sleep(rng.uniform(0, 2 * args.think_ms) / 1000)
+
+    threads = [threading.Thread(target=loop, args=(i,), daemon=True) for i in range(args.users)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    time.sleep(args.duration)
+    stop.set()
+    for t in threads:
+        t.join(timeout=60)
+    return stats, time.perf_counter() - started
+
+
+def pct(samples, p):
+    return samples[min(len(samples) - 1, int(len(samples) * p))] if samples else 0.0
+
+
+def report(label, stats, elapsed):
+    print(f"\n== {label}: {elapsed:.1f}s ==")
+    print(f"{'step':<22}{'reqs':>7}{'req/s':>8}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'errors':>8}  top error")
+    total = errs = 0
+    for step, samples in stats.latencies.items():
+        samples.sort()
+        n_err = sum(stats.errors[step].values())
+        top = stats.errors[step].most_common(1)
+        total += len(samples)
+        errs += n_err
+        print(f"{step:<22}{len(samples):>7}{len(samples) / elapsed:>8.1f}{pct(samples, .5):>9.1f}"
+              f"{pct(samples, .9):>9.1f}{pct(samples, .99):>9.1f}{n_err / len(samples):>8.1%}"
+              f"  {top[0][0] + ' x' + str(top[0][1]) if top else ''}")
+    print(f"{'total':<22}{total:>7}{total / elapsed:>8.1f}{'':>27}{(errs / total if total else 0):>8.1%}")
+    print("completed journeys/s: " + ", ".join(
+        f"{name} {n / elapsed:.2f}" for name, n in sorted(stats.journeys.items())))
+    every = sorted(ms for samples in stats.latencies.values() for ms in samples)
+    return {"label": label, "rps": total / elapsed, "p50": pct(every, .5), "p99": pct(every, .99),
+            "errors": errs / total if total else 0.0,
+            "patients": stats.journeys.get("patient", 0) / elapsed}
+
+
+def parse_mix(text):
+    mix = []
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in ("patient", "staff", "reader"):
+            raise argparse.ArgumentTypeError(f"unknown journey {name!r}")
+        mix.append((name.strip(), float(weight or 1)))
+    return mix
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--users", type=int, default=20, help="concurrent virtual users")
+    ap.add_argument("--duration", type=float, default=30, help="seconds per run")
+    ap.add_argument("--mix", type=parse_mix, default=parse_mix("patient=2,staff=1,reader=7"))
+    ap.add_argument("--think-ms", type=float, default=0, help="mean pause between journeys")
+    ap.add_argument("--server", choices=("werkzeug", "gunicorn"), default="werkzeug")
+    ap.add_argument("--workers", default="2", help="gunicorn worker counts to sweep, e.g. 1,2,4")
+    ap.add_argument("--worker-class", default="sync", help="gunicorn worker classes to sweep, e.g. sync,gthread")
+    ap.add_argument("--threads", type=int, default=4, help="threads per gthread worker")
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+
+    os.environ.update(SERVER_ENV)
+    tmpdir = tempfile.mkdtemp(prefix="iih-load-")
+    try:
+        if args.server == "werkzeug":
+            app = prepare_database(os.path.join(tmpdir, "load.db"))
+            base, stop = start_werkzeug(app)
+            try:
+                stats, elapsed = run_load(base, args)
+            finally:
+                stop()
+            report(f"werkzeug threaded, {args.users} users", stats, elapsed)
+            return
+
+        summary = []
+        for worker_class in args.worker_class.split(","):
+            for workers in (int(w) for w in args.workers.split(",")):
+                # fresh database per run so results don't depend on earlier runs
+                prepare_database(os.path.join(tmpdir, f"load-{worker_class}-{workers}.db"))
+                base, stop = start_gunicorn(workers, worker_class, args.threads)
+                try:
+                    stats, elapsed = run_load(base, args)
+                finally:
+                    stop()
+                threads = f" x {args.threads} threads" if worker_class == "gthread" else ""
+                summary.append(report(f"gunicorn {worker_class}, {workers} workers{threads}", stats, elapsed))
+        if len(summary) > 1:
+            print(f"\n{'configuration':<42}{'req/s':>8}{'p50 ms':>9}{'p99 ms':>9}{'errors':>8}{'patients/s':>12}")
+            for row in summary:
+                print(f"{row['label']:<42}{row['rps']:>8.1f}{row['p50']:>9.1f}{row['p99']:>9.1f}"
+                      f"{row['errors']:>8.1%}{row['patients']:>12.2f}")
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Prediction latency while a login/registration storm hits the same server.
+
+Starts the app on a local threaded werkzeug server, measures /predict/run latency on its
+own, then again while --storm threads post logins and registrations as fast as they can.
+
+    python benchmarks/login_storm.py --storm 32 --predictions 200
+    HASH_WORKERS=64 HASH_QUEUE_MAX=100000 python benchmarks/login_storm.py   # ~unbounded hashing
+"""
+import argparse
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+SAMPLE = {"age": 54, "sex": 1, "cp": 3, "trestbps": 130, "chol": 246, "fbs": 0, "restecg": 2,
+          "thalach": 150, "exang": 0, "oldpeak": 1.0, "slope": 2, "ca": 0, "thal": 3}
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+def post(opener, url, data):
+    body = urllib.parse.urlencode(data).encode()
+    try:
+        with opener.open(url, data=body, timeout=60) as r:
+            r.read()
+            return r.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def measure_predictions(base, n):
+    opener = urllib.request.build_opener(_NoRedirect)
+    samples = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        post(opener, f"{base}/predict/run", SAMPLE)
+        samples.append((time.perf_counter() - t0) * 1000)
+    samples.sort()
+    return statistics.mean(samples), samples[len(samples) // 2], samples[int(len(samples) * 0.95)]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--storm", type=int, default=32, help="concurrent login/register threads")
+    ap.add_argument("--predictions", type=int, default=200)
+    args = ap.parse_args()
+
+    tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+    tmp.close()
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmp.name}"
+
+    from werkzeug.serving import make_server
+    from app import create_app, db
+    from app.models import User
+    from app.services.passwords import hash_password, hasher
+    from app.services.rate_limit import email_limiter, ip_limiter
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(email="storm@bench.local", full_name="Storm", role="patient",
+                            password_hash=hash_password("Storm@123")))
+        db.session.commit()
+
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    base = f"http://127.0.0.1:{server.server_port}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    quiet = measure_predictions(base, args.predictions)
+
+    stop = threading.Event()
+    done = {"login": 0, "register": 0}
+
+    def storm(i):
+        opener = urllib.request.build_opener(_NoRedirect)
+        n = 0
+        while not stop.is_set():
+            n += 1
+            if n % 3:
+                post(opener, f"{base}/auth/login", {"email": "storm@bench.local", "password": "Storm@123"})
+                done["login"] += 1
+            else:
+                post(opener, f"{base}/auth/register",
+                     {"full_name": "S", "email": f"s{i}-{n}@bench.local", "password": "pw"})
+                done["register"] += 1
+
+    threads = [threading.Thread(target=storm, args=(i,), daemon=True) for i in range(args.storm)]
+    for t in threads:
+        t.start()
+    time.sleep(1)
+    t0 = time.perf_counter()
+    loud = measure_predictions(base, args.predictions)
+    storm_s = time.perf_counter() - t0
+    stop.set()
+    server.shutdown()
+
+    print(f"hash pool: {hasher._pool._max_workers} workers")
+    print(f"{'':<14}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    print(f"{'quiet':<14}{quiet[0]:>10.1f}{quiet[1]:>10.1f}{quiet[2]:>10.1f}")
+    print(f"{'login storm':<14}{loud[0]:>10.1f}{loud[1]:>10.1f}{loud[2]:>10.1f}")
+    print(f"storm requests: {done['login']} logins, {done['register']} registrations in {storm_s:.1f}s; "
+          f"shed by rate limiter: {ip_limiter.rejected + email_limiter.rejected}")
+    os.unlink(tmp.name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Per-request cost of the /metrics instrumentation: the same mix of pages through the
+Flask test client against two apps, METRICS_ENABLED=0 and =1, alternating requests so
+warm-up and machine noise hit both equally.
+
+    python benchmarks/metrics_overhead.py --requests 3000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+PAGES = ["/", "/auth/login", "/sensitization/", "/sensitization/post/post-1", "/sensitization/search?q=heart"]
+
+
+def build(enabled):
+    tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+    tmp.close()
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmp.name}"
+    os.environ["METRICS_ENABLED"] = "1" if enabled else "0"
+    os.environ["PAGE_CACHE_TTL"] = "0"  # render every time so SQL and template hooks fire
+
+    from app import create_app, db
+    from app.models import SensitizationPost
+    from app.utils.post_render import prerender
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        for i in range(20):
+            db.session.add(prerender(SensitizationPost(title=f"Heart post {i}", slug=f"post-{i}",
+                                                       body="Heart health tips.\n\n• Move\n• Eat well", is_published=True)))
+        db.session.commit()
+    return app, tmp.name
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=3000)
+    ap.add_argument("--seed", type=int, default=4)
+    args = ap.parse_args()
+
+    from app.services.pageview_buffer import page_views
+
+    apps = [build(False), build(True)]
+    clients = [app.test_client() for app, _ in apps]
+    rng = random.Random(args.seed)
+    plan = [rng.choice(PAGES) for _ in range(args.requests)]
+    for client in clients:
+        for path in PAGES:
+            client.get(path)
+    off, on = [], []
+    for path in plan:
+        for client, samples in zip(clients, (off, on)):
+            t0 = time.perf_counter()
+            client.get(path)
+            samples.append((time.perf_counter() - t0) * 1e6)
+    page_views.flush()
+    for _, path in apps:
+        os.unlink(path)
+    print(f"{'':<14}{'mean µs':>10}{'p50 µs':>10}")
+    for label, s in (("metrics off", off), ("metrics on", on)):
+        print(f"{label:<14}{statistics.mean(s):>10.0f}{statistics.median(s):>10.0f}")
+    delta = statistics.median(on) - statistics.median(off)
+    print(f"overhead: {delta:.0f} µs per request at p50 ({delta / statistics.median(off):.1%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Cost of serving sensitization pages when post bodies are rendered per request (rows not
+yet backfilled) versus emitted from the stored body_html/excerpt columns. The page
+cache is disabled so every request renders.
+
+    python benchmarks/post_render.py --posts 200 --requests 2000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+PARAGRAPH = ("High blood pressure often has no symptoms, but it damages the heart and blood vessels "
+             "over time. Regular checks catch it early.")
+BULLETS = "\n".join(f"• Tip {i}: reduce salt, move more, sleep well" for i in range(8))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--posts", type=int, default=200)
+    ap.add_argument("--requests", type=int, default=2000)
+    ap.add_argument("--seed", type=int, default=9)
+    args = ap.parse_args()
+
+    tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+    tmp.close()
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmp.name}"
+    os.environ["PAGE_CACHE_TTL"] = "0"
+
+    from sqlalchemy import insert
+    from app import create_app, db
+    from app.models import SensitizationPost
+    from app.services.pageview_buffer import page_views
+    from app.utils.post_render import render_body
+
+    app = create_app()
+    body = "\n\n".join([PARAGRAPH] * 6 + [BULLETS] + [PARAGRAPH] * 6)
+    with app.app_context():
+        db.create_all()
+        db.session.execute(insert(SensitizationPost), [
+            {"title": f"Post {i}", "slug": f"post-{i}", "body": body, "is_published": True}
+            for i in range(args.posts)
+        ])
+        db.session.commit()
+
+    t0 = time.perf_counter()
+    for _ in range(1000):
+        render_body(body)
+    print(f"render_body: {(time.perf_counter() - t0):.3f} ms per post ({len(body)} chars)")
+
+    rng = random.Random(args.seed)
+    paths = ["/sensitization/"] + [f"/sensitization/post/post-{i}" for i in range(args.posts)]
+    plan = [rng.choice(paths) if i % 5 else "/sensitization/" for i in range(args.requests)]
+    client = app.test_client()
+
+    def run():
+        t0 = time.perf_counter()
+        for path in plan:
+            client.get(path)
+        return len(plan) / (time.perf_counter() - t0)
+
+    before = run()
+    runner = app.test_cli_runner()
+    print(runner.invoke(args=["backfill-post-html"]).output.strip())
+    after = run()
+    print(f"{'':<22}{'req/s':>10}")
+    print(f"{'render per request':<22}{before:>10.0f}")
+    print(f"{'stored HTML':<22}{after:>10.0f}")
+    page_views.flush()
+    os.unlink(tmp.name)
+
+
+if __name__ == "__main__":
+    main()
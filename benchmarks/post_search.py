@@ -0,0 +1,86 @@
+"""
+Search latency over a synthetic corpus of sensitization posts: the full-text index
+against a LIKE '%term%' scan of the same rows.
+
+    python benchmarks/post_search.py --posts 100000 --queries 200
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+WORDS = ("heart blood pressure salt stroke cholesterol exercise walking diet sugar diabetes smoking "
+         "sleep stress weight fruit vegetables fibre checkup clinic medication symptoms chest pain "
+         "breath fatigue family history prevention screening emergency warning signs lifestyle").split()
+QUERIES = ["blood pressure", "stroke warning", "cholesterol diet", "chest pain", "smok", "sleep stress weight"]
+
+
+def percentile(samples, pct):
+    return samples[min(len(samples) - 1, int(len(samples) * pct))]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--posts", type=int, default=100000)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--seed", type=int, default=11)
+    args = ap.parse_args()
+
+    tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+    tmp.close()
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmp.name}"
+
+    from sqlalchemy import insert
+    from app import create_app, db
+    from app.models import SensitizationPost
+    from app.services.post_search import rebuild_index, search_posts
+
+    rng = random.Random(args.seed)
+    # health terms are rare against a large filler vocabulary so queries match a realistic slice
+    filler = [f"w{n:x}" for n in range(20000)]
+
+    def words(k):
+        return " ".join(rng.choice(WORDS) if rng.random() < 0.03 else rng.choice(filler) for _ in range(k))
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        t0 = time.perf_counter()
+        for start in range(0, args.posts, 10000):
+            db.session.execute(insert(SensitizationPost), [
+                {"title": words(6).capitalize(), "slug": f"post-{i}", "body": words(150), "is_published": True}
+                for i in range(start, min(start + 10000, args.posts))
+            ])
+        db.session.commit()
+        t1 = time.perf_counter()
+        rebuild_index()
+        print(f"{args.posts} posts inserted in {t1 - t0:.1f}s, indexed in {time.perf_counter() - t1:.1f}s")
+
+        def like_search(q):
+            like = f"%{q}%"
+            return (SensitizationPost.query
+                    .filter(SensitizationPost.is_published.is_(True))
+                    .filter(SensitizationPost.title.ilike(like) | SensitizationPost.body.ilike(like))
+                    .order_by(SensitizationPost.created_at.desc())
+                    .limit(20).all())
+
+        print(f"{'':<10}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}")
+        for label, fn, n in (("fts", search_posts, args.queries), ("like", like_search, max(1, args.queries // 10))):
+            samples = []
+            for i in range(n):
+                t0 = time.perf_counter()
+                fn(QUERIES[i % len(QUERIES)])
+                samples.append((time.perf_counter() - t0) * 1000)
+            samples.sort()
+            print(f"{label:<10}{statistics.mean(samples):>10.1f}{percentile(samples, 0.5):>10.1f}"
+                  f"{percentile(samples, 0.95):>10.1f}")
+    os.unlink(tmp.name)
+
+
+if __name__ == "__main__":
+    main()
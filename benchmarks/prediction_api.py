@@ -0,0 +1,241 @@
+"""
+Many concurrent prediction clients against the sync Flask path (gunicorn sync workers,
+form POST /predict/run) and the asyncio API (one uvicorn process, POST /v1/predict and
+/v1/predict/batch). Each client holds its own connection and fires requests back to back;
+the client side is a single asyncio loop, so thousands of connections are cheap here too.
+
+    python benchmarks/prediction_api.py --connections 2000 --duration 20 --batch 32
+    python benchmarks/prediction_api.py --synthetic-ms 2     # no xgboost on this host
+
+Reports predictions/s, request latency, 503 (backpressure) and error rates, peak open
+connections and server RSS.
+"""
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.parse
+import urllib.request
+from collections import Counter
+
+HERE = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, HERE)
+
+import loadtest  # noqa: E402
+from serving_modes import rss_mb  # noqa: E402
+from synthetic_model import write_model  # noqa: E402
+
+ROOT = loadtest.ROOT
+
+
+def _raise_fd_limit(connections):
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    want = min(hard, max(soft, 2 * connections + 256))
+    if want > soft:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (want, hard))
+    if want < connections + 64:
+        print(f"warning: open-file limit {want} is below --connections {connections}")
+
+
+def start_uvicorn(workers, max_in_flight):
+    if importlib.util.find_spec("uvicorn") is None:
+        raise SystemExit("uvicorn is not installed (pip install -r requirements.txt)")
+    port = loadtest._free_port()
+    env = dict(os.environ, PREDICT_API_WORKERS=str(workers), PREDICT_API_MAX_IN_FLIGHT=str(max_in_flight))
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.asgi:api", "--host", "127.0.0.1", "--port", str(port),
+         "--backlog", "4096", "--log-level", "warning", "--no-access-log"],
+        cwd=ROOT, env=env)
+    base = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 30
+    while True:
+        try:
+            with urllib.request.urlopen(base + "/healthz", timeout=2) as r:
+                r.read()
+            break
+        except Exception:
+            if time.time() > deadline or proc.poll() is not None:
+                proc.terminate()
+                raise RuntimeError("uvicorn did not come up")
+            time.sleep(0.2)
+
+    def stop():
+        proc.terminate()
+        proc.wait(timeout=30)
+
+    stop.pid = proc.pid
+    return base, stop
+
+
+class Client:
+    """Shared tallies for every connection in one run."""
+
+    def __init__(self):
+        self.latencies = []
+        self.statuses = Counter()
+        self.errors = Counter()
+        self.predictions = 0
+        self.open = 0
+        self.peak_open = 0
+
+
+async def _request(reader, writer, raw):
+    writer.write(raw)
+    await writer.drain()
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionResetError("connection closed")
+    status = int(status_line.split()[1])
+    length, keep_alive = None, True
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        name, value = name.strip().lower(), value.strip().lower()
+        if name == "content-length":
+            length = int(value)
+        elif name == "connection" and value == "close":
+            keep_alive = False
+    body = await reader.readexactly(length) if length is not None else await reader.read()
+    return status, body, keep_alive and length is not None
+
+
+async def _connection(host, port, raw, rows, deadline, client, timeout):
+    reader = writer = None
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+                client.open += 1
+                client.peak_open = max(client.peak_open, client.open)
+            status, _, keep_alive = await asyncio.wait_for(_request(reader, writer, raw), timeout)
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError) as e:
+            client.errors[type(e).__name__] += 1
+            keep_alive, status = False, None
+        else:
+            client.latencies.append((time.perf_counter() - started) * 1000)
+            client.statuses[status] += 1
+            if status == 200:
+                client.predictions += rows
+            elif status == 503:
+                await asyncio.sleep(1)  # honour Retry-After
+        if not keep_alive and writer is not None:
+            writer.close()
+            writer = None
+            client.open -= 1
+    if writer is not None:
+        writer.close()
+        client.open -= 1
+
+
+def _raw_request(host, path, body, content_type):
+    return (f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n").encode() + body
+
+
+async def _run(base, path, body, content_type, rows, args):
+    url = urllib.parse.urlsplit(base)
+    raw = _raw_request(url.netloc, path, body, content_type)
+    client = Client()
+    started = time.perf_counter()
+    deadline = started + args.duration
+    await asyncio.gather(*(
+        _connection(url.hostname, url.port, raw, rows, deadline, client, args.timeout)
+        for _ in range(args.connections)
+    ))
+    return client, time.perf_counter() - started
+
+
+def run_load(base, path, body, content_type, rows, args):
+    return asyncio.run(_run(base, path, body, content_type, rows, args))
+
+
+def report(label, client, elapsed, rss):
+    lat = sorted(client.latencies)
+    total = len(lat) + sum(client.errors.values())
+    ok = client.statuses.get(200, 0)
+    row = {
+        "label": label,
+        "pps": client.predictions / elapsed,
+        "rps": ok / elapsed,
+        "p50": loadtest.pct(lat, .5),
+        "p99": loadtest.pct(lat, .99),
+        "shed": client.statuses.get(503, 0) / total if total else 0.0,
+        "errors": (total - ok - client.statuses.get(503, 0)) / total if total else 0.0,
+        "peak": client.peak_open,
+        "rss": rss,
+    }
+    print(f"{label}: statuses {dict(client.statuses)}, errors {dict(client.errors) or 'none'}")
+    return row
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--connections", type=int, default=2000)
+    ap.add_argument("--duration", type=float, default=20)
+    ap.add_argument("--timeout", type=float, default=30, help="per-request client timeout, seconds")
+    ap.add_argument("--batch", type=int, default=32, help="instances per /v1/predict/batch request")
+    ap.add_argument("--sync-workers", type=int, default=2, help="gunicorn sync workers for /predict/run")
+    ap.add_argument("--api-workers", type=int, default=4, help="model threads in the asyncio API")
+    ap.add_argument("--max-in-flight", type=int, default=64)
+    ap.add_argument("--synthetic-ms", type=float, default=None,
+                    help="serve benchmarks/synthetic_model.py with this per-call latency instead of the real model")
+    ap.add_argument("--modes", default="sync,async,async-batch")
+    args = ap.parse_args()
+
+    _raise_fd_limit(args.connections)
+    os.environ.update(loadtest.SERVER_ENV)
+    tmpdir = tempfile.mkdtemp(prefix="iih-predict-api-")
+    if args.synthetic_ms is not None:
+        os.environ["HEART_MODEL_PATH"] = write_model(os.path.join(tmpdir, "model.pkl"), args.synthetic_ms)
+        os.environ["PYTHONPATH"] = os.pathsep.join(filter(None, [HERE, os.environ.get("PYTHONPATH")]))
+
+    sample = loadtest.PREDICT_SAMPLE
+    rows = []
+    try:
+        for mode in args.modes.split(","):
+            if mode == "sync":
+                loadtest.prepare_database(os.path.join(tmpdir, "sync.db"))
+                base, stop = loadtest.start_gunicorn(args.sync_workers, "sync", 1)
+                label = f"sync {args.sync_workers}w /predict/run"
+                request = ("/predict/run", urllib.parse.urlencode(sample).encode(),
+                           "application/x-www-form-urlencoded", 1)
+            elif mode in ("async", "async-batch"):
+                base, stop = start_uvicorn(args.api_workers, args.max_in_flight)
+                if mode == "async":
+                    label = f"async 1p x {args.api_workers}t /v1/predict"
+                    request = ("/v1/predict", json.dumps(sample).encode(), "application/json", 1)
+                else:
+                    label = f"async batch {args.batch}"
+                    body = json.dumps({"instances": [sample] * args.batch}).encode()
+                    request = ("/v1/predict/batch", body, "application/json", args.batch)
+            else:
+                raise SystemExit(f"unknown mode {mode!r}")
+            try:
+                client, elapsed = run_load(base, *request, args)
+                rss = rss_mb(stop.pid)
+            finally:
+                stop()
+            rows.append(report(label, client, elapsed, rss))
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+    print(f"\n{args.connections} connections, {args.duration:.0f}s")
+    print(f"{'mode':<30}{'pred/s':>9}{'req/s':>8}{'p50 ms':>9}{'p99 ms':>9}{'503':>7}{'errors':>8}"
+          f"{'peak conn':>10}{'RSS MB':>8}")
+    for r in rows:
+        print(f"{r['label']:<30}{r['pps']:>9.0f}{r['rps']:>8.0f}{r['p50']:>9.1f}{r['p99']:>9.1f}"
+              f"{r['shed']:>7.1%}{r['errors']:>8.1%}{r['peak']:>10}{r['rss']:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Anonymous requests per second on the sensitization index and post pages with the page
+cache off and on, plus revalidation with If-None-Match (304s).
+
+    python benchmarks/sensitization_pages.py --posts 50 --requests 3000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--posts", type=int, default=50)
+    ap.add_argument("--requests", type=int, default=3000)
+    ap.add_argument("--seed", type=int, default=5)
+    args = ap.parse_args()
+
+    tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+    tmp.close()
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmp.name}"
+
+    from app import create_app, db
+    from app.models import SensitizationPost
+    from app.services.page_cache import page_cache
+    from app.services.pageview_buffer import page_views
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        for i in range(args.posts):
+            db.session.add(SensitizationPost(title=f"Post {i}", slug=f"post-{i}",
+                                             body="Heart health advice.\n\n" * 40, is_published=True))
+        db.session.commit()
+
+    rng = random.Random(args.seed)
+    paths = ["/sensitization/"] + [f"/sensitization/post/post-{i}" for i in range(args.posts)]
+    plan = [rng.choice(paths) for _ in range(args.requests)]
+    client = app.test_client()
+
+    def run(ttl, conditional=False):
+        page_cache.ttl = ttl
+        page_cache.clear()
+        page_cache.hits = page_cache.misses = 0
+        etags = {}
+        statuses = {}
+        t0 = time.perf_counter()
+        for path in plan:
+            headers = {"If-None-Match": etags[path]} if conditional and path in etags else {}
+            r = client.get(path, headers=headers)
+            etags[path] = r.headers.get("ETag")
+            statuses[r.status_code] = statuses.get(r.status_code, 0) + 1
+        elapsed = time.perf_counter() - t0
+        return len(plan) / elapsed, statuses, page_cache.stats()["hit_rate"]
+
+    print(f"{'':<22}{'req/s':>10}{'hit rate':>10}  statuses")
+    for label, ttl, cond in (("no cache", 0, False), ("page cache", 300, False), ("cache + If-None-Match", 300, True)):
+        rps, statuses, hit_rate = run(ttl, cond)
+        print(f"{label:<22}{rps:>10.0f}{hit_rate:>10.0%}  {statuses}")
+    page_views.flush()
+    print(f"page views recorded: {page_views.stats()['flushed']} (counted on cache hits too)")
+    os.unlink(tmp.name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+gunicorn sync workers against gthread workers at the same process count (so roughly the
+same memory): resident memory of master + workers, then the load-test journey mix.
+
+    python benchmarks/serving_modes.py --workers 2 --threads 4 --users 16 --duration 20
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+import loadtest  # noqa: E402
+
+
+def _children(pid):
+    kids = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as fh:
+                ppid = int(fh.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid == pid:
+            kids.append(int(entry))
+    return kids
+
+
+def rss_mb(pid):
+    """Resident set size of pid and its direct children (Linux /proc)."""
+    total = 0
+    for p in [pid] + _children(pid):
+        try:
+            with open(f"/proc/{p}/status") as fh:
+                for line in fh:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1])
+        except OSError:
+            pass
+    return total / 1024
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--workers", type=int, default=2, help="processes for both modes")
+    ap.add_argument("--threads", type=int, default=4, help="threads per gthread worker")
+    ap.add_argument("--users", type=int, default=16)
+    ap.add_argument("--duration", type=float, default=20)
+    ap.add_argument("--mix", type=loadtest.parse_mix, default=loadtest.parse_mix("patient=2,staff=1,reader=7"))
+    ap.add_argument("--think-ms", type=float, default=0)
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+
+    os.environ.update(loadtest.SERVER_ENV)
+    tmpdir = tempfile.mkdtemp(prefix="iih-serving-")
+    rows = []
+    try:
+        for worker_class in ("sync", "gthread"):
+            loadtest.prepare_database(os.path.join(tmpdir, f"{worker_class}.db"))
+            base, stop = loadtest.start_gunicorn(args.workers, worker_class, args.threads)
+            try:
+                time.sleep(1)
+                idle = rss_mb(stop.pid)
+                stats, elapsed = loadtest.run_load(base, args)
+                busy = rss_mb(stop.pid)
+            finally:
+                stop()
+            label = f"{worker_class} {args.workers}w" + (f" x {args.threads}t" if worker_class == "gthread" else "")
+            row = loadtest.report(label, stats, elapsed)
+            row.update(idle=idle, busy=busy)
+            rows.append(row)
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+    print(f"\n{'mode':<18}{'RSS idle MB':>12}{'RSS load MB':>12}{'req/s':>8}{'p50 ms':>9}{'p99 ms':>9}{'errors':>8}")
+    for r in rows:
+        print(f"{r['label']:<18}{r['idle']:>12.0f}{r['busy']:>12.0f}{r['rps']:>8.1f}{r['p50']:>9.1f}"
+              f"{r['p99']:>9.1f}{r['errors']:>8.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+"""
+Pure-Python stand-in for the pickled heart model, for serving benchmarks on hosts without
+xgboost or to isolate serving overhead from model cost. Each predict_proba call sleeps for
+a fixed latency plus a per-row cost (sleep releases the GIL, as native inference does).
+"""
+import math
+import pickle
+import time
+
+
+class SyntheticModel:
+    def __init__(self, call_ms=2.0, row_ms=0.02):
+        self.call_ms = call_ms
+        self.row_ms = row_ms
+
+    def predict_proba(self, X):
+        time.sleep((self.call_ms + self.row_ms * len(X)) / 1000)
+        out = []
+        for row in X:
+            z = 0.03 * (float(row[0]) - 55) + 0.004 * (float(row[4]) - 240)
+            p = 1 / (1 + math.exp(-z))
+            out.append([1 - p, p])
+        return out
+
+
+def write_model(path, call_ms, row_ms=0.02):
+    with open(path, "wb") as fh:
+        pickle.dump(SyntheticModel(call_ms, row_ms), fh)
+    return path
@@ -0,0 +1,78 @@
+"""
+Mixed authenticated traffic through the Flask test client, counting SQL statements per
+request with the user-loader cache disabled and enabled.
+
+    python benchmarks/user_loader_load.py --users 50 --requests 3000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+PATIENT_PAGES = ["/", "/sensitization/", "/appointments/", "/appointments/new", "/predict/form"]
+STAFF_PAGES = ["/", "/sensitization/", "/admin/schedule", "/admin/dashboard"]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--users", type=int, default=50)
+    ap.add_argument("--requests", type=int, default=3000)
+    ap.add_argument("--seed", type=int, default=3)
+    args = ap.parse_args()
+
+    tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+    tmp.close()
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmp.name}"
+    os.environ.setdefault("LOGIN_IP_BURST", "1000000")  # every client logs in from 127.0.0.1
+
+    from sqlalchemy import event
+    from werkzeug.security import generate_password_hash
+    from app import create_app, db
+    from app.models import User, Role
+    from app.services.user_cache import user_cache
+
+    app = create_app()
+    pw = generate_password_hash("pw")
+    with app.app_context():
+        db.create_all()
+        for i in range(args.users):
+            role = Role.CLINICIAN.value if i % 5 == 0 else Role.PATIENT.value
+            db.session.add(User(email=f"u{i}@bench.local", full_name=f"User {i}", role=role, password_hash=pw))
+        db.session.commit()
+        roles = {u.email: u.role for u in User.query.all()}
+        engine = db.engine
+
+    counter = {"n": 0}
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _count(*_):
+        counter["n"] += 1
+
+    clients = []
+    for email, role in roles.items():
+        c = app.test_client()
+        c.post("/auth/login", data={"email": email, "password": "pw"})
+        clients.append((c, STAFF_PAGES if role != Role.PATIENT.value else PATIENT_PAGES))
+
+    for label, ttl in (("no cache", 0), ("cached", 60)):
+        user_cache.ttl = ttl
+        user_cache.clear()
+        user_cache.hits = user_cache.misses = 0
+        rng = random.Random(args.seed)
+        counter["n"] = 0
+        t0 = time.perf_counter()
+        for _ in range(args.requests):
+            c, pages = rng.choice(clients)
+            c.get(rng.choice(pages))
+        elapsed = time.perf_counter() - t0
+        print(f"{label:<9} {counter['n'] / args.requests:6.2f} queries/request  "
+              f"{args.requests / elapsed:8.0f} req/s  {user_cache.stats()}")
+    os.unlink(tmp.name)
+
+
+if __name__ == "__main__":
+    main()
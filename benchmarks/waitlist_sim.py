@@ -0,0 +1,126 @@
+"""
+Replays a month of bookings, cancellations and waitlist allocations against a scratch
+SQLite database and reports allocation latency.
+
+    python benchmarks/waitlist_sim.py --days 30 --requests-per-day 120 --cancel-rate 0.15
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def pct(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--days", type=int, default=30)
+    ap.add_argument("--requests-per-day", type=int, default=120)
+    ap.add_argument("--cancel-rate", type=float, default=0.15)
+    ap.add_argument("--backlog", type=int, default=20000, help="waiting entries preloaded before the replay")
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+
+    tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+    tmp.close()
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmp.name}"
+
+    from sqlalchemy import insert
+    from app import create_app, db
+    from app.models import User, Appointment, AppointmentStatus, WaitlistEntry, WaitlistStatus
+    from app.services.scheduling import default_unit, has_capacity, invalidate_for, slot_times
+    from app.services.occupancy import occupancy
+    from app.services.waitlist import waitlist, join_waitlist, allocate_slot
+
+    rng = random.Random(args.seed)
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        n_patients = args.days * args.requests_per_day + args.backlog
+        db.session.execute(insert(User), [
+            {"email": f"p{i}@sim.local", "full_name": f"Patient {i}", "password_hash": "x", "role": "patient"}
+            for i in range(n_patients)
+        ])
+        start_day = date.today() + timedelta(days=1)
+        now = datetime.combine(date.today(), datetime.min.time())
+        db.session.execute(insert(WaitlistEntry), [
+            {
+                "patient_id": i + 1,
+                "desired_date": None if rng.random() < 0.5 else start_day + timedelta(days=rng.randrange(args.days)),
+                "risk_score": rng.random(),
+                "status": WaitlistStatus.WAITING.value,
+                "created_at": now - timedelta(minutes=rng.randrange(60 * 24 * 14)),
+            }
+            for i in range(args.backlog)
+        ])
+        db.session.commit()
+
+        unit = default_unit()
+        slots = slot_times(unit)
+
+        t0 = time.perf_counter()
+        waitlist.invalidate()
+        waitlist.ensure_loaded()
+        load_s = time.perf_counter() - t0
+
+        booked_ids, alloc_ms, joins, allocated = [], [], 0, 0
+        patient = args.backlog
+        replay_start = time.perf_counter()
+        for d in range(args.days):
+            day = start_day + timedelta(days=d)
+            for _ in range(args.requests_per_day):
+                patient += 1
+                slot = rng.choice(slots)
+                if not has_capacity(unit, day, slot):
+                    join_waitlist(patient, desired_date=day, risk_score=rng.random())
+                    joins += 1
+                    continue
+                appt = Appointment(patient_id=patient, appointment_date=day, appointment_time=slot,
+                                   clinic_unit=unit.name, clinic_unit_id=unit.id,
+                                   status=AppointmentStatus.BOOKED.value)
+                db.session.add(appt)
+                db.session.commit()
+                invalidate_for(appt)
+                booked_ids.append(appt.id)
+
+            for appt_id in rng.sample(booked_ids, int(len(booked_ids) * args.cancel_rate / max(args.days - d, 1))):
+                appt = db.session.get(Appointment, appt_id)
+                if appt.status != AppointmentStatus.BOOKED.value:
+                    continue
+                appt.status = AppointmentStatus.CANCELLED.value
+                db.session.commit()
+                invalidate_for(appt)
+                s = time.perf_counter()
+                if allocate_slot(appt.appointment_date, appt.appointment_time, now=now):
+                    allocated += 1
+                alloc_ms.append((time.perf_counter() - s) * 1000)
+        replay_s = time.perf_counter() - replay_start
+
+        cache = occupancy.stats()
+        remaining = WaitlistEntry.query.filter_by(status=WaitlistStatus.WAITING.value).count()
+
+    print(f"heap load ({args.backlog} waiting):   {load_s * 1000:.1f} ms")
+    print(f"replay:                       {replay_s:.2f} s for {args.days} days")
+    print(f"waitlist joins:               {joins}")
+    print(f"slots freed / allocated:      {len(alloc_ms)} / {allocated}")
+    print(f"still waiting:                {remaining}")
+    if alloc_ms:
+        print(f"allocation latency ms:        mean {statistics.mean(alloc_ms):.2f}  "
+              f"p50 {pct(alloc_ms, .5):.2f}  p95 {pct(alloc_ms, .95):.2f}  p99 {pct(alloc_ms, .99):.2f}")
+    print(f"occupancy cache:              {cache}")
+    os.unlink(tmp.name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Gunicorn settings (picked up automatically from the working directory, or via -c).
+
+Defaults: gthread workers, one per CPU (min 2) with GUNICORN_THREADS threads each, so a
+slow prediction only holds one thread. The app and model are loaded once in the master
+(preload_app) and shared copy-on-write with the workers; workers are recycled after
+max_requests +/- jitter. Every setting can be overridden with the env vars below or CLI flags.
+"""
+import multiprocessing
+import os
+import tempfile
+
+_cpus = multiprocessing.cpu_count()
+
+wsgi_app = "app:create_app()"
+bind = os.getenv("GUNICORN_BIND", f"0.0.0.0:{os.getenv('PORT', '8000')}")
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+workers = int(os.getenv("WEB_CONCURRENCY", "0") or 0) or max(2, _cpus)
+threads = int(os.getenv("GUNICORN_THREADS", "0") or 0) or 4
+preload_app = os.getenv("GUNICORN_PRELOAD", "1") == "1"
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "1000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "100"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "30"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+accesslog = os.getenv("GUNICORN_ACCESSLOG") or None
+
+# workers write metrics snapshots here so a scrape reaching any worker reports all of them;
+# a fresh directory per server start, inherited by every (re)forked worker
+if os.getenv("METRICS_ENABLED", "1") == "1" and not os.getenv("METRICS_DIR"):
+    os.environ["METRICS_DIR"] = tempfile.mkdtemp(prefix="iih-metrics-")
+
+
+def when_ready(server):
+    # runs in the master after the app is preloaded and before workers fork: load the model only.
+    # A prediction here would start XGBoost's OpenMP thread pool, which doesn't survive fork, and
+    # the workers could hang on their first prediction.
+    from app.services.predictor import get_predictor
+
+    predictor = get_predictor()
+    if predictor.ready():
+        server.log.info("heart model loaded")
+    else:
+        server.log.warning("heart model not ready: %s", predictor.load_error or "model/features file missing")
+
+
+def post_worker_init(worker):
+    # each worker runs its own warm-up prediction, so its thread pool starts after the fork
+    from app.services.predictor import get_predictor, warm_up
+
+    if warm_up(get_predictor()):
+        worker.log.info("heart model warmed up in worker %s", worker.pid)
+
+
+def post_fork(server, worker):
+    # don't share the master's pooled database connections with the children
+    if not preload_app:
+        return
+    from app import db
+
+    with server.app.wsgi().app_context():
+        db.engine.dispose(close=False)
@@ -1,7 +1,8 @@
 import os
 from app import create_app, db
 from app.models import User, Role
-from werkzeug.security import generate_password_hash
+from app.services.passwords import hash_password
+from app.services.scheduling import ensure_default_unit
 
 DEFAULT_USERS = [
     ("admin@iih.local", "Admin", "Admin@123", Role.ADMIN),
@@ -22,11 +23,12 @@ def main():
                     email=email,
                     full_name=name,
                     role=role.value,
-                    password_hash=generate_password_hash(pw),
+                    password_hash=hash_password(pw),
                 )
                 db.session.add(u)
         db.session.commit()
-        print("Database initialised. Default users created (if missing).")
+        ensure_default_unit()
+        print("Database initialised. Default users and clinic unit created (if missing).")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,32 @@
+"""add page view counters
+
+Revision ID: 0b7d5e93c1fa
+Revises: f2d8c7135ea4
+Create Date: 2026-10-19 14:05:33.217640
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0b7d5e93c1fa'
+down_revision = 'f2d8c7135ea4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'page_view_counters',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('page', sa.String(length=255), nullable=False),
+        sa.Column('minute', sa.DateTime(), nullable=False),
+        sa.Column('views', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('page', 'minute', name='uq_page_view_counters_page_minute')
+    )
+
+
+def downgrade():
+    op.drop_table('page_view_counters')
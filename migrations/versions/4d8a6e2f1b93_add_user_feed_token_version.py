@@ -0,0 +1,26 @@
+"""add user feed token version
+
+Revision ID: 4d8a6e2f1b93
+Revises: 7f3b2c9e4a15
+Create Date: 2026-10-19 17:48:03.216574
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4d8a6e2f1b93'
+down_revision = '7f3b2c9e4a15'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('feed_token_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('feed_token_version')
@@ -0,0 +1,42 @@
+"""add page view rollups
+
+Revision ID: 6a2f09d4b8e7
+Revises: 0b7d5e93c1fa
+Create Date: 2026-10-19 14:52:10.664081
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6a2f09d4b8e7'
+down_revision = '0b7d5e93c1fa'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'rollup_state',
+        sa.Column('name', sa.String(length=60), nullable=False),
+        sa.Column('last_id', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('name')
+    )
+    op.create_table(
+        'page_view_daily',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('page', sa.String(length=255), nullable=False),
+        sa.Column('post_slug', sa.String(length=255), nullable=True),
+        sa.Column('views', sa.Integer(), nullable=False),
+        sa.Column('sessions_hll', sa.LargeBinary(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('day', 'page', name='uq_page_view_daily_day_page')
+    )
+
+
+def downgrade():
+    op.drop_table('page_view_daily')
+    op.drop_table('rollup_state')
@@ -0,0 +1,32 @@
+"""add sensitization post updated_at
+
+Revision ID: 7f3b2c9e4a15
+Revises: b5e0c3a7f912
+Create Date: 2026-10-19 17:12:44.801236
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7f3b2c9e4a15'
+down_revision = 'b5e0c3a7f912'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('sens_posts', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+    op.execute("UPDATE sens_posts SET updated_at = created_at")
+
+    with op.batch_alter_table('sens_posts', schema=None) as batch_op:
+        batch_op.create_index('ix_sens_posts_published_updated', ['is_published', 'updated_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('sens_posts', schema=None) as batch_op:
+        batch_op.drop_index('ix_sens_posts_published_updated')
+        batch_op.drop_column('updated_at')
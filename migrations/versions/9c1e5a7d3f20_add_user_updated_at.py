@@ -0,0 +1,28 @@
+"""add user updated_at
+
+Revision ID: 9c1e5a7d3f20
+Revises: 4d8a6e2f1b93
+Create Date: 2026-10-19 18:21:37.540912
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c1e5a7d3f20'
+down_revision = '4d8a6e2f1b93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+    op.execute("UPDATE users SET updated_at = created_at")
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('updated_at')
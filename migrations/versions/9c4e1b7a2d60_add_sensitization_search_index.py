@@ -0,0 +1,44 @@
+"""add sensitization search index
+
+Revision ID: 9c4e1b7a2d60
+Revises: 6a2f09d4b8e7
+Create Date: 2026-10-19 16:40:12.503118
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '9c4e1b7a2d60'
+down_revision = '6a2f09d4b8e7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS sens_posts_fts "
+            "USING fts5(title, body, tokenize='porter unicode61')"
+        )
+        op.execute(
+            "INSERT INTO sens_posts_fts (rowid, title, body) "
+            "SELECT id, title, body FROM sens_posts WHERE is_published"
+        )
+    elif dialect == 'postgresql':
+        op.execute(
+            "ALTER TABLE sens_posts ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+            "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(body, '')), 'B')) STORED"
+        )
+        op.execute("CREATE INDEX ix_sens_posts_search_vector ON sens_posts USING gin (search_vector)")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute("DROP TABLE IF EXISTS sens_posts_fts")
+    elif dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_sens_posts_search_vector")
+        op.execute("ALTER TABLE sens_posts DROP COLUMN IF EXISTS search_vector")
@@ -0,0 +1,42 @@
+"""add waitlist entries
+
+Revision ID: a3c91f0d7b12
+Revises: 5e66ee3dea04
+Create Date: 2026-10-19 09:12:40.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3c91f0d7b12'
+down_revision = '5e66ee3dea04'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'waitlist_entries',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('patient_id', sa.Integer(), nullable=False),
+        sa.Column('desired_date', sa.Date(), nullable=True),
+        sa.Column('risk_score', sa.Float(), nullable=True),
+        sa.Column('status', sa.String(length=30), nullable=False),
+        sa.Column('appointment_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('allocated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['appointment_id'], ['appointments.id'], ),
+        sa.ForeignKeyConstraint(['patient_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('waitlist_entries', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_waitlist_entries_status'), ['status'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('waitlist_entries', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_waitlist_entries_status'))
+
+    op.drop_table('waitlist_entries')
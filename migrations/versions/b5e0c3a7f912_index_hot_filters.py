@@ -0,0 +1,39 @@
+"""index hot filters
+
+Revision ID: b5e0c3a7f912
+Revises: d3a8f51c7e24
+Create Date: 2026-10-19 13:41:09.218374
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5e0c3a7f912'
+down_revision = 'd3a8f51c7e24'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # appointment_date/status is already covered by ix_appointments_date_status
+    with op.batch_alter_table('appointments', schema=None) as batch_op:
+        batch_op.create_index('ix_appointments_date_risk', ['appointment_date', 'risk_score'], unique=False)
+
+    with op.batch_alter_table('page_views', schema=None) as batch_op:
+        batch_op.create_index('ix_page_views_timestamp_page', ['timestamp', 'page'], unique=False)
+
+    with op.batch_alter_table('sens_posts', schema=None) as batch_op:
+        batch_op.create_index('ix_sens_posts_published_created', ['is_published', 'created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('sens_posts', schema=None) as batch_op:
+        batch_op.drop_index('ix_sens_posts_published_created')
+
+    with op.batch_alter_table('page_views', schema=None) as batch_op:
+        batch_op.drop_index('ix_page_views_timestamp_page')
+
+    with op.batch_alter_table('appointments', schema=None) as batch_op:
+        batch_op.drop_index('ix_appointments_date_risk')
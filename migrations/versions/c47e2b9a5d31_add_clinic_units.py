@@ -0,0 +1,50 @@
+"""add clinic units
+
+Revision ID: c47e2b9a5d31
+Revises: a3c91f0d7b12
+Create Date: 2026-10-19 10:03:51.402117
+
+"""
+from datetime import time
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c47e2b9a5d31'
+down_revision = 'a3c91f0d7b12'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    clinic_units = op.create_table(
+        'clinic_units',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=120), nullable=False),
+        sa.Column('opens_at', sa.Time(), nullable=False),
+        sa.Column('closes_at', sa.Time(), nullable=False),
+        sa.Column('slot_minutes', sa.Integer(), nullable=False),
+        sa.Column('capacity', sa.Integer(), nullable=False),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name')
+    )
+    # default unit keeps the previous hospital-wide rule: 09:00–16:00, 30 min, one booking per slot
+    op.bulk_insert(clinic_units, [{
+        'name': 'General', 'opens_at': time(9, 0), 'closes_at': time(16, 0),
+        'slot_minutes': 30, 'capacity': 1, 'is_active': True,
+    }])
+
+    with op.batch_alter_table('appointments', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('clinic_unit_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_appointments_clinic_unit_id', 'clinic_units', ['clinic_unit_id'], ['id'])
+
+
+def downgrade():
+    with op.batch_alter_table('appointments', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_appointments_clinic_unit_id', type_='foreignkey')
+        batch_op.drop_column('clinic_unit_id')
+
+    op.drop_table('clinic_units')
@@ -0,0 +1,31 @@
+"""add prerendered post columns
+
+Revision ID: d3a8f51c7e24
+Revises: 9c4e1b7a2d60
+Create Date: 2026-10-19 17:52:41.118305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3a8f51c7e24'
+down_revision = '9c4e1b7a2d60'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # filled by `flask backfill-post-html` for existing rows
+    with op.batch_alter_table('sens_posts', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('body_html', sa.Text(), nullable=True))
+        batch_op.add_column(sa.Column('excerpt', sa.String(length=300), nullable=True))
+        batch_op.add_column(sa.Column('reading_minutes', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('sens_posts', schema=None) as batch_op:
+        batch_op.drop_column('reading_minutes')
+        batch_op.drop_column('excerpt')
+        batch_op.drop_column('body_html')
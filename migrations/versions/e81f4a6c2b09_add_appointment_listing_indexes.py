@@ -0,0 +1,28 @@
+"""add appointment listing indexes
+
+Revision ID: e81f4a6c2b09
+Revises: c47e2b9a5d31
+Create Date: 2026-10-19 11:20:07.834512
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e81f4a6c2b09'
+down_revision = 'c47e2b9a5d31'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('appointments', schema=None) as batch_op:
+        batch_op.create_index('ix_appointments_patient_date_time', ['patient_id', 'appointment_date', 'appointment_time'], unique=False)
+        batch_op.create_index('ix_appointments_date_status', ['appointment_date', 'status'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('appointments', schema=None) as batch_op:
+        batch_op.drop_index('ix_appointments_date_status')
+        batch_op.drop_index('ix_appointments_patient_date_time')
@@ -0,0 +1,26 @@
+"""index appointment event timeline
+
+Revision ID: f2d8c7135ea4
+Revises: e81f4a6c2b09
+Create Date: 2026-10-19 12:41:22.590731
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2d8c7135ea4'
+down_revision = 'e81f4a6c2b09'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('appointment_events', schema=None) as batch_op:
+        batch_op.create_index('ix_appointment_events_appointment_time', ['appointment_id', 'event_time'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('appointment_events', schema=None) as batch_op:
+        batch_op.drop_index('ix_appointment_events_appointment_time')
@@ -0,0 +1,18 @@
+from sqlalchemy import text
+
+from app import db
+from app.services.query_plans import check_query_plans, hot_queries
+
+
+def test_hot_queries_use_indexes(app):
+    results = check_query_plans(hot_queries())
+    assert len(results) == len(hot_queries())
+    for r in results:
+        assert r["full_scans"] == [], f"{r['name']} reads whole tables: {r['plan']}"
+
+
+def test_missing_index_is_reported(app):
+    db.session.execute(text("DROP INDEX ix_waitlist_entries_status"))
+    db.session.commit()
+    scans = {r["name"]: r["full_scans"] for r in check_query_plans(hot_queries())}
+    assert scans["waitlist waiting entries"] == ["waitlist_entries"]